@@ -1,22 +1,195 @@
 import contextlib
+import functools
 import logging
+import os
+import pathlib
 import sys
+import tempfile
 
 import docker
 
 import pytest
 
-from pytest_localstack import plugin, session, utils
+from pytest_localstack import (
+    background,
+    exceptions,
+    metrics,
+    plugin,
+    profiling,
+    resources,
+    session,
+    shared,
+    state,
+    utils,
+)
 
 
 _start_timeout = None
 _stop_timeout = None
 
+# Default LocalstackSession kwargs set from command line options.
+_session_kwargs = {}
+
+_share_xdist_container = False
+
+# Pull policy used when a fixture asks for pull_image=True.
+_pull_policy = None
+
+# Fixtures that start their session in the background.
+_background_starters = []
+
+# pytest's config, for sessions started outside of a fixture request.
+_pytest_config = None
+_background_enabled = False
+
+# Collects metrics for --localstack-metrics-file.
+_metrics_collector = None
+
+# Finds calls slower than --localstack-slow-call.
+_slow_call_detector = None
+
 
 def pytest_configure(config):
-    global _start_timeout, _stop_timeout
+    global _start_timeout, _stop_timeout, _share_xdist_container, _pull_policy
+    global _metrics_collector, _slow_call_detector, _pytest_config
+    _pytest_config = config
     _start_timeout = config.getoption("--localstack-start-timeout")
     _stop_timeout = config.getoption("--localstack-stop-timeout")
+    _share_xdist_container = config.getoption("--localstack-share-xdist")
+    if config.getoption("--localstack-reuse-containers"):
+        _session_kwargs["reuse_container"] = True
+    _pull_policy = config.getoption("--localstack-pull-policy")
+    if config.getoption("--localstack-sample-stats"):
+        _session_kwargs["sample_stats"] = True
+    if config.getoption("--localstack-timings-file"):
+        _session_kwargs["timings_file"] = config.getoption("--localstack-timings-file")
+    if getattr(config, "cache", None) is not None:
+        _session_kwargs["pull_cache"] = config.cache
+        _session_kwargs["snapshot_dir"] = str(
+            config.cache.mkdir("pytest-localstack-snapshots")
+        )
+    if config.getoption("--localstack-profile") or config.getoption(
+        "--localstack-profile-json"
+    ):
+        profiling.start()
+    if config.getoption("--localstack-metrics-file"):
+        _metrics_collector = metrics.MetricsCollector()
+        plugin.manager.register(_metrics_collector)
+        profiler = profiling.get_profiler() or profiling.start()
+        profiler.listeners.append(_metrics_collector.observe_call)
+    if config.getoption("--localstack-slow-call") is not None:
+        _slow_call_detector = profiling.SlowCallDetector(
+            config.getoption("--localstack-slow-call") / 1000.0
+        )
+        profiler = profiling.get_profiler() or profiling.start()
+        profiler.listeners.append(_slow_call_detector.observe_call)
+
+
+def pytest_unconfigure(config):
+    global _metrics_collector, _slow_call_detector, _pytest_config
+    _pytest_config = None
+    # Don't leak options or sessions into later in-process runs, like
+    # pytester's.
+    _session_kwargs.clear()
+    for starter in _background_starters:
+        starter.stop()
+    del _background_starters[:]
+    if _metrics_collector is not None:
+        if not hasattr(config, "workeroutput"):
+            _metrics_collector.write(config.getoption("--localstack-metrics-file"))
+        plugin.manager.unregister(_metrics_collector)
+        _metrics_collector = None
+    _slow_call_detector = None
+    profiling.stop()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    """Attribute AWS calls to the running test when profiling."""
+    profiler = profiling.get_profiler()
+    if profiler is None:
+        yield
+        return
+    profiler.current_test = item.nodeid
+    try:
+        yield
+    finally:
+        profiler.current_test = None
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_runtest_teardown(item, nextitem):
+    """Warn about the test's slow AWS calls.
+
+    This runs after the test's fixtures are torn down, but still in its
+    teardown phase, so ``-W error`` turns the warnings into teardown
+    errors instead of internal errors.
+    """
+    if _slow_call_detector is not None:
+        for message in _slow_call_detector.pop(item.nodeid):
+            item.warn(exceptions.SlowCallWarning(message))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    """Print the AWS call profile and write it as JSON."""
+    profiler = profiling.get_profiler()
+    if profiler is None or hasattr(config, "workeroutput"):
+        # pytest-xdist workers send their profile to the controller.
+        return
+    json_path = config.getoption("--localstack-profile-json")
+    if not profiler.stats or not (
+        json_path or config.getoption("--localstack-profile")
+    ):
+        return
+    terminalreporter.write_sep("=", "localstack AWS call profile")
+    for line in profiler.summary_lines(config.getoption("--localstack-profile-top")):
+        terminalreporter.write_line(line)
+    if json_path:
+        profiler.write_json(json_path)
+        terminalreporter.write_line("AWS call profile written to %s" % json_path)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    """Collect the AWS call profile and metrics of a pytest-xdist worker."""
+    workeroutput = getattr(node, "workeroutput", {})
+    profiler = profiling.get_profiler()
+    records = workeroutput.get("localstack_profile")
+    if profiler is not None and records:
+        profiler.merge(records)
+    metrics_data = workeroutput.get("localstack_metrics")
+    if _metrics_collector is not None and metrics_data:
+        _metrics_collector.merge(metrics_data)
+
+
+def pytest_sessionstart(session):
+    """Start background sessions so they boot while tests are collected."""
+    global _background_enabled
+    config = session.config
+    if getattr(config.option, "dist", "no") != "no" and not hasattr(
+        config, "workerinput"
+    ):
+        # The pytest-xdist controller doesn't run any tests.
+        return
+    _background_enabled = True
+    for starter in _background_starters:
+        starter.start()
+
+
+def pytest_sessionfinish(session):
+    """Stop background sessions, including ones no test ended up using."""
+    global _background_enabled
+    _background_enabled = False
+    for starter in _background_starters:
+        starter.stop()
+    workeroutput = getattr(session.config, "workeroutput", None)
+    if workeroutput is not None:
+        # A pytest-xdist worker, the controller reports for everyone.
+        profiler = profiling.get_profiler()
+        if profiler is not None:
+            workeroutput["localstack_profile"] = profiler.records()
+        if _metrics_collector is not None:
+            workeroutput["localstack_metrics"] = _metrics_collector.to_dict()
 
 
 def pytest_addoption(parser):
@@ -36,6 +209,81 @@ def pytest_addoption(parser):
         default=5,
         help="max seconds for stopping a localstack container",
     )
+    group.addoption(
+        "--localstack-reuse-containers",
+        action="store_true",
+        default=False,
+        help="reuse running localstack containers with the same configuration "
+        "and leave them running at exit",
+    )
+    group.addoption(
+        "--localstack-share-xdist",
+        action="store_true",
+        default=False,
+        help="share one localstack container for session-scoped fixtures "
+        "between pytest-xdist workers",
+    )
+    group.addoption(
+        "--localstack-pull-policy",
+        action="store",
+        default=None,
+        help="when to pull the localstack image for fixtures with pull_image=True: "
+        "always (default), if-missing or ttl=<seconds>",
+    )
+    group.addoption(
+        "--localstack-profile",
+        action="store_true",
+        default=False,
+        help="profile AWS calls through localstack clients per test and "
+        "print the slowest at the end",
+    )
+    group.addoption(
+        "--localstack-profile-top",
+        action="store",
+        type=int,
+        default=10,
+        help="number of tests and operations to print with --localstack-profile",
+    )
+    group.addoption(
+        "--localstack-profile-json",
+        action="store",
+        default=None,
+        metavar="PATH",
+        help="write the AWS call profile to PATH as JSON "
+        "(turns on --localstack-profile)",
+    )
+    group.addoption(
+        "--localstack-metrics-file",
+        action="store",
+        default=None,
+        metavar="PATH",
+        help="write localstack session and AWS call metrics to PATH in the "
+        "OpenMetrics text format at the end of the run",
+    )
+    group.addoption(
+        "--localstack-slow-call",
+        action="store",
+        type=float,
+        default=None,
+        metavar="MS",
+        help="warn about AWS calls through localstack clients that take "
+        "MS milliseconds or longer",
+    )
+    group.addoption(
+        "--localstack-sample-stats",
+        action="store_true",
+        default=False,
+        help="sample the CPU, memory, network and block I/O usage of localstack "
+        "containers and log a summary when they stop",
+    )
+    group.addoption(
+        "--localstack-timings-file",
+        action="store",
+        default=None,
+        metavar="PATH",
+        help="append how long each localstack startup phase took to PATH "
+        "as JSON lines",
+    )
 
 
 def session_fixture(
@@ -51,6 +299,7 @@ def session_fixture(
     auto_remove=True,
     pull_image=True,
     container_name=None,
+    background_start=False,
     **kwargs
 ):
     """Create a pytest fixture that provides a LocalstackSession.
@@ -96,10 +345,16 @@ def session_fixture(
             image to use. Defaults to :const:`"latest"`.
         auto_remove (bool, optional): If :obj:`True`, delete the Localstack
             container when it stops. Default: :obj:`True`
-        pull_image (bool, optional): If :obj:`True`, pull the Localstack
-            image before running it. Default: :obj:`True`.
+        pull_image (bool, str, optional): If :obj:`True`, pull the Localstack
+            image before running it, following ``--localstack-pull-policy``.
+            Can also be a policy: ``"always"``, ``"if-missing"``,
+            ``"ttl=<seconds>"`` or ``"never"``. Default: :obj:`True`.
         container_name (str, optional): The name for the Localstack
             container. Defaults to a randomly generated id.
+        background_start (bool, optional): If :obj:`True`, start the
+            Localstack container in a background thread as soon as the
+            pytest session starts, so it boots while tests are collected.
+            Requires ``scope="session"``. Default: :obj:`False`
         **kwargs: Additional kwargs will be passed to the
             :class:`.LocalstackSession`.
 
@@ -107,33 +362,213 @@ def session_fixture(
         A :func:`pytest fixture <_pytest.fixtures.fixture>`.
 
     """
+    session_kwargs = dict(
+        docker_client=docker_client,
+        services=services,
+        region_name=region_name,
+        kinesis_error_probability=kinesis_error_probability,
+        dynamodb_error_probability=dynamodb_error_probability,
+        container_log_level=container_log_level,
+        localstack_version=localstack_version,
+        auto_remove=auto_remove,
+        pull_image=pull_image,
+        container_name=container_name,
+        **kwargs
+    )
+    starter = _background_starter(scope, session_kwargs) if background_start else None
 
     @pytest.fixture(scope=scope, autouse=autouse)
-    def _fixture(pytestconfig):
+    def _fixture(pytestconfig, request):
         if not pytestconfig.pluginmanager.hasplugin("localstack"):
             pytest.skip("skipping because localstack plugin isn't loaded")
-        with _make_session(
-            docker_client=docker_client,
-            services=services,
-            region_name=region_name,
-            kinesis_error_probability=kinesis_error_probability,
-            dynamodb_error_probability=dynamodb_error_probability,
-            container_log_level=container_log_level,
-            localstack_version=localstack_version,
-            auto_remove=auto_remove,
-            pull_image=pull_image,
-            container_name=container_name,
-            **kwargs
-        ) as session:
+        with _fixture_session(request, starter, session_kwargs) as session:
             yield session
 
     return _fixture
 
 
+def reset_fixture(
+    localstack_fixture="localstack", services=None, scope="function", autouse=False
+):
+    """Create a pytest fixture that resets Localstack state before each test.
+
+    This is not a fixture! It is a factory to create them.
+
+    Use it together with a longer-lived fixture from :func:`session_fixture`
+    or :func:`~pytest_localstack.patch_fixture` to isolate tests without
+    paying for a new container each time. The created fixtures yield
+    the same :class:`.LocalstackSession` after resetting it.
+
+    Sessions that share their container, like the ones from
+    ``--localstack-share-xdist``, can't be reset, see
+    :meth:`.RunningSession.reset`.
+
+    Args:
+        localstack_fixture (str, optional): The name of the fixture that
+            provides the :class:`.LocalstackSession`.
+            Defaults to :const:`"localstack"`.
+        services (list, optional): The services to reset.
+            Defaults to all services of the session, skipping the ones
+            that can't be reset if Localstack has no state endpoints.
+        scope (str, optional): The pytest scope which this fixture will use.
+            Defaults to :const:`"function"`.
+        autouse (bool, optional): If :obj:`True`, automatically use this
+            fixture in applicable tests. Default: :obj:`False`
+
+    Returns:
+        A :func:`pytest fixture <_pytest.fixtures.fixture>`.
+
+    """
+
+    @pytest.fixture(scope=scope, autouse=autouse)
+    def _fixture(request):
+        localstack_session = request.getfixturevalue(localstack_fixture)
+        localstack_session.reset(services=services)
+        yield localstack_session
+
+    return _fixture
+
+
+def seeded_fixture(
+    seed, localstack_fixture="localstack", scope="function", autouse=False
+):
+    """Create a pytest fixture that sets up Localstack resources with `seed`.
+
+    This is not a fixture! It is a factory to create them.
+
+    The first time, `seed` is called with the :class:`.LocalstackSession`
+    to create AWS resources, then the state is saved with
+    :meth:`~.RunningSession.snapshot`. After that the snapshot is restored
+    instead, which is usually much faster than running `seed` again.
+    Snapshots are kept in ``.pytest_cache`` between test runs and are
+    named after the source code of `seed`, so changing `seed` makes a
+    new snapshot.
+
+    Args:
+        seed (callable): Takes the :class:`.LocalstackSession` and creates
+            AWS resources in it.
+        localstack_fixture (str, optional): The name of the fixture that
+            provides the :class:`.LocalstackSession`.
+            Defaults to :const:`"localstack"`.
+        scope (str, optional): The pytest scope which this fixture will use.
+            Defaults to :const:`"function"`.
+        autouse (bool, optional): If :obj:`True`, automatically use this
+            fixture in applicable tests. Default: :obj:`False`
+
+    Returns:
+        A :func:`pytest fixture <_pytest.fixtures.fixture>`.
+
+    """
+
+    @pytest.fixture(scope=scope, autouse=autouse)
+    def _fixture(request):
+        localstack_session = request.getfixturevalue(localstack_fixture)
+        state.restore_or_seed(localstack_session, seed)
+        yield localstack_session
+
+    return _fixture
+
+
+def resources_fixture(
+    spec,
+    localstack_fixture="localstack",
+    scope="function",
+    autouse=False,
+    max_workers=8,
+):
+    """Create a pytest fixture that creates AWS resources in Localstack.
+
+    This is not a fixture! It is a factory to create them.
+
+    Resources are created in parallel from a declarative `spec`, see
+    :mod:`pytest_localstack.resources`. The created fixtures yield a dict
+    of service names to dicts of resource names to their identifiers
+    (bucket, table and stream names, queue URLs and topic ARNs). The
+    resources are deleted again when the fixture is torn down, so a
+    function-scoped fixture can use a longer-lived Localstack fixture.
+
+    Usage::
+
+        localstack = pytest_localstack.session_fixture(scope="module")
+        queues = pytest_localstack.resources_fixture(
+            {"sqs": ["jobs", "results"]}, scope="module"
+        )
+
+        def test_jobs(queues):
+            jobs_url = queues["sqs"]["jobs"]
+
+    Args:
+        spec (dict): The resources to create.
+        localstack_fixture (str, optional): The name of the fixture that
+            provides the :class:`.LocalstackSession`.
+            Defaults to :const:`"localstack"`.
+        scope (str, optional): The pytest scope which this fixture will use.
+            Defaults to :const:`"function"`.
+        autouse (bool, optional): If :obj:`True`, automatically use this
+            fixture in applicable tests. Default: :obj:`False`
+        max_workers (int, optional): The most resources to create at once.
+            Default: 8
+
+    Returns:
+        A :func:`pytest fixture <_pytest.fixtures.fixture>`.
+
+    """
+
+    @pytest.fixture(scope=scope, autouse=autouse)
+    def _fixture(request):
+        localstack_session = request.getfixturevalue(localstack_fixture)
+        provisioned = resources.provision(
+            localstack_session, spec, max_workers=max_workers
+        )
+        yield provisioned
+        resources.deprovision(localstack_session, provisioned, max_workers=max_workers)
+
+    return _fixture
+
+
+def _background_starter(scope, session_kwargs):
+    """Register a session to start in the background."""
+    if scope != "session":
+        raise ValueError("background_start requires scope='session'")
+    starter = background.BackgroundSessionStarter(
+        functools.partial(_make_background_session, session_kwargs)
+    )
+    _background_starters.append(starter)
+    if _background_enabled:
+        # Defined during collection, after the pytest session started.
+        starter.start()
+    return starter
+
+
 @contextlib.contextmanager
-def _make_session(docker_client, *args, **kwargs):
+def _fixture_session(request, starter, session_kwargs):
+    """Yield a fixture's session, waiting for it if it starts in the background."""
+    if starter is None:
+        coordinator = _shared_session_coordinator(request.config, request.scope)
+        with _make_session(coordinator=coordinator, **session_kwargs) as _session:
+            yield _session
+        return
+    try:
+        yield starter.result()
+    finally:
+        starter.stop()
+
+
+def _make_background_session(session_kwargs):
+    """Make a session-scoped fixture's session outside of a fixture request."""
+    coordinator = _shared_session_coordinator(_pytest_config, "session")
+    return _make_session(coordinator=coordinator, **session_kwargs)
+
+
+@contextlib.contextmanager
+def _make_session(docker_client, *args, coordinator=None, **kwargs):
     utils.check_proxy_env_vars()
 
+    for key, value in _session_kwargs.items():
+        kwargs.setdefault(key, value)
+    if kwargs.get("pull_image") is True and _pull_policy:
+        kwargs["pull_image"] = _pull_policy
+
     if docker_client is None:
         docker_client = docker.from_env()
 
@@ -142,6 +577,16 @@ def _make_session(docker_client, *args, **kwargs):
     except docker.errors.APIError:
         pytest.fail("Could not connect to Docker.")
 
+    if coordinator is not None:
+        with coordinator.session(
+            docker_client,
+            start_timeout=_start_timeout,
+            stop_timeout=_stop_timeout,
+            **kwargs,
+        ) as _session:
+            yield _session
+        return
+
     _session = session.LocalstackSession(docker_client, *args, **kwargs)
 
     _session.start(timeout=_start_timeout)
@@ -151,9 +596,30 @@ def _make_session(docker_client, *args, **kwargs):
         _session.stop(timeout=_stop_timeout)
 
 
+def _shared_session_coordinator(config, scope):
+    """Return a coordinator if the fixture should share an xdist container."""
+    if not _share_xdist_container or config is None or scope != "session":
+        return None
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is None:
+        return None
+    basetemp = config.getoption("basetemp")
+    if basetemp:
+        # pytest-xdist puts each worker's basetemp in the controller's.
+        directory = pathlib.Path(basetemp).resolve().parent
+    else:
+        directory = pathlib.Path(tempfile.gettempdir()) / (
+            "pytest-localstack-%s" % workerinput["testrunuid"]
+        )
+        os.makedirs(directory, exist_ok=True)
+    return shared.SharedSessionCoordinator(directory, workerinput["workerid"])
+
+
 # Register contrib modules
 plugin.register_plugin_module("pytest_localstack.contrib.botocore")
 plugin.register_plugin_module("pytest_localstack.contrib.boto3", False)
+plugin.register_plugin_module("pytest_localstack.contrib.aiobotocore", False)
+plugin.register_plugin_module("pytest_localstack.contrib.aioboto3", False)
 
 # Register 3rd-party modules
 plugin.manager.load_setuptools_entrypoints("localstack")
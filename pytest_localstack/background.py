@@ -0,0 +1,74 @@
+"""Start Localstack sessions in the background while pytest collects tests."""
+import concurrent.futures
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundSessionStarter:
+    """Enter a session context manager in a background thread.
+
+    Args:
+        make_session (callable): Takes no arguments and returns a context
+            manager that starts a session on enter and stops it on exit,
+            like :func:`pytest_localstack._make_session`.
+
+    """
+
+    def __init__(self, make_session):
+        self.make_session = make_session
+        self._lock = threading.Lock()
+        self._future = None
+
+    def start(self):
+        """Start the session in a background thread, if not already started."""
+        with self._lock:
+            if self._future is not None:
+                return
+            self._future = concurrent.futures.Future()
+            thread = threading.Thread(
+                target=self._run,
+                args=(self._future,),
+                name="pytest-localstack-start",
+                daemon=True,
+            )
+            thread.start()
+
+    def _run(self, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            context = self.make_session()
+            session = context.__enter__()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result((context, session))
+
+    def result(self, timeout=None):
+        """Wait for the session to be ready and return it.
+
+        Starts the session now if :meth:`start` wasn't called yet.
+        Raises whatever exception starting the session raised.
+        """
+        self.start()
+        with self._lock:
+            future = self._future
+        _, session = future.result(timeout)
+        return session
+
+    def stop(self):
+        """Stop the session if it was started. Safe to call more than once."""
+        with self._lock:
+            future, self._future = self._future, None
+        if future is None:
+            return
+        try:
+            # Let a start that's still in progress finish before stopping it.
+            context, _ = future.result()
+        except BaseException:
+            logger.debug("Background session never started", exc_info=True)
+            return
+        context.__exit__(None, None, None)
@@ -57,6 +57,12 @@ SERVICE_ALIASES = {
     "streams.dynamodb": "dynamodbstreams",
 }
 
+# Docker label holding a hash of a reusable container's configuration.
+CONTAINER_CONFIG_HASH_LABEL = "pytest-localstack.config-hash"
+
+# Docker repository for images committed by LocalstackSession.snapshot().
+SNAPSHOT_IMAGE_REPOSITORY = "pytest-localstack-snapshot"
+
 DEFAULT_CONTAINER_START_TIMEOUT = 60
 DEFAULT_CONTAINER_STOP_TIMEOUT = 10
 
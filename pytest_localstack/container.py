@@ -1,5 +1,8 @@
 """Docker container tools."""
+import collections
+import re
 import threading
+import time
 
 from pytest_localstack import utils
 
@@ -19,11 +22,20 @@ class DockerLogTailer(threading.Thread):
             Default is True.
         encoding (str, optional): Read container logs bytes using
             this encoding. Default is utf-8. Set to None to log raw bytes.
+        since (int, optional): Only tail logs written after this
+            UNIX timestamp. Default is to tail all logs.
 
     """
 
     def __init__(
-        self, container, logger, log_level, stdout=True, stderr=True, encoding="utf-8"
+        self,
+        container,
+        logger,
+        log_level,
+        stdout=True,
+        stderr=True,
+        encoding="utf-8",
+        since=None,
     ):
         self.container = container
         self.logger = logger
@@ -31,20 +43,230 @@ class DockerLogTailer(threading.Thread):
         self.stdout = stdout
         self.stderr = stderr
         self.encoding = encoding
+        self.since = since
+        self._logs_generator = None
+        self._stopping = False
+        self._subscriptions = []
+        self._subscriptions_lock = threading.Lock()
         super(DockerLogTailer, self).__init__()
         self.daemon = True
 
     def run(self):
         """Tail the container logs as a separate thread."""
+        logs_kwargs = {"stream": True, "stdout": self.stdout, "stderr": self.stderr}
+        if self.since is not None:
+            logs_kwargs["since"] = self.since
         try:
-            logs_generator = self.container.logs(
-                stream=True, stdout=self.stdout, stderr=self.stderr
-            )
-            for line in logs_generator:
+            self._logs_generator = self.container.logs(**logs_kwargs)
+            for line in self._logs_generator:
                 if self.encoding is not None and isinstance(line, bytes):
                     line = line.decode(self.encoding)
                 line = utils.remove_newline(line)
                 self.logger.log(self.log_level, line)
+                self._notify_subscribers(line)
         except Exception as e:
+            if self._stopping:
+                return
             self.exception = e
             raise
+
+    def subscribe(self, pattern, callback=None):
+        """Get notified when a log line matches a regular expression.
+
+        Args:
+            pattern (str): A regular expression to search each log line for.
+            callback (callable, optional): Called with the
+                :class:`re.Match` from the tailer's thread for every
+                matching line.
+
+        Returns:
+            threading.Event: Set once a line has matched.
+
+        """
+        event = threading.Event()
+        with self._subscriptions_lock:
+            self._subscriptions.append((re.compile(pattern), event, callback))
+        return event
+
+    def _notify_subscribers(self, line):
+        if not isinstance(line, str):
+            # Raw bytes logs (encoding=None) can't match text patterns.
+            return
+        with self._subscriptions_lock:
+            subscriptions = list(self._subscriptions)
+        # Docker can send several lines in one chunk.
+        for each_line in line.splitlines():
+            for regex, event, callback in subscriptions:
+                match = regex.search(each_line)
+                if match is None:
+                    continue
+                event.set()
+                if callback is not None:
+                    callback(match)
+
+    def stop(self):
+        """Stop tailing a container that is still running."""
+        self._stopping = True
+        close = getattr(self._logs_generator, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                # A plain generator can't be closed while it's running.
+                pass
+
+
+StatsSample = collections.namedtuple(
+    "StatsSample",
+    [
+        "time",
+        "cpu_percent",
+        "memory_bytes",
+        "network_rx_bytes",
+        "network_tx_bytes",
+        "block_read_bytes",
+        "block_write_bytes",
+    ],
+)
+StatsSample.__doc__ = """One reading of a container's resource usage.
+
+Network and block I/O bytes are totals since the container started.
+"""
+
+
+class DockerStatsSampler(threading.Thread):
+    """Sample a Docker container's resource usage in the background.
+
+    Docker streams a stats reading about once per second. The most
+    recent `max_samples` readings are kept in :attr:`samples`, while
+    :meth:`summary` covers every reading since the sampler started.
+
+    Args:
+        container (:class:`docker.models.containers.Container`):
+            A container object returned by docker-py's
+            `run(detach=True)` method.
+        max_samples (int, optional): Number of readings to keep.
+            Default is 600, about ten minutes.
+
+    """
+
+    def __init__(self, container, max_samples=600):
+        self.container = container
+        self.samples = collections.deque(maxlen=max_samples)
+        self._first = None
+        self._count = 0
+        self._cpu_sum = 0.0
+        self._cpu_peak = 0.0
+        self._memory_sum = 0
+        self._memory_peak = 0
+        self._samples_lock = threading.Lock()
+        self._stats_generator = None
+        self._stopping = False
+        super(DockerStatsSampler, self).__init__()
+        self.daemon = True
+
+    def run(self):
+        """Read the container's stats stream as a separate thread."""
+        try:
+            self._stats_generator = self.container.stats(stream=True, decode=True)
+            for stats in self._stats_generator:
+                if self._stopping:
+                    return
+                self.add(parse_stats(stats))
+        except Exception as e:
+            if self._stopping:
+                return
+            self.exception = e
+            raise
+
+    def add(self, sample):
+        """Record a :class:`StatsSample`."""
+        with self._samples_lock:
+            if self._first is None:
+                self._first = sample
+            self.samples.append(sample)
+            self._count += 1
+            self._cpu_sum += sample.cpu_percent
+            self._cpu_peak = max(self._cpu_peak, sample.cpu_percent)
+            self._memory_sum += sample.memory_bytes
+            self._memory_peak = max(self._memory_peak, sample.memory_bytes)
+
+    def summary(self):
+        """Return the peak and average usage of all readings so far.
+
+        Returns:
+            dict: Empty if there were no readings yet.
+
+        """
+        with self._samples_lock:
+            if not self._count:
+                return {}
+            first, last = self._first, self.samples[-1]
+            return {
+                "samples": self._count,
+                "seconds": last.time - first.time,
+                "cpu_percent_peak": self._cpu_peak,
+                "cpu_percent_average": self._cpu_sum / self._count,
+                "memory_bytes_peak": self._memory_peak,
+                "memory_bytes_average": self._memory_sum / self._count,
+                "network_rx_bytes": last.network_rx_bytes - first.network_rx_bytes,
+                "network_tx_bytes": last.network_tx_bytes - first.network_tx_bytes,
+                "block_read_bytes": last.block_read_bytes - first.block_read_bytes,
+                "block_write_bytes": last.block_write_bytes - first.block_write_bytes,
+            }
+
+    def stop(self):
+        """Stop sampling."""
+        self._stopping = True
+        close = getattr(self._stats_generator, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                # A plain generator can't be closed while it's running.
+                pass
+
+
+def parse_stats(stats, now=None):
+    """Make a :class:`StatsSample` from a decoded Docker stats reading."""
+    cpu_stats = stats.get("cpu_stats") or {}
+    precpu_stats = stats.get("precpu_stats") or {}
+    cpu_delta = cpu_stats.get("cpu_usage", {}).get("total_usage", 0) - (
+        precpu_stats.get("cpu_usage", {}).get("total_usage", 0)
+    )
+    system_delta = cpu_stats.get("system_cpu_usage", 0) - precpu_stats.get(
+        "system_cpu_usage", 0
+    )
+    online_cpus = cpu_stats.get("online_cpus") or len(
+        cpu_stats.get("cpu_usage", {}).get("percpu_usage") or [None]
+    )
+    cpu_percent = 0.0
+    if cpu_delta > 0 and system_delta > 0:
+        cpu_percent = cpu_delta / system_delta * online_cpus * 100.0
+
+    memory_stats = stats.get("memory_stats") or {}
+    memory_details = memory_stats.get("stats") or {}
+    # "rss" with cgroup v1, "anon" with cgroup v2.
+    memory_bytes = memory_details.get("rss", memory_details.get("anon"))
+    if memory_bytes is None:
+        memory_bytes = memory_stats.get("usage", 0)
+
+    networks = (stats.get("networks") or {}).values()
+    block_read_bytes = block_write_bytes = 0
+    blkio_stats = stats.get("blkio_stats") or {}
+    for entry in blkio_stats.get("io_service_bytes_recursive") or []:
+        op = entry.get("op", "").lower()
+        if op == "read":
+            block_read_bytes += entry.get("value", 0)
+        elif op == "write":
+            block_write_bytes += entry.get("value", 0)
+
+    return StatsSample(
+        time=time.time() if now is None else now,
+        cpu_percent=cpu_percent,
+        memory_bytes=memory_bytes,
+        network_rx_bytes=sum(network.get("rx_bytes", 0) for network in networks),
+        network_tx_bytes=sum(network.get("tx_bytes", 0) for network in networks),
+        block_read_bytes=block_read_bytes,
+        block_write_bytes=block_write_bytes,
+    )
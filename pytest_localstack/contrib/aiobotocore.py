@@ -0,0 +1,226 @@
+"""Test resource factory for the aiobotocore library."""
+import contextlib
+import functools
+import inspect
+import logging
+from unittest import mock
+
+import aiobotocore.client
+import aiobotocore.config
+import aiobotocore.credentials
+import aiobotocore.session
+
+from pytest_localstack import constants, hookspecs, profiling
+from pytest_localstack.contrib import botocore as localstack_botocore
+
+
+logger = logging.getLogger(__name__)
+
+
+@hookspecs.pytest_localstack_hookimpl
+def contribute_to_session(session):
+    """Add :class:`AiobotocoreTestResourceFactory` to :class:`.LocalstackSession`."""
+    logger.debug("patching session %r", session)
+    session.aiobotocore = AiobotocoreTestResourceFactory(session)
+
+
+class AiobotocoreTestResourceFactory:
+    """Create aiobotocore clients to interact with a :class:`.LocalstackSession`.
+
+    Args:
+        localstack_session (:class:`.LocalstackSession`):
+            The session that this factory should create test resources for.
+
+    """
+
+    def __init__(self, localstack_session):
+        logger.debug("AiobotocoreTestResourceFactory.__init__")
+        self.localstack_session = localstack_session
+        self._default_session = None
+
+    def session(self, *args, **kwargs):
+        """Create an aiobotocore Session that will use Localstack.
+
+        Arguments are the same as :class:`aiobotocore.session.AioSession`.
+        """
+        return Session(self.localstack_session, *args, **kwargs)
+
+    def client(self, service_name, *args, **kwargs):
+        """Create an aiobotocore client that will use Localstack.
+
+        Arguments are the same as
+        :meth:`aiobotocore.session.AioSession.create_client`.
+        Use the result as an async context manager::
+
+            >>> async with localstack.aiobotocore.client("s3") as s3:
+            ...     await s3.list_buckets()
+
+        """
+        return self.default_session.create_client(service_name, *args, **kwargs)
+
+    @property
+    def default_session(self):
+        """Return a default aiobotocore Localstack Session.
+
+        Most applications only need one Session.
+        """
+        if self._default_session is None:
+            self._default_session = self.session()
+        return self._default_session
+
+    @contextlib.contextmanager
+    def patch_aiobotocore(self, host_check="strict"):
+        """Context manager that will patch aiobotocore to use Localstack.
+
+        This also patches aioboto3, which uses aiobotocore. Like
+        :meth:`~.BotocoreTestResourceFactory.patch_botocore`, the session
+        to use is chosen per :mod:`asyncio` task: entering the patch in a
+        task binds that task, and tasks it creates afterwards, to this
+        session. So tasks running concurrently can each use their own
+        Localstack session::
+
+            >>> async def worker(localstack):
+            ...     with localstack.aiobotocore.patch_aiobotocore():
+            ...         session = aiobotocore.session.get_session()
+            ...         async with session.create_client("s3") as s3:
+            ...             await s3.list_buckets()
+            >>>
+            >>> await asyncio.gather(worker(localstack_1), worker(localstack_2))
+
+        Only sessions and clients created while patched are redirected.
+        aiobotocore clients that already exist hold open connections, so
+        they aren't proxied to Localstack.
+
+        Args:
+            host_check (str, optional): Which request hosts count as
+                Localstack, see
+                :meth:`~.BotocoreTestResourceFactory.patch_botocore`.
+                Default: :const:`"strict"`
+
+        """
+        if host_check not in localstack_botocore.HOST_CHECKS:
+            raise ValueError(
+                "host_check must be one of %s, not %r"
+                % (", ".join(localstack_botocore.HOST_CHECKS), host_check)
+            )
+        with localstack_botocore._bind(
+            self.localstack_session.botocore,
+            host_check,
+            [localstack_botocore._session_patches, _aio_patches],
+        ):
+            yield
+
+
+# Grab references here to avoid breaking things during patching.
+_original_create_client = aiobotocore.session.AioSession._create_client
+_original_convert_to_request_dict = (
+    aiobotocore.client.AioBaseClient._convert_to_request_dict
+)
+
+# Position of _create_client()'s `config` argument after `service_name`.
+_CREATE_CLIENT_CONFIG_INDEX = (
+    list(inspect.signature(inspect.unwrap(_original_create_client)).parameters).index(
+        "config"
+    )
+    - 2
+)
+
+# Localstack doesn't use the virtual host addressing style.
+_LOCALSTACK_CLIENT_CONFIG = aiobotocore.config.AioConfig(
+    s3={"addressing_style": "path"}
+)
+
+
+def _make_aio_patches():
+    """Return the patches that route aiobotocore sessions and clients.
+
+    :class:`aiobotocore.session.AioSession` inherits the rest from the
+    patched :class:`botocore.session.Session`.
+    """
+
+    def _register_credential_provider(self):
+        if localstack_botocore._get_binding() is None:
+            return localstack_botocore._original_session_methods[
+                "_register_credential_provider"
+            ](self)
+        return Session._register_credential_provider(self)
+
+    @functools.wraps(_original_create_client)
+    async def _create_client(self, *args, **kwargs):
+        if localstack_botocore._get_binding() is None:
+            return await _original_create_client(self, *args, **kwargs)
+        return await Session._create_client(self, *args, **kwargs)
+
+    @functools.wraps(_original_convert_to_request_dict)
+    async def _convert_to_request_dict(self, *args, **kwargs):
+        request_dict = await _original_convert_to_request_dict(self, *args, **kwargs)
+        localstack_botocore._check_request_host(request_dict)
+        return request_dict
+
+    return [
+        mock.patch.multiple(
+            aiobotocore.session.AioSession,
+            _register_credential_provider=_register_credential_provider,
+            _create_client=_create_client,
+        ),
+        mock.patch.object(
+            aiobotocore.client.AioBaseClient,
+            "_convert_to_request_dict",
+            _convert_to_request_dict,
+        ),
+    ]
+
+
+_aio_patches = localstack_botocore._PatchSet(_make_aio_patches)
+
+
+class Session(aiobotocore.session.AioSession):
+    """An aiobotocore Session subclass that talks to Localstack."""
+
+    def __init__(self, localstack_session, *args, **kwargs):
+        self.localstack_session = localstack_session
+        super(Session, self).__init__(*args, **kwargs)
+        # Localstack has no global STS endpoint.
+        self.set_config_variable("sts_regional_endpoints", "regional")
+
+    _register_data_loader = localstack_botocore.Session._register_data_loader
+    _register_endpoint_resolver = (
+        localstack_botocore.Session._register_endpoint_resolver
+    )
+
+    def _register_credential_provider(self):
+        self._components.lazy_register_component(
+            "credential_provider", create_credential_resolver
+        )
+
+    async def _create_client(self, service_name, *args, **kwargs):
+        args, kwargs = localstack_botocore._add_localstack_config(
+            args, kwargs, _CREATE_CLIENT_CONFIG_INDEX, _LOCALSTACK_CLIENT_CONFIG
+        )
+        client = await _original_create_client(self, service_name, *args, **kwargs)
+        client._is_pytest_localstack = True
+        profiling.instrument(client)
+        return client
+
+
+def create_credential_resolver():
+    """Create an async credentials resolver for Localstack."""
+    env_provider = aiobotocore.credentials.AioEnvProvider()
+    default = DefaultCredentialProvider()
+    resolver = aiobotocore.credentials.AioCredentialResolver(
+        providers=[env_provider, default]
+    )
+    return resolver
+
+
+class DefaultCredentialProvider(localstack_botocore.DefaultCredentialProvider):
+    """Provide some default credentials for Localstack aiobotocore clients."""
+
+    async def load(self):
+        """Return credentials."""
+        return aiobotocore.credentials.AioCredentials(
+            access_key=constants.DEFAULT_AWS_ACCESS_KEY_ID,
+            secret_key=constants.DEFAULT_AWS_SECRET_ACCESS_KEY,
+            token=constants.DEFAULT_AWS_SESSION_TOKEN,
+            method=self.METHOD,
+        )
@@ -1,9 +1,10 @@
 """pytest-localstack extensions for boto3."""
 import logging
+import threading
 
 import boto3.session
 
-from pytest_localstack import constants, hookspecs
+from pytest_localstack import constants, hookspecs, utils
 
 
 logger = logging.getLogger(__name__)
@@ -16,9 +17,21 @@ def contribute_to_session(session):
     session.boto3 = Boto3TestResourceFactory(session)
 
 
+@hookspecs.pytest_localstack_hookimpl
+def session_stopped(session):
+    """Drop cached clients and resources, a restarted container may use other ports."""
+    factory = getattr(session, "boto3", None)
+    if factory is not None:
+        factory.client_cache.clear()
+
+
 class Boto3TestResourceFactory:
     """Create boto3 clients and resources to interact with a :class:`~.LocalstackSession`.
 
+    Like :class:`~.BotocoreTestResourceFactory`, clients and resources are
+    cached when the session has a ``client_cache_size``. Resources aren't
+    thread-safe, so each thread gets its own.
+
     Args:
         localstack_session (:class:`.LocalstackSession`):
             The session that this factory should create test resources for.
@@ -29,6 +42,9 @@ class Boto3TestResourceFactory:
         logger.debug("Boto3TestResourceFactory.__init__")
         self.localstack_session = localstack_session
         self._default_session = None
+        self.client_cache = utils.LRUCache(
+            getattr(localstack_session, "kwargs", {}).get("client_cache_size", 0)
+        )
 
     def session(self, *args, **kwargs):
         """Return a boto3 Session object that will use localstack.
@@ -58,14 +74,24 @@ class Boto3TestResourceFactory:
 
         Arguments are the same as :func:`boto3.client`.
         """
-        return self.default_session.client(service_name)
+        if not self.client_cache.maxsize:
+            return self.default_session.client(service_name)
+        return self.client_cache.get_or_create(
+            ("client", service_name),
+            lambda: self.default_session.client(service_name),
+        )
 
     def resource(self, service_name):
         """Return a patched boto3 Resource object that will use localstack.
 
         Arguments are the same as :func:`boto3.resource`.
         """
-        return self.default_session.resource(service_name)
+        if not self.client_cache.maxsize:
+            return self.default_session.resource(service_name)
+        return self.client_cache.get_or_create(
+            ("resource", service_name, threading.get_ident()),
+            lambda: self.default_session.resource(service_name),
+        )
 
     # No need for a patch method.
     # Running the botocore patch will also patch boto3.
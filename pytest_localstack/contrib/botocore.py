@@ -1,22 +1,38 @@
 """Test resource factory for the botocore library."""
+import collections
 import contextlib
+import contextvars
 import functools
+import gc
 import inspect
+import ipaddress
 import logging
 import socket
+import threading
+import urllib.parse
 import weakref
 from unittest import mock
 
 import botocore
+import botocore.args
 import botocore.client
 import botocore.config
 import botocore.credentials
+import botocore.loaders
 import botocore.regions
 import botocore.session
 
 import pytest
 
-from pytest_localstack import _make_session, constants, exceptions, hookspecs, utils
+from pytest_localstack import (
+    _background_starter,
+    _fixture_session,
+    constants,
+    exceptions,
+    hookspecs,
+    profiling,
+    utils,
+)
 from pytest_localstack.session import RunningSession
 
 
@@ -35,6 +51,15 @@ def contribute_to_session(session):
     session.botocore = BotocoreTestResourceFactory(session)
 
 
+@hookspecs.pytest_localstack_hookimpl
+def session_stopped(session):
+    """Drop cached clients and pools, a restarted container may use other ports."""
+    factory = getattr(session, "botocore", None)
+    if factory is not None:
+        factory.client_cache.clear()
+        factory.close_http_sessions()
+
+
 @hookspecs.pytest_localstack_hookimpl
 def contribute_to_module(pytest_localstack):
     """Add :func:`patch_fixture` to :mod:`pytest_localstack`."""
@@ -45,6 +70,25 @@ def contribute_to_module(pytest_localstack):
 class BotocoreTestResourceFactory:
     """Create botocore clients to interact with a :class:`.LocalstackSession`.
 
+    Creating a client takes tens of milliseconds. To reuse clients, pass
+    ``client_cache_size=<n>`` to the session, e.g. through
+    :func:`~pytest_localstack.session_fixture`. :meth:`client` then keeps
+    up to `n` clients, keyed on their arguments. Statistics are available
+    from ``client_cache.cache_info()``. Cached clients are shared, so
+    don't change them, e.g. by registering event handlers.
+
+    Connection settings for every client can be passed to the session too:
+
+    - ``max_pool_connections=<n>``: The size of each client's connection
+      pool. botocore's default is 10.
+    - ``tcp_keepalive=True``: Turn on TCP keep-alive.
+    - ``share_connection_pool=True``: Let all clients that reach the same
+      Localstack host and port with the same connection settings share one
+      connection pool, e.g. every service on Localstack's edge port.
+
+    Settings in a client's own ``config`` win. botocore already sets
+    ``TCP_NODELAY`` on its connections.
+
     Args:
         localstack_session (:class:`.LocalstackSession`):
             The session that this factory should create test resources for.
@@ -55,6 +99,17 @@ class BotocoreTestResourceFactory:
         logger.debug("BotocoreTestResourceFactory.__init__")
         self.localstack_session = localstack_session
         self._default_session = None
+        self.client_cache = utils.LRUCache(
+            getattr(localstack_session, "kwargs", {}).get("client_cache_size", 0)
+        )
+        # Requests that patch_botocore() stopped from leaving Localstack,
+        # by hostname.
+        self.blocked_requests = collections.Counter()
+        session_kwargs = getattr(localstack_session, "kwargs", {})
+        self.client_config = _connection_config(session_kwargs)
+        self.share_connection_pool = session_kwargs.get("share_connection_pool", False)
+        self._http_sessions = {}
+        self._http_sessions_lock = threading.Lock()
 
     def session(self, *args, **kwargs):
         """Create a botocore Session that will use Localstack.
@@ -69,7 +124,54 @@ class BotocoreTestResourceFactory:
         Arguments are the same as
         :meth:`botocore.session.Session.create_client`.
         """
-        return self.default_session.create_client(service_name, *args, **kwargs)
+        if not self.client_cache.maxsize:
+            return self.default_session.create_client(service_name, *args, **kwargs)
+        key = _client_cache_key(
+            service_name, self.localstack_session.region_name, args, kwargs
+        )
+        return self.client_cache.get_or_create(
+            key,
+            lambda: self.default_session.create_client(service_name, *args, **kwargs),
+        )
+
+    def share_http_session(self, client):
+        """Make `client` use the shared connection pool for its endpoint.
+
+        Only with ``share_connection_pool=True``.
+        """
+        if not self.share_connection_pool:
+            return
+        endpoint = client._endpoint
+        config = client.meta.config
+        key = (
+            endpoint.host,
+            repr(getattr(endpoint.http_session, "_verify", None)),
+            config.connect_timeout,
+            config.read_timeout,
+            config.max_pool_connections,
+            getattr(config, "tcp_keepalive", None),
+            repr(getattr(config, "client_cert", None)),
+            repr(sorted((config.proxies or {}).items())),
+            repr(sorted((getattr(config, "proxies_config", None) or {}).items())),
+        )
+        with self._http_sessions_lock:
+            shared = self._http_sessions.get(key)
+            if shared is None:
+                shared = self._http_sessions[key] = _SharedHTTPSession(
+                    endpoint.http_session
+                )
+                endpoint.http_session = shared
+                return
+        endpoint.http_session.close()
+        endpoint.http_session = shared
+
+    def close_http_sessions(self):
+        """Close the shared connection pools."""
+        with self._http_sessions_lock:
+            http_sessions = list(self._http_sessions.values())
+            self._http_sessions.clear()
+        for http_session in http_sessions:
+            http_session.close_shared()
 
     @property
     def default_session(self):
@@ -82,12 +184,63 @@ class BotocoreTestResourceFactory:
         return self._default_session
 
     @contextlib.contextmanager
-    def patch_botocore(self):
+    def patch_botocore(self, strategy="proxy", host_check="strict"):
         """Context manager that will patch botocore to use Localstack.
 
         Since boto3 relies on botocore to perform API calls, this method
         also effectively patches boto3.
+
+        botocore is patched once for the whole process, while any
+        :meth:`patch_botocore` is active. Which Localstack session a call
+        goes to is decided per thread or :mod:`asyncio` task, with
+        :mod:`contextvars`: entering :meth:`patch_botocore` binds the
+        current context to this session. Contexts without a binding of
+        their own, like threads started by the code under test, use the
+        most recently entered one. So several Localstack sessions can
+        serve tests running concurrently in one process::
+
+            >>> def worker(localstack):
+            ...     with localstack.botocore.patch_botocore():
+            ...         boto3.client("s3").list_buckets()
+
+        Args:
+            strategy (str, optional): How to redirect botocore clients that
+                were created before patching. One of
+
+                - :const:`"proxy"`: Read their endpoint-related attributes
+                  from a Localstack client on each access.
+                - :const:`"retarget"`: Find them with the garbage collector
+                  when patching starts and swap those attributes in place,
+                  restoring them when patching ends. API calls then run at
+                  unpatched speed, but clients created by other threads
+                  while entering the patch may be missed. Retargeted clients
+                  use this session in every context.
+
+                Defaults to :const:`"proxy"`.
+            host_check (str, optional): Which request hosts count as
+                Localstack. One of
+
+                - :const:`"strict"`: Only the Localstack hostname,
+                  ``localhost``, loopback addresses and this machine's
+                  hostname.
+                - :const:`"lenient"`: Also their subdomains and any
+                  loopback address.
+
+                Requests to other hosts raise
+                :class:`~.exceptions.UnpatchedRequestError` and are counted
+                in :attr:`blocked_requests`. Defaults to :const:`"strict"`.
+
         """
+        if strategy not in PATCH_STRATEGIES:
+            raise ValueError(
+                "strategy must be one of %s, not %r"
+                % (", ".join(PATCH_STRATEGIES), strategy)
+            )
+        if host_check not in HOST_CHECKS:
+            raise ValueError(
+                "host_check must be one of %s, not %r"
+                % (", ".join(HOST_CHECKS), host_check)
+            )
         # Q: Why is this method so complicated?
         # A: Because the most common usecase is something like this::
         #
@@ -104,227 +257,18 @@ class BotocoreTestResourceFactory:
         #   is loaded. It's hard to patch existing Client instances since
         #   there isn't a good way to find them.
         #   You must add a descriptor to the Client class
-        #   that overrides specific properties of the Client instances.
-        #   TODO: Could we use use `gc.get_referrers()` to find instances?
-        logger.debug("enter patch")
-        if boto3 is not None:
-            preexisting_boto3_session = boto3.DEFAULT_SESSION
-
-        try:
-            factory = self
-            patches = []
-
-            # Step 1: patch botocore Session to use Localstack.
-            attr = {}
-
-            @property
-            def localstack_session(self):
-                # Simlate the 'localstack_session' attr from Session class below.
-                # Patch this into the botocore Session class.
-                if "localstack_session" in self.__dict__:
-                    # We're patching this into the base botocore Session,
-                    # but we don't want to override things for the Session
-                    # subclass below.
-                    return self.__dict__["localstack_session"]
-                return factory.localstack_session
-
-            @localstack_session.setter
-            def localstack_session(self, value):
-                if not isinstance(value, RunningSession):
-                    raise TypeError(
-                        f"localstack_session value is type {value.__class__.__name__}, must be a LocalstackSession"
-                    )
-                self.__dict__["localstack_session"] = value
-
-            attr["localstack_session"] = localstack_session
-
-            @property
-            def _components(self):
-                if isinstance(self, Session):
-                    try:
-                        return self.__dict__["_components"]
-                    except KeyError:
-                        raise AttributeError("_components")
-                proxy_components = botocore.session.Session._proxy_components
-                if self not in proxy_components:
-                    proxy_components[self] = botocore.session.ComponentLocator()
-                    self._register_components()
-                return proxy_components[self]
-
-            @_components.setter
-            def _components(self, value):
-                self.__dict__["_components"] = value
-
-            @property
-            def _internal_components(self):
-                if isinstance(self, Session):
-                    try:
-                        return self.__dict__["_internal_components"]
-                    except KeyError:
-                        raise AttributeError("_internal_components")
-                proxy_components = botocore.session.Session._proxy_components
-                if self not in proxy_components:
-                    proxy_components[self] = DebugComponentLocator()  # noqa
-                    self._register_components()
-                return proxy_components[self]
-
-            @_internal_components.setter
-            def _internal_components(self, value):
-                self.__dict__["_internal_components"] = value
-
-            attr.update(
-                {
-                    "_components": _components,
-                    "_internal_components": _internal_components,
-                    "_proxy_components": weakref.WeakKeyDictionary(),
-                }
-            )
-
-            @property
-            def _credentials(self):
-                return self._proxy_credentials.get(self)
-
-            @_credentials.setter
-            def _credentials(self, value):
-                self._proxy_credentials[self] = value
-
-            attr.update(
-                {
-                    "_credentials": _credentials,
-                    "_proxy_credentials": weakref.WeakKeyDictionary(),
-                }
-            )
-
-            patches.append(
-                mock.patch.multiple("botocore.session.Session", create=True, **attr)
-            )
-            patches.append(
-                mock.patch.multiple(
-                    botocore.session.Session,
-                    _register_endpoint_resolver=utils.unbind(
-                        Session._register_endpoint_resolver
-                    ),
-                    _register_credential_provider=utils.unbind(
-                        Session._register_credential_provider
-                    ),
-                    create_client=utils.unbind(Session.create_client),
-                )
-            )
-
-            # Step 2: Safety checks
-            # Make absolutly sure we use Localstack and not AWS.
-            _original_convert_to_request_dict = (
-                botocore.client.BaseClient._convert_to_request_dict
-            )
-
-            @functools.wraps(_original_convert_to_request_dict)
-            def _convert_to_request_dict(self, *args, **kwargs):
-                request_dict = _original_convert_to_request_dict(self, *args, **kwargs)
-                if not (
-                    factory.localstack_session.hostname in request_dict["url"]
-                    or socket.gethostname() in request_dict["url"]
-                ):
-                    # The URL of the request points to something other than localstack.
-                    raise Exception("request dict is not patched")
-                return request_dict
-
-            patches.append(
-                mock.patch(
-                    "botocore.client.BaseClient._convert_to_request_dict",
-                    _convert_to_request_dict,
-                )
-            )
-
-            # Step 3: Patch existing clients
-            # Patching botocore Session doesn't help with an existing
-            # botocore Clients objects. They will have already been created with
-            # endpoints aimed at AWS. We need to patch botocore.client.BaseClient
-            # to temporarially act like a Localstack.
-            original_init = botocore.client.BaseClient.__init__
-
-            @functools.wraps(original_init)
-            def new_init(self, *args, **kwargs):
-                # Every client created during the patch is a Localstack client.
-                # Set this flag so that the proxy_client_attr() stuff below
-                # won't break during original_init().
-                self._is_pytest_localstack = True
-                original_init(self, *args, **kwargs)
-
-            patches.append(
-                mock.patch.multiple(botocore.client.BaseClient, __init__=new_init)
-            )
-
-            # Create a place to store proxy clients.
-            patches.append(
-                mock.patch(
-                    "botocore.client.BaseClient._proxy_clients",
-                    weakref.WeakKeyDictionary(),
-                    create=True,
-                )
-            )
-
-            def new_getattribute(self, key):
-                if key.startswith("__"):
-                    return object.__getattribute__(self, key)
-                proxied_keys = [
-                    "_cache",
-                    "_client_config",
-                    "_endpoint",
-                    "_exceptions_factory",
-                    "_exceptions",
-                    "exceptions",
-                    "_loader",
-                    "_request_signer",
-                    "_response_parser",
-                    "_serializer",
-                    "meta",
-                ]
-                __dict__ = object.__getattribute__(self, "__dict__")
-                if (
-                    __dict__.get("_is_pytest_localstack", False)
-                    or key not in proxied_keys
-                ):
-                    # Don't proxy clients that are already Localstack clients
-                    return object.__getattribute__(self, key)
-                if self not in botocore.client.BaseClient._proxy_clients:
-                    try:
-                        meta = __dict__["meta"]
-                    except KeyError:
-                        raise AttributeError("meta")
-                    proxy = factory.default_session.create_client(
-                        meta.service_model.service_name,
-                        # config=config,
-                        config=__dict__["_client_config"],
-                    )
-                    botocore.client.BaseClient._proxy_clients[self] = proxy
-                return object.__getattribute__(
-                    botocore.client.BaseClient._proxy_clients[self], key
-                )
-
-            patches.append(
-                mock.patch(
-                    "botocore.client.BaseClient.__getattribute__",
-                    new_getattribute,
-                    create=True,
-                )
-            )
-
-            # STS is sneaky and even after patching the endpoint it has a final custom check
-            # to see whether it should override with the global endpoint url... patch that too
-
-            patches.append(
-                mock.patch(
-                    "botocore.args.ClientArgsCreator._should_set_global_sts_endpoint",
-                    lambda *args, **kwargs: False,
-                )
-            )
-
-            with utils.nested(*patches):
+        #   that overrides specific properties of the Client instances,
+        #   or find the instances with the garbage collector
+        #   (the "retarget" strategy).
+        patch_sets = [_session_patches]
+        if strategy == "proxy":
+            patch_sets.append(_proxy_patches)
+        with _bind(self, host_check, patch_sets):
+            if strategy == "retarget":
+                with _retarget_existing_clients(self):
+                    yield
+            else:
                 yield
-        finally:
-            logger.debug("exit patch")
-            if boto3 is not None:
-                boto3.DEFAULT_SESSION = preexisting_boto3_session
 
 
 def patch_fixture(
@@ -340,6 +284,9 @@ def patch_fixture(
     auto_remove=True,
     pull_image=True,
     container_name=None,
+    background_start=False,
+    patch_strategy="proxy",
+    host_check="strict",
     **kwargs,
 ):
     """Create a pytest fixture that temporarially redirects all botocore
@@ -386,10 +333,24 @@ def patch_fixture(
             image to use. Defaults to :const:`"latest"`.
         auto_remove (bool, optional): If :obj:`True`, delete the Localstack
             container when it stops. Default: :obj:`True`
-        pull_image (bool, optional): If :obj:`True`, pull the Localstack
-            image before running it. Default: :obj:`True`
+        pull_image (bool, str, optional): If :obj:`True`, pull the Localstack
+            image before running it, following ``--localstack-pull-policy``.
+            Can also be a policy: ``"always"``, ``"if-missing"``,
+            ``"ttl=<seconds>"`` or ``"never"``. Default: :obj:`True`
         container_name (str, optional): The name for the Localstack
             container. Defaults to a randomly generated id.
+        background_start (bool, optional): If :obj:`True`, start the
+            Localstack container in a background thread as soon as the
+            pytest session starts, so it boots while tests are collected.
+            Requires ``scope="session"``. Default: :obj:`False`
+        patch_strategy (str, optional): How to redirect botocore clients
+            created before the fixture, see
+            :meth:`BotocoreTestResourceFactory.patch_botocore`.
+            Default: :const:`"proxy"`
+        host_check (str, optional): Which request hosts count as
+            Localstack, see
+            :meth:`BotocoreTestResourceFactory.patch_botocore`.
+            Default: :const:`"strict"`
         **kwargs: Additional kwargs will be passed to the
             :class:`.LocalstackSession`.
 
@@ -397,25 +358,39 @@ def patch_fixture(
         A :func:`pytest fixture <_pytest.fixtures.fixture>`.
 
     """
+    if patch_strategy not in PATCH_STRATEGIES:
+        raise ValueError(
+            "patch_strategy must be one of %s, not %r"
+            % (", ".join(PATCH_STRATEGIES), patch_strategy)
+        )
+    if host_check not in HOST_CHECKS:
+        raise ValueError(
+            "host_check must be one of %s, not %r"
+            % (", ".join(HOST_CHECKS), host_check)
+        )
+    session_kwargs = dict(
+        docker_client=docker_client,
+        services=services,
+        region_name=region_name,
+        kinesis_error_probability=kinesis_error_probability,
+        dynamodb_error_probability=dynamodb_error_probability,
+        container_log_level=container_log_level,
+        localstack_version=localstack_version,
+        auto_remove=auto_remove,
+        pull_image=pull_image,
+        container_name=container_name,
+        **kwargs,
+    )
+    starter = _background_starter(scope, session_kwargs) if background_start else None
 
     @pytest.fixture(scope=scope, autouse=autouse)
-    def _fixture(pytestconfig):
+    def _fixture(pytestconfig, request):
         if not pytestconfig.pluginmanager.hasplugin("localstack"):
             pytest.skip("skipping because localstack plugin isn't loaded")
-        with _make_session(
-            docker_client=docker_client,
-            services=services,
-            region_name=region_name,
-            kinesis_error_probability=kinesis_error_probability,
-            dynamodb_error_probability=dynamodb_error_probability,
-            container_log_level=container_log_level,
-            localstack_version=localstack_version,
-            auto_remove=auto_remove,
-            pull_image=pull_image,
-            container_name=container_name,
-            **kwargs,
-        ) as session:
-            with session.botocore.patch_botocore():
+        with _fixture_session(request, starter, session_kwargs) as session:
+            with session.botocore.patch_botocore(
+                strategy=patch_strategy, host_check=host_check
+            ):
                 yield session
 
     return _fixture
@@ -424,6 +399,672 @@ def patch_fixture(
 # Grab a reference here to avoid breaking things during patching.
 _original_create_client = utils.unbind(botocore.session.Session.create_client)
 
+_create_client_signature = inspect.signature(inspect.unwrap(_original_create_client))
+
+
+def _client_cache_key(service_name, default_region_name, args, kwargs):
+    """Return a hashable key for ``create_client()`` arguments.
+
+    Arguments that create the same client give the same key, whether
+    they're passed by position or keyword, or left to their defaults.
+    """
+    callargs = _create_client_signature.bind(None, service_name, *args, **kwargs)
+    callargs.apply_defaults()
+    key = []
+    for name, value in callargs.arguments.items():
+        if name == "self":
+            continue
+        if name == "region_name" and not value:
+            value = default_region_name
+        if isinstance(value, botocore.config.Config):
+            options = getattr(value, "_user_provided_options", vars(value))
+            value = tuple(sorted((k, repr(v)) for k, v in options.items()))
+        else:
+            value = repr(value)
+        key.append((name, value))
+    return tuple(key)
+
+
+# Attributes of botocore clients created before patch_botocore() that
+# are read from a Localstack client instead.
+_PROXIED_CLIENT_ATTRS = frozenset(
+    [
+        "_cache",
+        "_client_config",
+        "_endpoint",
+        "_exceptions_factory",
+        "_exceptions",
+        "exceptions",
+        "_loader",
+        "_request_signer",
+        "_response_parser",
+        "_serializer",
+        "meta",
+    ]
+)
+
+_RETARGETED_CLIENT_ATTRS = _PROXIED_CLIENT_ATTRS | {"_is_pytest_localstack"}
+
+# Ways patch_botocore() can redirect clients created before patching.
+PATCH_STRATEGIES = ("proxy", "retarget")
+
+HOST_CHECKS = ("strict", "lenient")
+
+
+def _localstack_hosts(localstack_session):
+    """Return the lowercased hostnames that reach `localstack_session`."""
+    hosts = {
+        localstack_session.hostname,
+        "localhost",
+        constants.LOCALHOST,
+        "::1",
+        socket.gethostname(),
+    }
+    return frozenset(host.lower() for host in hosts if host)
+
+
+def _make_host_check(hosts, mode):
+    """Return a function that tells if a request hostname is Localstack.
+
+    Args:
+        hosts (frozenset): Lowercased hostnames from :func:`_localstack_hosts`.
+        mode (str): One of :data:`HOST_CHECKS`.
+
+    """
+    if mode == "strict":
+        return hosts.__contains__
+    suffixes = tuple("." + host for host in hosts)
+
+    @functools.lru_cache(maxsize=64)
+    def is_localstack_host(host):
+        if not host:
+            return False
+        if host in hosts or host.endswith(suffixes):
+            return True
+        try:
+            return ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            return False
+
+    return is_localstack_host
+
+
+# The binding of the current thread or asyncio task, see patch_botocore().
+_current_binding = contextvars.ContextVar("pytest_localstack_botocore", default=None)
+
+# Active bindings in the order they were entered. Contexts without an
+# active binding of their own use the last one.
+_active_bindings = []
+
+# Protects _active_bindings and installing or removing the patches.
+_patch_lock = threading.Lock()
+
+
+class _Binding:
+    """Where botocore calls go in the contexts bound by one patch_botocore().
+
+    Botocore sessions and clients that existed before patching get
+    Localstack stand-ins, which are kept here so that each binding has its
+    own and they're dropped when it ends.
+    """
+
+    def __init__(self, factory, host_check):
+        self.factory = factory
+        self.localstack_session = factory.localstack_session
+        self.is_localstack_host = _make_host_check(
+            _localstack_hosts(factory.localstack_session), host_check
+        )
+        self.components = weakref.WeakKeyDictionary()
+        self.credentials = weakref.WeakKeyDictionary()
+        self.proxy_clients = weakref.WeakKeyDictionary()
+        self.active = True
+
+
+def _get_binding():
+    """Return the :class:`_Binding` for the current context, if any."""
+    binding = _current_binding.get()
+    if binding is not None and binding.active:
+        return binding
+    try:
+        return _active_bindings[-1]
+    except IndexError:
+        # Nothing is patched right now.
+        return None
+
+
+@contextlib.contextmanager
+def _bind(factory, host_check, patch_sets):
+    """Route botocore to `factory`'s session in the current context.
+
+    Args:
+        factory (:class:`BotocoreTestResourceFactory`): The factory to
+            route to.
+        host_check (str): One of :data:`HOST_CHECKS`.
+        patch_sets (list): The :class:`_PatchSet` objects to hold while
+            bound.
+
+    """
+    logger.debug("enter patch")
+    binding = _Binding(factory, host_check)
+    with _patch_lock:
+        for patch_set in patch_sets:
+            patch_set.acquire()
+        _active_bindings.append(binding)
+    token = _current_binding.set(binding)
+    try:
+        yield binding
+    finally:
+        logger.debug("exit patch")
+        binding.active = False
+        try:
+            _current_binding.reset(token)
+        except ValueError:
+            # Exited in another thread or task than it was entered in.
+            # That context keeps a binding, but it's inactive now.
+            pass
+        with _patch_lock:
+            _active_bindings.remove(binding)
+            for patch_set in reversed(patch_sets):
+                patch_set.release()
+
+
+def _check_request_host(request_dict):
+    """Raise if a request made while bound doesn't go to Localstack."""
+    binding = _get_binding()
+    if binding is None:
+        return
+    host = urllib.parse.urlsplit(request_dict["url"]).hostname
+    if not binding.is_localstack_host(host):
+        # The URL of the request points to something other than localstack.
+        binding.factory.blocked_requests[host] += 1
+        raise exceptions.UnpatchedRequestError(request_dict["url"])
+
+
+class _PatchSet:
+    """Patches that stay applied while anyone holds them.
+
+    Only used with :data:`_patch_lock` held.
+
+    Args:
+        make_patches (callable): Returns the patches, as context managers.
+
+    """
+
+    def __init__(self, make_patches):
+        self.make_patches = make_patches
+        self.holders = 0
+        self._stack = None
+
+    def acquire(self):
+        """Apply the patches, unless they are already."""
+        if not self.holders:
+            with contextlib.ExitStack() as stack:
+                for patch in self.make_patches():
+                    stack.enter_context(patch)
+                self._stack = stack.pop_all()
+        self.holders += 1
+
+    def release(self):
+        """Undo the patches when the last holder releases them."""
+        self.holders -= 1
+        if not self.holders:
+            self._stack.close()
+            self._stack = None
+
+
+# Grab references here to call when a context isn't bound to Localstack.
+_original_session_methods = {
+    name: utils.unbind(getattr(botocore.session.Session, name))
+    for name in ("_register_endpoint_resolver", "_register_credential_provider")
+}
+_original_convert_to_request_dict = utils.unbind(
+    botocore.client.BaseClient._convert_to_request_dict
+)
+_original_client_init = utils.unbind(botocore.client.BaseClient.__init__)
+
+
+def _make_session_patches():
+    """Return the patches that route botocore sessions and new clients."""
+    # Step 1: patch botocore Session to use Localstack.
+    patches = [_restore_boto3_default_session()]
+    attr = {}
+
+    @property
+    def localstack_session(self):
+        # Simlate the 'localstack_session' attr from Session class below.
+        # Patch this into the botocore Session class.
+        if "localstack_session" in self.__dict__:
+            # We're patching this into the base botocore Session,
+            # but we don't want to override things for the Session
+            # subclass below.
+            return self.__dict__["localstack_session"]
+        binding = _get_binding()
+        if binding is None:
+            raise AttributeError("localstack_session")
+        return binding.localstack_session
+
+    @localstack_session.setter
+    def localstack_session(self, value):
+        if not isinstance(value, RunningSession):
+            raise TypeError(
+                f"localstack_session value is type {value.__class__.__name__}, must be a LocalstackSession"
+            )
+        self.__dict__["localstack_session"] = value
+
+    attr["localstack_session"] = localstack_session
+
+    def get_components(self, name):
+        if not isinstance(self, Session):
+            binding = _get_binding()
+            if binding is not None:
+                proxy_components = binding.components
+                if self not in proxy_components:
+                    proxy_components[self] = botocore.session.ComponentLocator()
+                    self._register_components()
+                return proxy_components[self]
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    @property
+    def _components(self):
+        return get_components(self, "_components")
+
+    @_components.setter
+    def _components(self, value):
+        self.__dict__["_components"] = value
+
+    @property
+    def _internal_components(self):
+        return get_components(self, "_internal_components")
+
+    @_internal_components.setter
+    def _internal_components(self, value):
+        self.__dict__["_internal_components"] = value
+
+    attr["_components"] = _components
+    attr["_internal_components"] = _internal_components
+
+    @property
+    def _credentials(self):
+        binding = _get_binding()
+        if binding is None:
+            return self.__dict__.get("_credentials")
+        return binding.credentials.get(self)
+
+    @_credentials.setter
+    def _credentials(self, value):
+        binding = _get_binding()
+        if binding is None:
+            self.__dict__["_credentials"] = value
+        else:
+            binding.credentials[self] = value
+
+    attr["_credentials"] = _credentials
+
+    def _register_endpoint_resolver(self):
+        binding = _get_binding()
+        if binding is None:
+            return _original_session_methods["_register_endpoint_resolver"](self)
+        return _register_localstack_endpoint_resolver(self, binding.localstack_session)
+
+    def _register_credential_provider(self):
+        if _get_binding() is None:
+            return _original_session_methods["_register_credential_provider"](self)
+        return Session._register_credential_provider(self)
+
+    def create_client(self, *args, **kwargs):
+        if _get_binding() is None:
+            return _original_create_client(self, *args, **kwargs)
+        return Session.create_client(self, *args, **kwargs)
+
+    attr.update(
+        {
+            "_register_endpoint_resolver": _register_endpoint_resolver,
+            "_register_credential_provider": _register_credential_provider,
+            "create_client": functools.wraps(_original_create_client)(create_client),
+        }
+    )
+    patches.append(
+        mock.patch.multiple("botocore.session.Session", create=True, **attr)
+    )
+
+    # Step 2: Safety checks
+    # Make absolutly sure we use Localstack and not AWS.
+    @functools.wraps(_original_convert_to_request_dict)
+    def _convert_to_request_dict(self, *args, **kwargs):
+        request_dict = _original_convert_to_request_dict(self, *args, **kwargs)
+        _check_request_host(request_dict)
+        return request_dict
+
+    # Step 3: Mark new clients
+    # Every client created during the patch is a Localstack client.
+    # Set this flag so that the _ProxiedClientAttribute stuff below
+    # won't break during the original __init__().
+    @functools.wraps(_original_client_init)
+    def new_init(self, *args, **kwargs):
+        if _get_binding() is not None:
+            self._is_pytest_localstack = True
+        _original_client_init(self, *args, **kwargs)
+
+    patches.append(
+        mock.patch.multiple(
+            botocore.client.BaseClient,
+            _convert_to_request_dict=_convert_to_request_dict,
+            __init__=new_init,
+        )
+    )
+
+    # STS is sneaky and even after patching the endpoint it has a final custom check
+    # to see whether it should override with the global endpoint url... patch that too
+    original_should_set_global_sts_endpoint = (
+        botocore.args.ClientArgsCreator._should_set_global_sts_endpoint
+    )
+
+    @functools.wraps(original_should_set_global_sts_endpoint)
+    def _should_set_global_sts_endpoint(self, *args, **kwargs):
+        if _get_binding() is None:
+            return original_should_set_global_sts_endpoint(self, *args, **kwargs)
+        return False
+
+    patches.append(
+        mock.patch.object(
+            botocore.args.ClientArgsCreator,
+            "_should_set_global_sts_endpoint",
+            _should_set_global_sts_endpoint,
+        )
+    )
+    return patches
+
+
+@contextlib.contextmanager
+def _restore_boto3_default_session():
+    """Put back boto3's default session, which may be made while patched."""
+    if boto3 is None:
+        yield
+        return
+    preexisting_boto3_session = boto3.DEFAULT_SESSION
+    try:
+        yield
+    finally:
+        boto3.DEFAULT_SESSION = preexisting_boto3_session
+
+
+def _make_proxy_patches():
+    """Return patches that redirect existing clients through proxy clients.
+
+    Patching botocore Session doesn't help with an existing botocore
+    Clients objects. They will have already been created with endpoints
+    aimed at AWS. We need to patch botocore.client.BaseClient to
+    temporarially act like a Localstack client.
+    """
+
+    def get_proxy_client(client):
+        binding = _get_binding()
+        if binding is None:
+            return client
+        proxy_clients = binding.proxy_clients
+        try:
+            return proxy_clients[client]
+        except KeyError:
+            pass
+        __dict__ = client.__dict__
+        try:
+            meta = __dict__["meta"]
+        except KeyError:
+            raise AttributeError("meta")
+        proxy = binding.factory.default_session.create_client(
+            meta.service_model.service_name,
+            config=__dict__["_client_config"],
+        )
+        proxy_clients[client] = proxy
+        return proxy
+
+    # Only the proxied attributes are replaced, with descriptors,
+    # so every other attribute lookup (like API methods) runs at
+    # full speed. botocore makes a new class for every client, so
+    # only the classes of clients that exist already are patched and
+    # clients created while patched, which are Localstack clients,
+    # don't pay for the descriptors at all.
+    return [
+        mock.patch.multiple(
+            client_class,
+            create=True,
+            **{
+                name: _ProxiedClientAttribute(
+                    name, _class_attribute(client_class, name), get_proxy_client
+                )
+                for name in _PROXIED_CLIENT_ATTRS
+            },
+        )
+        for client_class in _existing_client_classes()
+    ]
+
+
+def _existing_client_classes():
+    """Return the client classes botocore has made so far.
+
+    Subclasses of these classes inherit their patches.
+    """
+    client_classes = []
+    seen = set()
+    pending = [botocore.client.BaseClient]
+    while pending:
+        for subclass in type.__subclasses__(pending.pop()):
+            if subclass in seen:
+                continue
+            seen.add(subclass)
+            if "_PY_TO_OP_NAME" in vars(subclass):
+                # Made by botocore.client.ClientCreator.
+                client_classes.append(subclass)
+            else:
+                pending.append(subclass)
+    return client_classes
+
+
+def _class_attribute(cls, name):
+    """Return what `cls` defines for `name`, without calling descriptors."""
+    for klass in cls.__mro__:
+        if name in vars(klass):
+            return vars(klass)[name]
+    return None
+
+
+_session_patches = _PatchSet(_make_session_patches)
+_proxy_patches = _PatchSet(_make_proxy_patches)
+
+
+@contextlib.contextmanager
+def _retarget_existing_clients(factory):
+    """Point botocore clients that exist right now at Localstack, in place.
+
+    The attributes that the proxy strategy would read from a Localstack
+    client are copied from one instead, and put back on exit.
+    """
+    # type() instead of isinstance() because some objects' __class__
+    # raises, e.g. lazy proxies.
+    clients = [
+        obj
+        for obj in gc.get_objects()
+        if issubclass(type(obj), botocore.client.BaseClient)
+        and not obj.__dict__.get("_is_pytest_localstack", False)
+    ]
+    retargeted = []
+    client = None
+    try:
+        for client in clients:
+            __dict__ = client.__dict__
+            try:
+                service_name = __dict__["meta"].service_model.service_name
+            except KeyError:
+                # Not initialized (yet).
+                continue
+            proxy = factory.default_session.create_client(
+                service_name, config=__dict__.get("_client_config")
+            )
+            saved = {
+                name: __dict__[name]
+                for name in _RETARGETED_CLIENT_ATTRS
+                if name in __dict__
+            }
+            retargeted.append((weakref.ref(client), saved))
+            for name in _PROXIED_CLIENT_ATTRS:
+                if name in proxy.__dict__:
+                    __dict__[name] = proxy.__dict__[name]
+            # Proxies from other patches mustn't override the new attributes.
+            __dict__["_is_pytest_localstack"] = True
+        # Don't keep the clients alive while patched.
+        del clients, client
+        logger.debug("retargeted %i existing botocore clients", len(retargeted))
+        yield
+    finally:
+        for client_ref, saved in retargeted:
+            client = client_ref()
+            if client is None:
+                continue
+            for name in _RETARGETED_CLIENT_ATTRS:
+                if name in saved:
+                    client.__dict__[name] = saved[name]
+                else:
+                    client.__dict__.pop(name, None)
+
+
+class _ProxiedClientAttribute:
+    """Read a botocore client attribute from the client's Localstack proxy.
+
+    Set on the classes of clients that existed before botocore was
+    patched. Clients of those classes that are Localstack clients
+    already use their own attribute.
+
+    Args:
+        name (str): The attribute name.
+        original: What :class:`botocore.client.BaseClient` defines for
+            `name`, if anything, like the ``exceptions`` property.
+        get_proxy_client (callable): Returns the Localstack proxy
+            for a client.
+
+    """
+
+    def __init__(self, name, original, get_proxy_client):
+        self.name = name
+        self.original = original
+        self.get_proxy_client = get_proxy_client
+
+    def __get__(self, client, owner=None):
+        if client is None:
+            return self
+        if not client.__dict__.get("_is_pytest_localstack", False):
+            client = self.get_proxy_client(client)
+        if self.original is not None:
+            return self.original.__get__(client, owner)
+        try:
+            return client.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+    def __set__(self, client, value):
+        client.__dict__[self.name] = value
+
+    def __delete__(self, client):
+        try:
+            del client.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+
+# Localstack doesn't use the virtual host addressing style.
+_LOCALSTACK_CLIENT_CONFIG = botocore.config.Config(s3={"addressing_style": "path"})
+
+# Position of create_client()'s `config` argument after `service_name`.
+_CREATE_CLIENT_CONFIG_INDEX = (
+    list(_create_client_signature.parameters).index("config") - 2
+)
+
+
+def _add_localstack_config(
+    args, kwargs, config_index, localstack_config, default_config=None
+):
+    """Merge `localstack_config` into ``create_client()`` arguments.
+
+    Args:
+        args (tuple): Positional arguments after `service_name`.
+        kwargs (dict): Keyword arguments.
+        config_index (int): Position of `config` in `args`.
+        localstack_config (:class:`botocore.config.Config`): Config that
+            Localstack needs. It wins over the caller's.
+        default_config (:class:`botocore.config.Config`, optional): Config
+            that the caller's wins over.
+
+    Returns:
+        tuple: The new `args` and `kwargs`.
+
+    """
+
+    def merge(config):
+        if default_config is not None:
+            config = default_config.merge(config) if config else default_config
+        return config.merge(localstack_config) if config else localstack_config
+
+    if len(args) > config_index:
+        args = list(args)
+        args[config_index] = merge(args[config_index])
+    else:
+        kwargs["config"] = merge(kwargs.get("config"))
+    return args, kwargs
+
+
+def _connection_config(session_kwargs):
+    """Return the client config for a session's connection settings, if any."""
+    options = {
+        name: session_kwargs[name]
+        for name in ("max_pool_connections", "tcp_keepalive")
+        if session_kwargs.get(name) is not None
+    }
+    if not options:
+        return None
+    return botocore.config.Config(**options)
+
+
+class _SharedHTTPSession:
+    """A botocore HTTP session that several clients' endpoints share.
+
+    Closing one of the clients mustn't close the connections of the others,
+    so only :meth:`close_shared` closes them.
+    """
+
+    def __init__(self, http_session):
+        self._http_session = http_session
+
+    def send(self, request):
+        """Send `request` over the shared connection pool."""
+        return self._http_session.send(request)
+
+    def close(self):
+        """Do nothing, other clients still use the connections."""
+
+    def close_shared(self):
+        """Close the connection pool for every client."""
+        self._http_session.close()
+
+
+# Loaders cache the JSON models they parse, so sharing one loader per
+# data path means each model is read from disk once per process
+# instead of once per Session.
+_shared_loaders = {}
+_shared_loaders_lock = threading.Lock()
+
+
+def _get_shared_loader(data_path):
+    """Return the process-wide botocore loader for `data_path`."""
+    with _shared_loaders_lock:
+        try:
+            return _shared_loaders[data_path]
+        except KeyError:
+            loader = botocore.loaders.create_loader(data_path)
+            _shared_loaders[data_path] = loader
+            return loader
+
 
 class Session(botocore.session.Session):
     """A botocore Session subclass that talks to Localstack."""
@@ -431,44 +1072,60 @@ class Session(botocore.session.Session):
     def __init__(self, localstack_session, *args, **kwargs):
         self.localstack_session = localstack_session
         super(Session, self).__init__(*args, **kwargs)
+        # Localstack has no global STS endpoint. Unlike patching
+        # ClientArgsCreator, this only affects this session.
+        self.set_config_variable("sts_regional_endpoints", "regional")
+
+    def _register_data_loader(self):
+        self._components.lazy_register_component(
+            "data_loader",
+            lambda: _get_shared_loader(self.get_config_variable("data_path")),
+        )
 
     def _register_endpoint_resolver(self):
-        def create_default_resolver():
-            loader = self.get_component("data_loader")
-            endpoints = loader.load_data("endpoints")
-            return LocalstackEndpointResolver(self.localstack_session, endpoints)
-
-        if constants.BOTOCORE_VERSION >= (1, 10, 58):
-            self._internal_components.lazy_register_component(
-                "endpoint_resolver", create_default_resolver
-            )
-        else:
-            self._components.lazy_register_component(
-                "endpoint_resolver", create_default_resolver
-            )
+        _register_localstack_endpoint_resolver(self, self.localstack_session)
 
     def _register_credential_provider(self):
         self._components.lazy_register_component(
             "credential_provider", create_credential_resolver
         )
 
-    def create_client(self, *args, **kwargs):
+    def create_client(self, service_name, *args, **kwargs):
         """Create a botocore client."""
-        # Localstack doesn't use the virtual host addressing style.
-        config = botocore.config.Config(s3={"addressing_style": "path"})
-        callargs = inspect.getcallargs(_original_create_client, self, *args, **kwargs)
-        if callargs.get("config"):
-            config = callargs["config"].merge(config)
-        callargs["config"] = config
-        with mock.patch(
-            "botocore.args.ClientArgsCreator._should_set_global_sts_endpoint",
-            lambda *args, **kwargs: False,
-        ):
-            client = _original_create_client(**callargs)
+        factory = getattr(self.localstack_session, "botocore", None)
+        args, kwargs = _add_localstack_config(
+            args,
+            kwargs,
+            _CREATE_CLIENT_CONFIG_INDEX,
+            _LOCALSTACK_CLIENT_CONFIG,
+            factory.client_config if factory is not None else None,
+        )
+        client = _original_create_client(self, service_name, *args, **kwargs)
         client._is_pytest_localstack = True
+        if factory is not None:
+            factory.share_http_session(client)
+        profiling.instrument(client)
         return client
 
 
+def _register_localstack_endpoint_resolver(session, localstack_session):
+    """Make `session` resolve endpoints to `localstack_session`."""
+
+    def create_default_resolver():
+        loader = session.get_component("data_loader")
+        endpoints = loader.load_data("endpoints")
+        return LocalstackEndpointResolver(localstack_session, endpoints)
+
+    if constants.BOTOCORE_VERSION >= (1, 10, 58):
+        session._internal_components.lazy_register_component(
+            "endpoint_resolver", create_default_resolver
+        )
+    else:
+        session._components.lazy_register_component(
+            "endpoint_resolver", create_default_resolver
+        )
+
+
 def create_credential_resolver():
     """Create a credentials resolver for Localstack."""
     env_provider = botocore.credentials.EnvProvider()
@@ -495,16 +1152,68 @@ class DefaultCredentialProvider(botocore.credentials.CredentialProvider):
 
 
 class LocalstackEndpointResolver(botocore.regions.EndpointResolver):
-    """Resolve AWS service endpoints based on a LocalstackSession."""
+    """Resolve AWS service endpoints based on a LocalstackSession.
+
+    Endpoints for the session's services and region are looked up in
+    ``endpoints.json`` once, when the resolver is created. Resolving an
+    endpoint afterwards is a dictionary lookup plus the session's host
+    and port, which are only known once Localstack runs.
+    """
 
     def __init__(self, localstack_session, endpoints):
         self.localstack_session = localstack_session
         super(LocalstackEndpointResolver, self).__init__(endpoints)
-
-    @property
-    def valid_regions(self):
-        """Return a list of regions we can resolve endpoints for."""
-        return set([self.localstack_session.region_name, "aws-global"])
+        self.valid_regions = frozenset([localstack_session.region_name, "aws-global"])
+        self._aws_partitions = [
+            partition
+            for partition in self._endpoint_data["partitions"]
+            if partition["partition"] == "aws"
+        ]
+        # service name -> (all endpoint names, endpoint names in valid_regions)
+        self._available_endpoints = {}
+        for partition in self._aws_partitions:
+            for service_name, service in partition["services"].items():
+                all_names, regional_names = self._available_endpoints.setdefault(
+                    service_name, ([], [])
+                )
+                for endpoint_name in service["endpoints"]:
+                    all_names.append(endpoint_name)
+                    if endpoint_name in self.valid_regions:
+                        regional_names.append(endpoint_name)
+        # (service name, region name, dualstack, fips) -> endpoint, without
+        # the hostname. Filled up front for the session's services in
+        # the default variant, and on first use for anything else.
+        self._endpoints = {}
+        session_services = localstack_session.services
+        for service_name in self._available_endpoints:
+            if (
+                constants.SERVICE_ALIASES.get(service_name, service_name)
+                in session_services
+            ):
+                for region_name in self.valid_regions:
+                    self._index_endpoint(service_name, region_name, False, False)
+
+    def _index_endpoint(
+        self, service_name, region_name, use_dualstack_endpoint, use_fips_endpoint
+    ):
+        key = (service_name, region_name, use_dualstack_endpoint, use_fips_endpoint)
+        result = None
+        for partition in self._aws_partitions:
+            result = self._endpoint_for_partition(
+                partition,
+                service_name,
+                region_name,
+                use_dualstack_endpoint,
+                use_fips_endpoint,
+            )
+            if result:
+                if not self.localstack_session.use_ssl:
+                    result["protocols"] = ["http"]
+                    result.pop("sslCommonName", None)
+                result["dnsSuffix"] = self.localstack_session.hostname
+                break
+        self._endpoints[key] = result
+        return result
 
     def get_available_partitions(self):
         """List the partitions available to the endpoint resolver."""
@@ -516,17 +1225,11 @@ class LocalstackEndpointResolver(botocore.regions.EndpointResolver):
         """List the endpoint names of a particular partition."""
         if partition_name != "aws":
             raise exceptions.UnsupportedPartitionError(partition_name)
-        result = []
-        for partition in self._endpoint_data["partitions"]:
-            if partition["partition"] != "aws":
-                continue
-            services = partition["services"]
-            if service_name not in services:
-                continue
-            for endpoint_name in services[service_name]["endpoints"]:
-                if allow_non_regional or endpoint_name in self.valid_regions:
-                    result.append(endpoint_name)
-        return result
+        try:
+            all_names, regional_names = self._available_endpoints[service_name]
+        except KeyError:
+            return []
+        return list(all_names if allow_non_regional else regional_names)
 
     def construct_endpoint(
         self,
@@ -543,24 +1246,12 @@ class LocalstackEndpointResolver(botocore.regions.EndpointResolver):
             raise exceptions.RegionError(
                 region_name, self.localstack_session.region_name
             )
-        for partition in self._endpoint_data["partitions"]:
-            if partition["partition"] != "aws":
-                continue
-            result = self._endpoint_for_partition(
-                partition,
-                service_name,
-                region_name,
-                use_dualstack_endpoint,
-                use_fips_endpoint,
-            )
-            if result:
-                result["hostname"] = self.localstack_session.service_hostname(
-                    service_name
-                )
-                result["protocols"] = (
-                    result["protocols"] if self.localstack_session.use_ssl else ["http"]
-                )
-                if not self.localstack_session.use_ssl:
-                    result.pop("sslCommonName", None)
-                result["dnsSuffix"] = self.localstack_session.hostname
-                return result
+        key = (service_name, region_name, use_dualstack_endpoint, use_fips_endpoint)
+        try:
+            endpoint = self._endpoints[key]
+        except KeyError:
+            endpoint = self._index_endpoint(*key)
+        if endpoint:
+            result = dict(endpoint)
+            result["hostname"] = self.localstack_session.service_hostname(service_name)
+            return result
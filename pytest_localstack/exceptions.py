@@ -33,6 +33,23 @@ class ContainerAlreadyStartedError(Error):
         super(ContainerAlreadyStartedError, self).__init__(msg, *args, **kwargs)
 
 
+class ResetError(Error):
+    """Raised when resetting would wipe state that other sessions use."""
+
+
+class SnapshotError(Error):
+    """Raised when Localstack state can't be snapshotted or restored."""
+
+
+class UnpatchedRequestError(Error):
+    """Raised when a patched botocore client sends a request outside Localstack."""
+
+    def __init__(self, url):
+        super(UnpatchedRequestError, self).__init__(
+            "request dict is not patched, it points to %s" % (url,)
+        )
+
+
 class TimeoutError(Error):
     """Raised when :meth:`~.LocalstackSession.start` takes too long."""
 
@@ -60,3 +77,7 @@ class RegionError(Error):
             "This LocalstackSession is configured for region %s, not %s"
             % (should_be_region, region_name)
         )
+
+
+class SlowCallWarning(UserWarning):
+    """Warns about an AWS call slower than ``--localstack-slow-call``."""
@@ -0,0 +1,146 @@
+"""Decide when the Localstack Docker image needs to be pulled."""
+import collections
+import logging
+import time
+
+import docker
+
+
+logger = logging.getLogger(__name__)
+
+# Key for remembering image pulls in a pytest cache.
+PULL_CACHE_KEY = "pytest-localstack/image-pulls"
+
+
+class PullPolicy:
+    """When to pull a Docker image before running it.
+
+    Args:
+        mode (str): One of :const:`ALWAYS`, :const:`IF_MISSING`,
+            :const:`TTL` or :const:`NEVER`.
+        ttl (float, optional): For :const:`TTL` mode, the number of
+            seconds a pulled image is considered fresh.
+
+    """
+
+    ALWAYS = "always"
+    IF_MISSING = "if-missing"
+    TTL = "ttl"
+    NEVER = "never"
+
+    def __init__(self, mode, ttl=None):
+        if mode not in (self.ALWAYS, self.IF_MISSING, self.TTL, self.NEVER):
+            raise ValueError("unknown pull policy %r" % (mode,))
+        if mode == self.TTL and (ttl is None or ttl < 0):
+            raise ValueError("ttl pull policy needs a number of seconds")
+        self.mode = mode
+        self.ttl = ttl
+
+    @classmethod
+    def parse(cls, value):
+        """Make a PullPolicy from a bool, a policy string, or a PullPolicy.
+
+        :obj:`True` means ``always`` and :obj:`False` means ``never``.
+        Strings are ``always``, ``if-missing``, ``never`` or ``ttl=<seconds>``.
+        """
+        if isinstance(value, cls):
+            return value
+        if value is True:
+            return cls(cls.ALWAYS)
+        if value is False:
+            return cls(cls.NEVER)
+        if isinstance(value, str):
+            mode, _, ttl = value.strip().partition("=")
+            if mode == cls.TTL:
+                try:
+                    return cls(mode, float(ttl))
+                except ValueError:
+                    raise ValueError("invalid pull policy %r" % (value,))
+            return cls(mode)
+        raise TypeError("unsupported pull policy type: %r" % (value,))
+
+    def __repr__(self):
+        if self.mode == self.TTL:
+            return "PullPolicy(%r, ttl=%r)" % (self.mode, self.ttl)
+        return "PullPolicy(%r)" % (self.mode,)
+
+
+class ImagePuller:
+    """Pull Docker images according to a :class:`PullPolicy`.
+
+    Successful pulls are remembered in `cache` so that the ``ttl``
+    policy can skip the registry while the local image is unchanged.
+
+    Args:
+        docker_client: A docker-py Client object.
+        policy: Anything :meth:`PullPolicy.parse` accepts.
+        cache (optional): An object with ``get(key, default)`` and
+            ``set(key, value)`` methods, like pytest's ``config.cache``.
+            Defaults to a cache that only lives as long as this object.
+        clock (callable, optional): Returns the current time in seconds.
+
+    """
+
+    def __init__(self, docker_client, policy, cache=None, clock=time.time):
+        self.docker_client = docker_client
+        self.policy = PullPolicy.parse(policy)
+        self.cache = cache if cache is not None else MemoryCache()
+        self.clock = clock
+        self.docker_api_calls = collections.Counter()
+
+    def _local_image_id(self, image_name):
+        try:
+            self.docker_api_calls["images.get"] += 1
+            return self.docker_client.images.get(image_name).id
+        except docker.errors.ImageNotFound:
+            return None
+
+    def _is_fresh(self, image_name):
+        local_image_id = self._local_image_id(image_name)
+        if local_image_id is None:
+            return False
+        if self.policy.mode == PullPolicy.IF_MISSING:
+            return True
+        record = self.cache.get(PULL_CACHE_KEY, {}).get(image_name)
+        return (
+            record is not None
+            and record["image_id"] == local_image_id
+            and self.clock() - record["pulled_at"] < self.policy.ttl
+        )
+
+    def ensure_image(self, image_name):
+        """Pull `image_name` if the policy calls for it.
+
+        Returns:
+            bool: :obj:`True` if the image was pulled.
+
+        """
+        mode = self.policy.mode
+        if mode == PullPolicy.NEVER:
+            return False
+        if mode != PullPolicy.ALWAYS and self._is_fresh(image_name):
+            logger.debug("Docker image %r is fresh, not pulling", image_name)
+            return False
+
+        logger.debug("Pulling docker image %r", image_name)
+        self.docker_api_calls["images.pull"] += 1
+        image = self.docker_client.images.pull(image_name)
+        pulls = dict(self.cache.get(PULL_CACHE_KEY, {}))
+        pulls[image_name] = {"image_id": image.id, "pulled_at": self.clock()}
+        self.cache.set(PULL_CACHE_KEY, pulls)
+        return True
+
+
+class MemoryCache:
+    """An in-memory stand-in for pytest's ``config.cache``."""
+
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key, default):
+        """Return the value for `key` or `default`."""
+        return self._data.get(key, default)
+
+    def set(self, key, value):
+        """Set the value for `key`."""
+        self._data[key] = value
@@ -0,0 +1,264 @@
+"""Export Localstack session and AWS call metrics as an OpenMetrics textfile.
+
+Turned on with ``--localstack-metrics-file=PATH``. A
+:class:`MetricsCollector` is registered with the plugin manager, so it
+sees every session through the ``session_starting``, ``session_started``
+and ``session_stopped`` hooks, and listens to the
+:class:`~.profiling.CallProfiler` for AWS call latencies. The file is
+written once, at the end of the run, for a textfile collector like
+node_exporter's to pick up.
+"""
+import bisect
+import os
+import threading
+import time
+
+from pytest_localstack import hookspecs
+
+
+# Histogram bucket upper bounds, in seconds.
+START_BUCKETS = (1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0)
+READY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+CALL_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Count observations into buckets, like a Prometheus histogram.
+
+    Args:
+        buckets (tuple): Sorted bucket upper bounds. A ``+Inf`` bucket
+            is implied.
+
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        # Observations per bucket, not cumulative. The last one is +Inf.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Count one observation of `value`."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def to_dict(self):
+        """Return the histogram as a JSON-serializable dict."""
+        return {"buckets": list(self.buckets), "counts": self.counts, "sum": self.sum}
+
+    def merge(self, data):
+        """Add the observations of a histogram from :meth:`to_dict`."""
+        if tuple(data["buckets"]) != self.buckets:
+            raise ValueError("can't merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, data["counts"])]
+        self.sum += data["sum"]
+
+    def samples(self, name, labels):
+        """Yield OpenMetrics sample lines for this histogram."""
+        cumulative = 0
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, self.counts):
+            cumulative += count
+            bucket_labels = dict(labels, le=bound)
+            yield "%s_bucket%s %i" % (name, _format_labels(bucket_labels), cumulative)
+        yield "%s_sum%s %s" % (name, _format_labels(labels), _format_value(self.sum))
+        yield "%s_count%s %i" % (name, _format_labels(labels), cumulative)
+
+
+class MetricsCollector:
+    """Collect metrics about Localstack sessions and AWS calls.
+
+    Register it with :data:`pytest_localstack.plugin.manager` to receive
+    session hooks, and add :meth:`observe_call` to
+    :attr:`.CallProfiler.listeners` for call latencies.
+    """
+
+    def __init__(self):
+        self.container_start = Histogram(START_BUCKETS)
+        # service name -> Histogram
+        self.service_ready = {}
+        # (service name, operation name) -> Histogram
+        self.api_calls = {}
+        self.starts = 0
+        self.reuses = 0
+        self.failures = 0
+        # id(session) -> time.perf_counter() when it began starting
+        self._starting = {}
+        self._lock = threading.Lock()
+
+    @hookspecs.pytest_localstack_hookimpl
+    def session_starting(self, session):
+        """Time the session's start."""
+        with self._lock:
+            self._starting[id(session)] = time.perf_counter()
+
+    @hookspecs.pytest_localstack_hookimpl
+    def session_started(self, session):
+        """Count the start and observe how long it and each service took."""
+        now = time.perf_counter()
+        with self._lock:
+            started_at = self._starting.pop(id(session), None)
+            # A RunningSession only attaches to a container someone else
+            # started, so it's a reuse, not a container start.
+            if getattr(session, "reused_container", True):
+                self.reuses += 1
+            else:
+                self.starts += 1
+                if started_at is not None:
+                    self.container_start.observe(now - started_at)
+            for service_name, seconds in session.service_ready_times.items():
+                histogram = self.service_ready.get(service_name)
+                if histogram is None:
+                    histogram = self.service_ready[service_name] = Histogram(
+                        READY_BUCKETS
+                    )
+                histogram.observe(seconds)
+
+    @hookspecs.pytest_localstack_hookimpl
+    def session_stopped(self, session):
+        """Count sessions that stopped before they finished starting."""
+        with self._lock:
+            if self._starting.pop(id(session), None) is not None:
+                self.failures += 1
+
+    def observe_call(self, test, service_name, operation_name, seconds, params):
+        """Observe the latency of one AWS call."""
+        key = (service_name, operation_name)
+        with self._lock:
+            histogram = self.api_calls.get(key)
+            if histogram is None:
+                histogram = self.api_calls[key] = Histogram(CALL_BUCKETS)
+            histogram.observe(seconds)
+
+    def to_dict(self):
+        """Return the metrics as a JSON-serializable dict.
+
+        Starts that are still pending count as failures.
+        """
+        with self._lock:
+            return {
+                "container_start": self.container_start.to_dict(),
+                "service_ready": {
+                    service_name: histogram.to_dict()
+                    for service_name, histogram in self.service_ready.items()
+                },
+                "api_calls": [
+                    [service_name, operation_name, histogram.to_dict()]
+                    for (service_name, operation_name), histogram in sorted(
+                        self.api_calls.items()
+                    )
+                ],
+                "starts": self.starts,
+                "reuses": self.reuses,
+                "failures": self.failures + len(self._starting),
+            }
+
+    def merge(self, data):
+        """Add metrics from :meth:`to_dict`, e.g. from a pytest-xdist worker."""
+        with self._lock:
+            self.container_start.merge(data["container_start"])
+            for service_name, histogram_data in data["service_ready"].items():
+                histogram = self.service_ready.get(service_name)
+                if histogram is None:
+                    histogram = self.service_ready[service_name] = Histogram(
+                        READY_BUCKETS
+                    )
+                histogram.merge(histogram_data)
+            for service_name, operation_name, histogram_data in data["api_calls"]:
+                key = (service_name, operation_name)
+                histogram = self.api_calls.get(key)
+                if histogram is None:
+                    histogram = self.api_calls[key] = Histogram(CALL_BUCKETS)
+                histogram.merge(histogram_data)
+            self.starts += data["starts"]
+            self.reuses += data["reuses"]
+            self.failures += data["failures"]
+
+    def render(self):
+        """Return the metrics in the OpenMetrics text format.
+
+        Starts that are still pending count as failures.
+        """
+        lines = []
+
+        def family(name, metric_type, help_text, unit=None):
+            lines.append("# TYPE %s %s" % (name, metric_type))
+            if unit is not None:
+                lines.append("# UNIT %s %s" % (name, unit))
+            lines.append("# HELP %s %s" % (name, help_text))
+
+        with self._lock:
+            name = "pytest_localstack_container_start_seconds"
+            family(name, "histogram", "Time to start a Localstack session.", "seconds")
+            lines.extend(self.container_start.samples(name, {}))
+
+            name = "pytest_localstack_service_ready_seconds"
+            family(
+                name,
+                "histogram",
+                "Time for a Localstack service to be ready after the container ran.",
+                "seconds",
+            )
+            for service_name, histogram in sorted(self.service_ready.items()):
+                lines.extend(histogram.samples(name, {"service": service_name}))
+
+            name = "pytest_localstack_api_call_seconds"
+            family(name, "histogram", "Latency of AWS calls to Localstack.", "seconds")
+            for (service_name, operation_name), histogram in sorted(
+                self.api_calls.items()
+            ):
+                labels = {"service": service_name, "operation": operation_name}
+                lines.extend(histogram.samples(name, labels))
+
+            for name, value, help_text in [
+                (
+                    "pytest_localstack_container_starts",
+                    self.starts,
+                    "Localstack sessions started without reusing a container.",
+                ),
+                (
+                    "pytest_localstack_container_reuses",
+                    self.reuses,
+                    "Localstack sessions that reused or attached to a running container.",
+                ),
+                (
+                    "pytest_localstack_container_start_failures",
+                    self.failures + len(self._starting),
+                    "Localstack sessions that failed to start.",
+                ),
+            ]:
+                family(name, "counter", help_text)
+                lines.append("%s_total %i" % (name, value))
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write :meth:`render` to `path`.
+
+        The file is replaced atomically, so collectors never read a
+        partial file.
+        """
+        tmp_path = "%s.%i.tmp" % (path, os.getpid())
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{%s}" % ",".join(
+        '%s="%s"' % (key, _escape_label_value(value))
+        for key, value in labels.items()
+    )
+
+
+def _escape_label_value(value):
+    return (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    )
@@ -0,0 +1,327 @@
+"""Profile the AWS calls that tests make through Localstack clients.
+
+Turned on with ``--localstack-profile``. Every client created by a
+Localstack session, including clients redirected by
+:meth:`~.BotocoreTestResourceFactory.patch_botocore`, reports its calls
+through botocore's ``before-call`` and ``after-call`` events. Calls are
+counted per test, service and operation, and the slowest are printed at
+the end of the run.
+"""
+import collections
+import json
+import threading
+import time
+
+
+# Keys stored in botocore's per-request context dict.
+_START_KEY = "pytest_localstack_profile_start"
+_REQUEST_BYTES_KEY = "pytest_localstack_profile_request_bytes"
+_PARAMS_KEY = "pytest_localstack_profile_params"
+
+# The profiler that new clients report to, if profiling is on.
+_profiler = None
+
+
+def start():
+    """Turn on profiling and return the :class:`CallProfiler`."""
+    global _profiler
+    _profiler = CallProfiler()
+    return _profiler
+
+
+def stop():
+    """Turn off profiling for clients created from now on."""
+    global _profiler
+    _profiler = None
+
+
+def get_profiler():
+    """Return the active :class:`CallProfiler`, or None."""
+    return _profiler
+
+
+def instrument(client):
+    """Profile `client`'s calls, if profiling is on."""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.instrument(client)
+
+
+class CallStats:
+    """Statistics for calls to one operation from one test."""
+
+    __slots__ = ("calls", "seconds", "max_seconds", "request_bytes", "response_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def add(self, seconds, request_bytes, response_bytes, calls=1, max_seconds=None):
+        """Count calls that took `seconds` in total."""
+        self.calls += calls
+        self.seconds += seconds
+        self.max_seconds = max(
+            self.max_seconds, seconds if max_seconds is None else max_seconds
+        )
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+
+
+class CallProfiler:
+    """Collect AWS call counts, latency and payload sizes.
+
+    Calls are attributed to :attr:`current_test`, which the pytest plugin
+    sets to the node id of the running test, including its setup and
+    teardown. Calls outside of tests are attributed to :const:`None`.
+    """
+
+    def __init__(self):
+        self.current_test = None
+        # (test node id, service name, operation name) -> CallStats
+        self.stats = {}
+        # Called with (test, service name, operation name, seconds,
+        # API params) for every call, e.g. by :class:`SlowCallDetector`.
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def instrument(self, client):
+        """Register event handlers on a botocore client."""
+        # botocore's unique ids are shared by all events.
+        events = client.meta.events
+        events.register(
+            "before-parameter-build",
+            self._before_parameter_build,
+            unique_id="pytest-localstack-profile-before-parameter-build",
+        )
+        events.register(
+            "before-call",
+            self._before_call,
+            unique_id="pytest-localstack-profile-before-call",
+        )
+        events.register(
+            "after-call",
+            self._after_call,
+            unique_id="pytest-localstack-profile-after-call",
+        )
+
+    def _before_parameter_build(self, params, context, **kwargs):
+        context[_PARAMS_KEY] = params
+
+    def _before_call(self, params, context, **kwargs):
+        context[_REQUEST_BYTES_KEY] = _request_size(params)
+        context[_START_KEY] = time.perf_counter()
+
+    def _after_call(self, http_response, model, context, **kwargs):
+        try:
+            start = context.pop(_START_KEY)
+        except KeyError:
+            return
+        seconds = time.perf_counter() - start
+        test = self.current_test
+        service_name = model.service_model.service_name
+        self.record(
+            test,
+            service_name,
+            model.name,
+            seconds,
+            context.pop(_REQUEST_BYTES_KEY, 0),
+            _response_size(http_response),
+        )
+        params = context.pop(_PARAMS_KEY, None)
+        for listener in self.listeners:
+            listener(test, service_name, model.name, seconds, params)
+
+    def record(
+        self, test, service_name, operation_name, seconds, request_bytes, response_bytes
+    ):
+        """Count one call."""
+        key = (test, service_name, operation_name)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = CallStats()
+            stats.add(seconds, request_bytes, response_bytes)
+
+    def records(self):
+        """Return the statistics as a list of JSON-serializable dicts."""
+        with self._lock:
+            items = list(self.stats.items())
+        return [
+            {
+                "test": test,
+                "service": service_name,
+                "operation": operation_name,
+                "calls": stats.calls,
+                "seconds": stats.seconds,
+                "max_seconds": stats.max_seconds,
+                "request_bytes": stats.request_bytes,
+                "response_bytes": stats.response_bytes,
+            }
+            for (test, service_name, operation_name), stats in items
+        ]
+
+    def merge(self, records):
+        """Add records from :meth:`records`, e.g. from a pytest-xdist worker."""
+        with self._lock:
+            for record in records:
+                key = (record["test"], record["service"], record["operation"])
+                stats = self.stats.get(key)
+                if stats is None:
+                    stats = self.stats[key] = CallStats()
+                stats.add(
+                    record["seconds"],
+                    record["request_bytes"],
+                    record["response_bytes"],
+                    calls=record["calls"],
+                    max_seconds=record["max_seconds"],
+                )
+
+    def _totals(self, key_func):
+        totals = {}
+        with self._lock:
+            items = list(self.stats.items())
+        for key, stats in items:
+            name = key_func(key)
+            total = totals.get(name)
+            if total is None:
+                total = totals[name] = CallStats()
+            total.add(
+                stats.seconds,
+                stats.request_bytes,
+                stats.response_bytes,
+                calls=stats.calls,
+                max_seconds=stats.max_seconds,
+            )
+        return sorted(totals.items(), key=lambda item: item[1].seconds, reverse=True)
+
+    def summary_lines(self, top=10):
+        """Return lines for the terminal summary of the `top` slowest entries."""
+
+        def header(name):
+            return "%10s %7s %10s %10s %10s  %s" % (
+                "total s",
+                "calls",
+                "max s",
+                "sent KiB",
+                "recv KiB",
+                name,
+            )
+
+        def rows(totals):
+            for name, stats in totals[:top]:
+                yield "%10.3f %7i %10.3f %10.1f %10.1f  %s" % (
+                    stats.seconds,
+                    stats.calls,
+                    stats.max_seconds,
+                    stats.request_bytes / 1024.0,
+                    stats.response_bytes / 1024.0,
+                    name,
+                )
+
+        lines = ["slowest tests by time in AWS calls:", header("test")]
+        lines.extend(rows(self._totals(lambda key: key[0] or "(outside tests)")))
+        lines.append("")
+        lines.append("slowest operations:")
+        lines.append(header("operation"))
+        lines.extend(rows(self._totals(lambda key: "%s.%s" % key[1:])))
+        return lines
+
+    def write_json(self, path):
+        """Write :meth:`records` to a JSON file at `path`."""
+        with open(path, "w") as f:
+            json.dump(self.records(), f, indent=2, sort_keys=True)
+
+
+class SlowCallDetector:
+    """Remember AWS calls that took longer than a threshold.
+
+    Add :meth:`observe_call` to :attr:`CallProfiler.listeners`.
+
+    Args:
+        threshold (float): Calls that take at least this many seconds
+            are slow.
+
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        # test node id -> list of messages about its slow calls
+        self.slow_calls = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def observe_call(self, test, service_name, operation_name, seconds, params):
+        """Remember the call if it was slow."""
+        if seconds < self.threshold:
+            return
+        message = "slow AWS call %s.%s took %.0f ms (threshold %.0f ms) with %s" % (
+            service_name,
+            operation_name,
+            seconds * 1000,
+            self.threshold * 1000,
+            summarize_params(params),
+        )
+        if test is not None:
+            message += " in %s" % test
+        with self._lock:
+            self.slow_calls[test].append(message)
+
+    def pop(self, test):
+        """Return and forget the messages about `test`'s slow calls."""
+        with self._lock:
+            return self.slow_calls.pop(test, [])
+
+
+def summarize_params(params, max_length=200):
+    """Return a short description of an operation's API params."""
+    summary = repr(_summarize(params or {}))
+    if len(summary) > max_length:
+        summary = summary[: max_length - 3] + "..."
+    return summary
+
+
+def _summarize(value):
+    if isinstance(value, dict):
+        return {key: _summarize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [_summarize(item) for item in value[:3]]
+        if len(value) > 3:
+            items.append("... %i items" % len(value))
+        return items
+    if isinstance(value, (bytes, bytearray)):
+        return "<%i bytes>" % len(value)
+    if isinstance(value, str) and len(value) > 40:
+        return value[:37] + "..."
+    if hasattr(value, "read"):
+        return "<stream>"
+    return value
+
+
+def _request_size(request_dict):
+    """Return the size of a botocore request body in bytes, if known."""
+    body = request_dict.get("body")
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    try:
+        return int(request_dict.get("headers", {}).get("Content-Length", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _response_size(http_response):
+    """Return the size of a botocore response body in bytes, if known.
+
+    Bodies that botocore hasn't read, like streaming ones, are left alone.
+    """
+    try:
+        return int(http_response.headers["Content-Length"])
+    except (KeyError, TypeError, ValueError):
+        pass
+    content = getattr(http_response, "_content", None)
+    if isinstance(content, bytes):
+        return len(content)
+    return 0
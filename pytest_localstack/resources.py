@@ -0,0 +1,316 @@
+"""Create AWS resources in Localstack from a declarative spec.
+
+A spec is a dict of service names to resources. Each service maps
+resource names to their settings, or is just a list of names::
+
+    {
+        "s3": {"my-bucket": {"objects": {"hello.txt": b"hello"}}},
+        "dynamodb": {
+            "my-table": {
+                "KeySchema": [{"AttributeName": "id", "KeyType": "HASH"}],
+                "AttributeDefinitions": [
+                    {"AttributeName": "id", "AttributeType": "S"}
+                ],
+                "items": [{"id": {"S": "1"}}],
+            }
+        },
+        "sqs": ["my-queue"],
+        "sns": ["my-topic"],
+        "kinesis": {"my-stream": {"ShardCount": 1}},
+    }
+
+Settings are passed on to the service's create call, except for
+``objects`` (S3 keys to bodies) and ``items`` (DynamoDB items in
+low-level attribute value format), which are loaded after creating the
+resource. Resource names get the session's ``resource_prefix``.
+
+:func:`deprovision` deletes what :func:`provision` created.
+"""
+import concurrent.futures
+import contextlib
+import logging
+import time
+
+import botocore.exceptions
+
+from pytest_localstack import exceptions
+
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB's BatchWriteItem takes at most 25 items.
+DYNAMODB_BATCH_SIZE = 25
+
+# Attempts and backoff for writing a batch's UnprocessedItems.
+DYNAMODB_BATCH_MAX_ATTEMPTS = 10
+DYNAMODB_BATCH_INITIAL_DELAY = 0.05
+DYNAMODB_BATCH_MAX_DELAY = 1
+
+# Localstack creates resources in well under a second; AWS's default
+# waiter delays are 5 to 20 seconds.
+WAITER_CONFIG = {"Delay": 0.1, "MaxAttempts": 600}
+
+# Error codes for resources that are already gone.
+NOT_FOUND_ERROR_CODES = {
+    "AWS.SimpleQueueService.NonExistentQueue",
+    "NoSuchBucket",
+    "NotFound",
+    "QueueDoesNotExist",
+    "ResourceNotFoundException",
+}
+
+
+def provision(localstack_session, spec, max_workers=8):
+    """Create all resources in `spec` in Localstack.
+
+    Resources are created in parallel and each one is waited on until
+    it's ready to use.
+
+    Args:
+        localstack_session (:class:`.LocalstackSession`): The session
+            to create the resources in.
+        spec (dict): What to create, see :mod:`pytest_localstack.resources`.
+        max_workers (int, optional): The most resources to create at once.
+
+    Returns:
+        dict: Service names to dicts of resource names to their
+        identifiers: bucket, table and stream names, queue URLs
+        and topic ARNs.
+
+    Raises:
+        ValueError: If `spec` has a service this module can't provision.
+        Exception: Whatever creating a resource raised. The resources
+            that were created are deleted again first.
+
+    """
+    tasks = []
+    clients = {}
+    for service_name, resources in spec.items():
+        try:
+            create = PROVISIONERS[service_name]
+        except KeyError:
+            raise ValueError("can't provision %s resources" % (service_name,))
+        if not isinstance(resources, dict):
+            resources = {name: {} for name in resources}
+        # One client per service, shared by the worker threads.
+        clients[service_name] = localstack_session.botocore.client(service_name)
+        for name, settings in resources.items():
+            tasks.append((service_name, name, create, settings))
+
+    results = {service_name: {} for service_name in spec}
+    if not tasks:
+        return results
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(max_workers, len(tasks)),
+        thread_name_prefix="pytest-localstack-provision",
+    ) as executor:
+        futures = {
+            executor.submit(
+                create,
+                localstack_session,
+                clients[service_name],
+                localstack_session.resource_prefix + name,
+                dict(settings),
+            ): (service_name, name)
+            for service_name, name, create, settings in tasks
+        }
+        error = None
+        for future in concurrent.futures.as_completed(futures):
+            service_name, name = futures[future]
+            try:
+                results[service_name][name] = future.result()
+            except Exception as e:
+                error = error or e
+    if error is not None:
+        # Don't leave half of the spec behind for the next attempt.
+        deprovision(localstack_session, results, max_workers=max_workers)
+        raise error
+    return results
+
+
+def create_bucket(localstack_session, client, name, settings):
+    """Create an S3 bucket and upload its ``objects``."""
+    objects = settings.pop("objects", {})
+    region_name = localstack_session.region_name
+    if region_name and region_name != "us-east-1":
+        settings.setdefault(
+            "CreateBucketConfiguration", {"LocationConstraint": region_name}
+        )
+    client.create_bucket(Bucket=name, **settings)
+    with _delete_on_error(delete_bucket, client, name):
+        client.get_waiter("bucket_exists").wait(Bucket=name, WaiterConfig=WAITER_CONFIG)
+        for key, body in objects.items():
+            client.put_object(Bucket=name, Key=key, Body=body)
+    return name
+
+
+def create_table(localstack_session, client, name, settings):
+    """Create a DynamoDB table and write its ``items``."""
+    items = settings.pop("items", [])
+    if "ProvisionedThroughput" not in settings:
+        settings.setdefault("BillingMode", "PAY_PER_REQUEST")
+    client.create_table(TableName=name, **settings)
+    with _delete_on_error(delete_table, client, name):
+        client.get_waiter("table_exists").wait(
+            TableName=name, WaiterConfig=WAITER_CONFIG
+        )
+        for start in range(0, len(items), DYNAMODB_BATCH_SIZE):
+            end = start + DYNAMODB_BATCH_SIZE
+            requests = [{"PutRequest": {"Item": item}} for item in items[start:end]]
+            _batch_write(client, name, {name: requests})
+    return name
+
+
+def _batch_write(client, name, request_items):
+    """Write a DynamoDB batch, retrying unprocessed items with backoff."""
+    for attempt in range(DYNAMODB_BATCH_MAX_ATTEMPTS):
+        if attempt:
+            delay = min(
+                (2 ** (attempt - 1)) * DYNAMODB_BATCH_INITIAL_DELAY,
+                DYNAMODB_BATCH_MAX_DELAY,
+            )
+            time.sleep(delay)
+        response = client.batch_write_item(RequestItems=request_items)
+        request_items = response.get("UnprocessedItems")
+        if not request_items:
+            return
+    raise exceptions.ServiceError(
+        "DynamoDB left %i items of table %s unprocessed after %i attempts"
+        % (
+            sum(len(requests) for requests in request_items.values()),
+            name,
+            DYNAMODB_BATCH_MAX_ATTEMPTS,
+        )
+    )
+
+
+def create_queue(localstack_session, client, name, settings):
+    """Create an SQS queue and return its URL."""
+    return client.create_queue(QueueName=name, **settings)["QueueUrl"]
+
+
+def create_topic(localstack_session, client, name, settings):
+    """Create an SNS topic and return its ARN."""
+    return client.create_topic(Name=name, **settings)["TopicArn"]
+
+
+def create_stream(localstack_session, client, name, settings):
+    """Create a Kinesis stream."""
+    settings.setdefault("ShardCount", 1)
+    client.create_stream(StreamName=name, **settings)
+    with _delete_on_error(delete_stream, client, name):
+        client.get_waiter("stream_exists").wait(
+            StreamName=name, WaiterConfig=WAITER_CONFIG
+        )
+    return name
+
+
+@contextlib.contextmanager
+def _delete_on_error(delete, client, identifier):
+    """Delete a resource that was created but couldn't be set up."""
+    try:
+        yield
+    except Exception:
+        try:
+            delete(client, identifier)
+        except Exception:
+            logger.warning("Could not delete %s", identifier, exc_info=True)
+        raise
+
+
+def deprovision(localstack_session, provisioned, max_workers=8):
+    """Delete resources created by :func:`provision`.
+
+    Resources that are already gone are skipped.
+
+    Args:
+        localstack_session (:class:`.LocalstackSession`): The session
+            the resources were created in.
+        provisioned (dict): What :func:`provision` returned.
+        max_workers (int, optional): The most resources to delete at once.
+
+    """
+    tasks = []
+    clients = {}
+    for service_name, identifiers in provisioned.items():
+        delete = DEPROVISIONERS[service_name]
+        if identifiers:
+            clients[service_name] = localstack_session.botocore.client(service_name)
+        for identifier in identifiers.values():
+            tasks.append((service_name, identifier, delete))
+    if not tasks:
+        return
+
+    def _delete(service_name, identifier, delete):
+        try:
+            delete(clients[service_name], identifier)
+        except botocore.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in NOT_FOUND_ERROR_CODES:
+                raise
+            logger.debug("%s %s is already gone", service_name, identifier)
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(max_workers, len(tasks)),
+        thread_name_prefix="pytest-localstack-deprovision",
+    ) as executor:
+        futures = [executor.submit(_delete, *task) for task in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+
+
+def delete_bucket(client, name):
+    """Delete an S3 bucket and its objects, including old versions."""
+    paginator = client.get_paginator("list_object_versions")
+    for page in paginator.paginate(Bucket=name):
+        objects = [
+            {"Key": obj["Key"], "VersionId": obj["VersionId"]}
+            for obj in page.get("Versions", []) + page.get("DeleteMarkers", [])
+        ]
+        if objects:
+            client.delete_objects(
+                Bucket=name, Delete={"Objects": objects, "Quiet": True}
+            )
+    client.delete_bucket(Bucket=name)
+
+
+def delete_table(client, name):
+    """Delete a DynamoDB table."""
+    client.delete_table(TableName=name)
+    client.get_waiter("table_not_exists").wait(
+        TableName=name, WaiterConfig=WAITER_CONFIG
+    )
+
+
+def delete_queue(client, url):
+    """Delete an SQS queue."""
+    client.delete_queue(QueueUrl=url)
+
+
+def delete_topic(client, arn):
+    """Delete an SNS topic."""
+    client.delete_topic(TopicArn=arn)
+
+
+def delete_stream(client, name):
+    """Delete a Kinesis stream."""
+    client.delete_stream(StreamName=name, EnforceConsumerDeletion=True)
+    client.get_waiter("stream_not_exists").wait(
+        StreamName=name, WaiterConfig=WAITER_CONFIG
+    )
+
+
+PROVISIONERS = {
+    "dynamodb": create_table,
+    "kinesis": create_stream,
+    "s3": create_bucket,
+    "sns": create_topic,
+    "sqs": create_queue,
+}
+
+DEPROVISIONERS = {
+    "dynamodb": delete_table,
+    "kinesis": delete_stream,
+    "s3": delete_bucket,
+    "sns": delete_topic,
+    "sqs": delete_queue,
+}
@@ -1,18 +1,28 @@
 """Run and interact with a Localstack container."""
+import collections
+import concurrent.futures
+import hashlib
+import json
 import logging
 import os
 import re
 import string
 import threading
 import time
+import types
+import urllib.error
 from copy import copy
 
+import docker
+
 from pytest_localstack import (
     constants,
     container,
     exceptions,
+    images,
     plugin,
     service_checks,
+    state,
     utils,
 )
 
@@ -21,7 +31,28 @@ logger = logging.getLogger(__name__)
 
 
 class RunningSession:
-    """Connects to an already running localstack server"""
+    """Connects to an already running localstack server
+
+    Args:
+        hostname (str): Hostname of the Localstack server.
+        services (list|dict, optional): The AWS services Localstack runs,
+            see :class:`.LocalstackSession`.
+        region_name (str, optional): Region name to assume.
+        use_ssl (bool, optional): If True use SSL to connect to Localstack.
+            Default is False.
+        localstack_version (str, optional): The version of Localstack
+            that is running. Defaults to `latest`.
+        resource_prefix (str, optional): Prefix for the names of AWS
+            resources created by tests, for when several sessions share
+            one Localstack server. Default is no prefix.
+        snapshot_dir (str, optional): Directory to save snapshots from
+            :meth:`snapshot` in. Defaults to keeping them in memory.
+        timings_file (str, optional): JSON lines file to append the
+            :attr:`startup_timings` of every start to. Default is None.
+        **kwargs: Additional kwargs will be stored in a `kwargs` attribute
+            in case test resource factories want to access them.
+
+    """
 
     def __init__(
         self,
@@ -30,10 +61,19 @@ class RunningSession:
         region_name=None,
         use_ssl=False,
         localstack_version="latest",
+        resource_prefix="",
+        snapshot_dir=None,
+        timings_file=None,
         **kwargs,
     ):
         self.kwargs = kwargs
+        self.snapshots = state.SnapshotStore(snapshot_dir)
         self.use_ssl = use_ssl
+        self.resource_prefix = resource_prefix
+        self.service_ready_times = {}
+        # Phase and service ready times of the last start().
+        self.startup_timings = {}
+        self.timings_file = timings_file
         self.region_name = region_name
         self._hostname = hostname
         self.localstack_version = localstack_version
@@ -92,15 +132,77 @@ class RunningSession:
 
     def start(self, timeout=60):
         """Starts Localstack if needed."""
+        timer = StartupTimer()
         plugin.manager.hook.session_starting(session=self)
-
-        self._check_services(timeout)
+        timer.lap("starting_hooks")
+
+        try:
+            self._check_services(timeout)
+            timer.lap("check_services")
+        except exceptions.TimeoutError:
+            self._record_startup_timings(timer, failed=True)
+            raise
         plugin.manager.hook.session_started(session=self)
+        timer.lap("started_hooks")
+        self._record_startup_timings(timer)
 
-    def _check_services(self, timeout, initial_retry_delay=0.01, max_delay=1):
+    def _record_startup_timings(self, timer, failed=False):
+        """Store, log and save the timings of a start.
+
+        They are stored as :attr:`startup_timings` and appended to
+        :attr:`timings_file` as one JSON line.
+        """
+        self.startup_timings = timings = {
+            "time": timer.start_time,
+            "hostname": self.hostname,
+            "container_name": getattr(self, "container_name", None),
+            "localstack_version": self.localstack_version,
+            "reused_container": getattr(self, "reused_container", False),
+            "failed": failed,
+            "total": timer.total,
+            "phases": dict(timer.phases),
+            "services": dict(self.service_ready_times),
+        }
+        logger.info(
+            "%s %r in %.2fs (%s)",
+            "Failed to start" if failed else "Started",
+            self,
+            timer.total,
+            ", ".join(
+                "%s %.2fs" % (phase, seconds)
+                for phase, seconds in timer.phases.items()
+            ),
+        )
+        if self.service_ready_times:
+            slowest = max(self.service_ready_times, key=self.service_ready_times.get)
+            logger.info(
+                "Slowest Localstack service was %s, ready after %.2fs",
+                slowest,
+                self.service_ready_times[slowest],
+            )
+        if self.timings_file:
+            try:
+                with open(self.timings_file, "a") as f:
+                    f.write(json.dumps(timings, sort_keys=True) + "\n")
+            except OSError:
+                logger.warning(
+                    "Could not write startup timings to %s",
+                    self.timings_file,
+                    exc_info=True,
+                )
+
+    def _check_services(
+        self,
+        timeout,
+        initial_retry_delay=0.01,
+        max_delay=1,
+        service_timeouts=None,
+        max_workers=8,
+    ):
         """Check that all Localstack services are running and accessible.
 
-        Does exponential backoff up to `max_delay`.
+        Services that aren't available yet are checked concurrently,
+        then rechecked with exponential backoff up to `max_delay`.
 
         Args:
             timeout (float): Number of seconds to wait for services to
@@ -110,36 +212,60 @@ class RunningSession:
                 Default: 0.01
             max_delay (float, optional): Max time in seconds to wait between
                 checking service availability. Default: 1
+            service_timeouts (dict, optional): Service names to the number
+                of seconds to wait for that service, instead of `timeout`.
+            max_workers (int, optional): Max number of services to check
+                at the same time. Default: 8
 
         Returns:
-            None
+            dict: Service names to the number of seconds it took for
+            them to be available. Also stored as `service_ready_times`.
 
         Raises:
             pytest_localstack.exceptions.TimeoutError: If not all services
                 started before `timeout` was reached.
 
         """
+        start_time = time.time()
+        service_timeouts = service_timeouts or {}
+        deadlines = {
+            service_name: start_time + service_timeouts.get(service_name, timeout)
+            for service_name in self.services
+        }
         services = set(self.services)
+        self.service_ready_times = {}
         num_retries = 0
-        start_time = time.time()
-        while services and (time.time() - start_time) < timeout:
-            for service_name in list(
-                services
-            ):  # list() because set may change during iteration
-                try:
-                    service_checks.SERVICE_CHECKS[service_name](self)
-                    services.discard(service_name)
-                except exceptions.ServiceError as e:
-                    if (time.time() - start_time) >= timeout:
+
+        def _check(service_name):
+            try:
+                service_checks.SERVICE_CHECKS[service_name](self)
+            except exceptions.ServiceError as e:
+                return e
+            return None
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(services)))
+        ) as executor:
+            while services:
+                futures = {
+                    service_name: executor.submit(_check, service_name)
+                    for service_name in services
+                }
+                for service_name, future in futures.items():
+                    error = future.result()
+                    now = time.time()
+                    if error is None:
+                        services.discard(service_name)
+                        self.service_ready_times[service_name] = now - start_time
+                    elif now >= deadlines[service_name]:
                         raise exceptions.TimeoutError(
                             f"Localstack service not started: {service_name}"
-                        ) from e
-            if services:
-                delay = (2**num_retries) * initial_retry_delay
-                if delay > max_delay:
-                    delay = max_delay
+                        ) from error
+                if services:
+                    delay = min((2**num_retries) * initial_retry_delay, max_delay)
                     time.sleep(delay)
                     num_retries += 1
+        return self.service_ready_times
 
     def stop(self, timeout=10):
         """Stops Localstack."""
@@ -161,6 +287,98 @@ class RunningSession:
         )
         self.stop(timeout=timeout)
 
+    def reset(self, services=None):
+        """Wipe the state of Localstack services without restarting them.
+
+        Much faster than starting a new container, so a session-scoped
+        container can still give each test a clean slate.
+
+        Sessions with a `resource_prefix` share their Localstack server
+        with other sessions, like pytest-xdist workers with
+        ``--localstack-share-xdist``. Resetting would delete the other
+        sessions' resources too, so it is refused.
+
+        Args:
+            services (list, optional): Names of the services to reset.
+                Defaults to all of this session's services. Without
+                Localstack's state endpoints, the default skips services
+                that can't be reset through botocore, with a warning.
+
+        Raises:
+            pytest_localstack.exceptions.ServiceError: If a service isn't
+                enabled or can't be reset.
+            pytest_localstack.exceptions.ResetError: If the session has
+                a `resource_prefix`.
+
+        """
+        if self.resource_prefix:
+            raise exceptions.ResetError(
+                f"{self!r} shares Localstack with other sessions "
+                f"(resource_prefix={self.resource_prefix!r}), resetting would "
+                "delete their resources too"
+            )
+        skip_unresettable = services is None
+        if services is None:
+            services = list(self.services)
+        for service_name in services:
+            if service_name not in self.services:
+                raise exceptions.ServiceError(
+                    f"{self!r} does not have {service_name} enabled"
+                )
+        state.reset_services(self, services, skip_unresettable=skip_unresettable)
+
+    def snapshot(self, name):
+        """Save the state of all Localstack services as snapshot `name`.
+
+        Raises:
+            pytest_localstack.exceptions.SnapshotError: If Localstack
+                can't export its state.
+
+        """
+        try:
+            data = state.export_state(self)
+        except urllib.error.URLError:
+            logger.debug("Localstack can't export its state", exc_info=True)
+            self._snapshot_fallback(name)
+            return
+        self.snapshots.save(name, "state", data)
+
+    def _snapshot_fallback(self, name):
+        raise exceptions.SnapshotError(f"{self!r} can't export Localstack state")
+
+    def restore(self, name, timeout=60):
+        """Replace the state of all Localstack services with snapshot `name`.
+
+        Args:
+            name (str): The name passed to :meth:`snapshot`.
+            timeout (float, optional): For snapshots of a whole container,
+                wait at most this many seconds for it to restart.
+
+        Raises:
+            pytest_localstack.exceptions.SnapshotError: If there's no
+                such snapshot or it can't be loaded.
+
+        """
+        snapshot = self.snapshots.load(name)
+        if snapshot is None:
+            raise exceptions.SnapshotError(f"{self!r} has no snapshot {name!r}")
+        kind, data = snapshot
+        if kind == "image":
+            self._restore_image(data, timeout)
+            return
+        self.reset()
+        try:
+            state.import_state(self, data)
+        except urllib.error.URLError as e:
+            raise exceptions.SnapshotError(
+                f"{self!r} can't import snapshot {name!r}: {e}"
+            )
+
+    def _restore_image(self, image_id, timeout):
+        raise exceptions.SnapshotError(
+            f"{self!r} can't restart Localstack from image {image_id}"
+        )
+
     def map_port(self, port):
         """Return host port based on Localstack port."""
         return port
@@ -223,10 +441,29 @@ class LocalstackSession(RunningSession):
             image to use. Defaults to `latest`.
         auto_remove (bool, optional): If True, delete the Localstack
             container when it stops.
+        pull_image (bool|str, optional): When to pull the Localstack image.
+            One of True (same as `always`), False (same as `never`),
+            `always`, `if-missing` or `ttl=<seconds>`. Default is True.
+        pull_cache (optional): Where to remember image pulls for the
+            `ttl=<seconds>` policy, like pytest's `config.cache`.
+            Defaults to remembering them in memory.
         container_name (str, optional): The name for the Localstack
             container. Defaults to a randomly generated id.
         use_ssl (bool, optional): If True use SSL to connect to Localstack.
             Default is False.
+        reuse_container (bool, optional): If True, look for a running
+            container started with the same configuration by a previous
+            session and attach to it instead of starting a new one.
+            The container is left running when the session stops.
+            Default is False.
+        sample_stats (bool, optional): If True, sample the container's
+            CPU, memory, network and block I/O usage while the session
+            runs. See :attr:`stats_sampler` and :attr:`stats_summary`.
+            Default is False.
+        snapshot_dir (str, optional): Directory to save snapshots from
+            :meth:`snapshot` in. Defaults to keeping them in memory.
+        timings_file (str, optional): JSON lines file to append the
+            :attr:`startup_timings` of every start to. Default is None.
         **kwargs: Additional kwargs will be stored in a `kwargs` attribute
             in case test resource factories want to access them.
 
@@ -234,6 +471,13 @@ class LocalstackSession(RunningSession):
 
     image_name = "localstack/localstack"
 
+    # Localstack logs this line once all of its services are up.
+    ready_log_pattern = r"^Ready\.$"
+
+    # Share of the start timeout to wait for the ready line before
+    # falling back to polling the services.
+    ready_log_timeout_share = 0.5
+
     def __init__(
         self,
         docker_client,
@@ -248,10 +492,16 @@ class LocalstackSession(RunningSession):
         container_name=None,
         use_ssl=False,
         hostname=None,
+        reuse_container=False,
+        pull_cache=None,
+        sample_stats=False,
         **kwargs,
     ):
         self._container = None
         self._container_lock = threading.RLock()
+        self._port_map = None
+        # Number of Docker API calls this session made, by call name.
+        self.docker_api_calls = collections.Counter()
         self._factory_cache = {}
 
         self.docker_client = docker_client
@@ -259,7 +509,19 @@ class LocalstackSession(RunningSession):
         self.kinesis_error_probability = kinesis_error_probability
         self.dynamodb_error_probability = dynamodb_error_probability
         self.auto_remove = bool(auto_remove)
-        self.pull_image = bool(pull_image)
+        self.pull_image = images.PullPolicy.parse(pull_image)
+        self.pull_cache = pull_cache
+        self.reuse_container = bool(reuse_container)
+        self.reused_container = False
+        # Set by shared.SharedSessionCoordinator: leave the container
+        # running at stop() without making it reusable by other runs.
+        self._keep_container_running = False
+        self._snapshot_image = None
+        self.sample_stats = bool(sample_stats)
+        # The DockerStatsSampler of the running container, if sampling.
+        self.stats_sampler = None
+        # Peak and average resource usage of the last stopped container.
+        self.stats_summary = {}
 
         super(LocalstackSession, self).__init__(
             hostname=hostname if hostname else default_hostname(),
@@ -274,6 +536,50 @@ class LocalstackSession(RunningSession):
         self.localstack_version = localstack_version
         self.container_name = container_name or generate_container_name()
 
+    @property
+    def config_hash(self):
+        """Return a hash of the settings that affect the container's behavior.
+
+        Reusable containers are labeled with this hash so that later
+        sessions with the same settings can find them.
+        """
+        config = {
+            "image": self.image_name + ":" + self.localstack_version,
+            "services": sorted(self.services.items()),
+            "region_name": self.region_name,
+            "kinesis_error_probability": self.kinesis_error_probability,
+            "dynamodb_error_probability": self.dynamodb_error_probability,
+            "use_ssl": self.use_ssl,
+        }
+        config_json = json.dumps(config, sort_keys=True)
+        return hashlib.sha256(config_json.encode("utf-8")).hexdigest()
+
+    def _find_reusable_container(self):
+        """Return a running container with a matching config hash, if any.
+
+        Matching containers that aren't running anymore are removed.
+        """
+        label = "%s=%s" % (constants.CONTAINER_CONFIG_HASH_LABEL, self.config_hash)
+        reusable = None
+        self.docker_api_calls["containers.list"] += 1
+        for candidate in self.docker_client.containers.list(
+            all=True, filters={"label": label}
+        ):
+            if candidate.status == "running" and reusable is None:
+                reusable = candidate
+            elif candidate.status != "running":
+                logger.debug("Removing stale Localstack container %s", candidate.name)
+                try:
+                    self.docker_api_calls["container.remove"] += 1
+                    candidate.remove(force=True)
+                except docker.errors.APIError:
+                    logger.debug(
+                        "Could not remove stale Localstack container %s",
+                        candidate.name,
+                        exc_info=True,
+                    )
+        return reusable
+
     def start(self, timeout=60):
         """Start the Localstack container.
 
@@ -292,42 +598,47 @@ class LocalstackSession(RunningSession):
             if self._container is not None:
                 raise exceptions.ContainerAlreadyStartedError(self)
 
+            timer = StartupTimer()
             logger.debug("Starting Localstack container %s", self.container_name)
             logger.debug("%r running starting hooks", self)
             plugin.manager.hook.session_starting(session=self)
-
-            image_name = self.image_name + ":" + self.localstack_version
-            if self.pull_image:
-                logger.debug("Pulling docker image %r", image_name)
-                self.docker_client.images.pull(image_name)
-
-            start_time = time.time()
-
-            services = ",".join("%s:%s" % pair for pair in self.services.items())
-            kinesis_error_probability = "%f" % self.kinesis_error_probability
-            dynamodb_error_probability = "%f" % self.dynamodb_error_probability
-            use_ssl = str(self.use_ssl).lower()
-            self._container = self.docker_client.containers.run(
-                image_name,
-                name=self.container_name,
-                detach=True,
-                auto_remove=self.auto_remove,
-                environment={
-                    "DEFAULT_REGION": self.region_name,
-                    "SERVICES": services,
-                    "KINESIS_ERROR_PROBABILITY": kinesis_error_probability,
-                    "DYNAMODB_ERROR_PROBABILITY": dynamodb_error_probability,
-                    "USE_SSL": use_ssl,
-                },
-                ports={port: None for port in self.services.values()},
-            )
-            logger.debug(
-                "Started Localstack container %s (id: %s)",
-                self.container_name,
-                self._container.short_id,
-            )
+            timer.lap("starting_hooks")
+
+            logs_since = None
+            if self.reuse_container:
+                self._container = self._find_reusable_container()
+                timer.lap("find_container")
+            self.reused_container = self._container is not None
+
+            if self.reused_container:
+                start_time = time.time()
+                self.container_name = self._container.name
+                logs_since = int(start_time)
+                logger.debug(
+                    "Reusing Localstack container %s (id: %s)",
+                    self.container_name,
+                    self._container.short_id,
+                )
+            elif self._snapshot_image is not None:
+                image_name = self._snapshot_image
+            else:
+                image_name = self.image_name + ":" + self.localstack_version
+                puller = images.ImagePuller(
+                    self.docker_client, self.pull_image, self.pull_cache
+                )
+                puller.ensure_image(image_name)
+                self.docker_api_calls.update(puller.docker_api_calls)
+                timer.lap("pull_image")
+
+            if not self.reused_container:
+                start_time = time.time()
+                self._run_container(image_name)
+                timer.lap("run_container")
+
+            self._refresh_port_map()
 
             # Tail container logs
+            ready = threading.Event()
             container_logger = logger.getChild(
                 "containers.%s" % self._container.short_id
             )
@@ -337,7 +648,12 @@ class LocalstackSession(RunningSession):
                 self.container_log_level,
                 stdout=True,
                 stderr=False,
+                since=logs_since,
             )
+            self._stdout_tailer.subscribe(
+                self.ready_log_pattern, lambda match: ready.set()
+            )
+            self.docker_api_calls["container.logs"] += 1
             self._stdout_tailer.start()
             self._stderr_tailer = container.DockerLogTailer(
                 self._container,
@@ -345,24 +661,164 @@ class LocalstackSession(RunningSession):
                 self.container_log_level,
                 stdout=False,
                 stderr=True,
+                since=logs_since,
+            )
+            self._stderr_tailer.subscribe(
+                self.ready_log_pattern, lambda match: ready.set()
             )
+            self.docker_api_calls["container.logs"] += 1
             self._stderr_tailer.start()
+            timer.lap("log_tailers")
+
+            if self.sample_stats:
+                self.stats_sampler = container.DockerStatsSampler(self._container)
+                self.docker_api_calls["container.stats"] += 1
+                self.stats_sampler.start()
 
             try:
                 timeout_remaining = timeout - (time.time() - start_time)
                 if timeout_remaining <= 0:
                     raise exceptions.TimeoutError("Container took too long to start.")
 
-                self._check_services(timeout_remaining)
+                if not self.reused_container:
+                    # Wait for Localstack to say it's ready, then confirm
+                    # with the service checks. That usually takes only one
+                    # round of checks instead of polling during startup.
+                    if not self._wait_for_ready_log(
+                        ready, timeout_remaining * self.ready_log_timeout_share
+                    ):
+                        logger.debug(
+                            "%r didn't log a ready line, polling services", self
+                        )
+                    timeout_remaining = timeout - (time.time() - start_time)
+                    timer.lap("ready_log")
+
+                # Check at least once, even if the timeout ran out meanwhile.
+                self._check_services(max(timeout_remaining, 0))
+                timer.lap("check_services")
 
                 logger.debug("%r running started hooks", self)
                 plugin.manager.hook.session_started(session=self)
                 logger.debug("%r finished started hooks", self)
+                timer.lap("started_hooks")
+                self._record_startup_timings(timer)
             except exceptions.TimeoutError:
+                self._record_startup_timings(timer, failed=True)
                 if self._container is not None:
+                    unhealthy_container = self._container
                     self.stop(0.1)
+                    if self.reuse_container:
+                        # Don't let the next session reuse it either.
+                        self.docker_api_calls["container.remove"] += 1
+                        unhealthy_container.remove(force=True)
                 raise
 
+    def _snapshot_fallback(self, name):
+        """Commit the container to an image when Localstack can't export state.
+
+        Restoring the image restarts Localstack, so only state that
+        Localstack persists to disk survives. Without persistence the
+        restored container would be empty, so that's an error.
+        """
+        with self._container_lock:
+            if self._container is None:
+                raise exceptions.ContainerNotStartedError(self)
+            if not self._has_persistence():
+                raise exceptions.SnapshotError(
+                    f"{self!r} can't export Localstack state and doesn't persist "
+                    "it to disk (PERSISTENCE or DATA_DIR)"
+                )
+            self.docker_api_calls["container.commit"] += 1
+            image = self._container.commit(
+                repository=constants.SNAPSHOT_IMAGE_REPOSITORY, tag=name
+            )
+        self.snapshots.save(name, "image", image.id)
+
+    def _has_persistence(self):
+        """Return True if Localstack in the container saves state to disk."""
+        env = dict(
+            item.partition("=")[::2]
+            for item in (self._container.attrs.get("Config") or {}).get("Env") or []
+        )
+        return env.get("PERSISTENCE", "").lower() in ("1", "true") or bool(
+            env.get("DATA_DIR")
+        )
+
+    def _restore_image(self, image_id, timeout):
+        """Replace the container with a new one from a committed image."""
+        if self.reuse_container:
+            raise exceptions.SnapshotError(
+                "image snapshots can't be restored into reused containers"
+            )
+        if self._keep_container_running or self.resource_prefix:
+            # Other sessions would keep using the old container.
+            raise exceptions.SnapshotError(
+                "image snapshots can't be restored into shared containers"
+            )
+        try:
+            self.docker_api_calls["images.get"] += 1
+            self.docker_client.images.get(image_id)
+        except docker.errors.ImageNotFound:
+            raise exceptions.SnapshotError(f"snapshot image {image_id} is gone")
+        with self._container_lock:
+            self.stop()
+            self.container_name = generate_container_name()
+            self._snapshot_image = image_id
+            try:
+                self.start(timeout=timeout)
+            finally:
+                self._snapshot_image = None
+
+    def _wait_for_ready_log(self, ready, timeout):
+        """Wait for `ready` to be set by a log tailer.
+
+        Gives up early if both log tailers stop, i.e. the container exited
+        or its logs can't be read.
+
+        Returns:
+            bool: True if the ready line was logged.
+
+        """
+        deadline = time.time() + timeout
+        while not ready.wait(0.1):
+            tailers_alive = (
+                self._stdout_tailer.is_alive() or self._stderr_tailer.is_alive()
+            )
+            if not tailers_alive or time.time() >= deadline:
+                return ready.is_set()
+        return True
+
+    def _run_container(self, image_name):
+        """Run a new Localstack container from `image_name`."""
+        services = ",".join("%s:%s" % pair for pair in self.services.items())
+        kinesis_error_probability = "%f" % self.kinesis_error_probability
+        dynamodb_error_probability = "%f" % self.dynamodb_error_probability
+        use_ssl = str(self.use_ssl).lower()
+        labels = {}
+        if self.reuse_container:
+            labels[constants.CONTAINER_CONFIG_HASH_LABEL] = self.config_hash
+        self.docker_api_calls["containers.run"] += 1
+        self._container = self.docker_client.containers.run(
+            image_name,
+            name=self.container_name,
+            detach=True,
+            auto_remove=self.auto_remove,
+            environment={
+                "DEFAULT_REGION": self.region_name,
+                "SERVICES": services,
+                "KINESIS_ERROR_PROBABILITY": kinesis_error_probability,
+                "DYNAMODB_ERROR_PROBABILITY": dynamodb_error_probability,
+                "USE_SSL": use_ssl,
+            },
+            labels=labels,
+            ports={port: None for port in self.services.values()},
+        )
+        logger.debug(
+            "Started Localstack container %s (id: %s)",
+            self.container_name,
+            self._container.short_id,
+        )
+
     def stop(self, timeout=10):
         """Stop the Localstack container.
 
@@ -380,8 +836,17 @@ class LocalstackSession(RunningSession):
                 logger.debug("Running stopping hooks for %r", self)
                 plugin.manager.hook.session_stopping(session=self)
                 logger.debug("Finished stopping hooks for %r", self)
-                self._container.stop(timeout=10)
+                if self.stats_sampler is not None:
+                    self._stop_stats_sampler()
+                if self.reuse_container or self._keep_container_running:
+                    # Leave the container running for the next session.
+                    self._stdout_tailer.stop()
+                    self._stderr_tailer.stop()
+                else:
+                    self.docker_api_calls["container.stop"] += 1
+                    self._container.stop(timeout=10)
                 self._container = None
+                self._port_map = None
                 self._stdout_tailer = None
                 self._stderr_tailer = None
                 logger.debug("Stopped %r", self)
@@ -389,19 +854,83 @@ class LocalstackSession(RunningSession):
                 plugin.manager.hook.session_stopped(session=self)
                 logger.debug("Finished stopped hooks for %r", self)
 
+    def _stop_stats_sampler(self):
+        """Stop sampling resource usage and log a summary."""
+        self.stats_sampler.stop()
+        self.stats_summary = self.stats_sampler.summary()
+        self.stats_sampler = None
+        if self.stats_summary:
+            summary = self.stats_summary
+            logger.info(
+                "Localstack container %s used CPU %.1f%% peak, %.1f%% average; "
+                "memory %.1f MiB peak, %.1f MiB average; network %.1f MiB in, "
+                "%.1f MiB out; block I/O %.1f MiB read, %.1f MiB written "
+                "(%i samples)",
+                self.container_name,
+                summary["cpu_percent_peak"],
+                summary["cpu_percent_average"],
+                summary["memory_bytes_peak"] / 2**20,
+                summary["memory_bytes_average"] / 2**20,
+                summary["network_rx_bytes"] / 2**20,
+                summary["network_tx_bytes"] / 2**20,
+                summary["block_read_bytes"] / 2**20,
+                summary["block_write_bytes"] / 2**20,
+                summary["samples"],
+            )
+
     def __del__(self):
         """Stop container on garbage collection."""
         self.stop(0.1)
 
+    def _refresh_port_map(self):
+        """Read the container's host port mappings from Docker.
+
+        They don't change while the container runs, so :meth:`map_port`
+        serves them from memory.
+        """
+        self.docker_api_calls["container.reload"] += 1
+        self._container.reload()
+        port_map = {}
+        ports = self._container.attrs["NetworkSettings"]["Ports"] or {}
+        for container_port, host_ports in ports.items():
+            if host_ports:
+                port, _, _ = container_port.partition("/")
+                port_map[int(port)] = int(host_ports[0]["HostPort"])
+        self._port_map = types.MappingProxyType(port_map)
+
     def map_port(self, port):
         """Return host port based on Localstack container port."""
-        with self._container_lock:
-            if self._container is None:
-                raise exceptions.ContainerNotStartedError(self)
-            result = self.docker_client.api.port(self._container.id, int(port))
-            if not result:
-                return None
-            return int(result[0]["HostPort"])
+        port_map = self._port_map
+        if port_map is None:
+            raise exceptions.ContainerNotStartedError(self)
+        return port_map.get(int(port))
+
+
+class StartupTimer:
+    """Time the consecutive phases of starting a session.
+
+    Attributes:
+        start_time (float): When the start began, as a Unix timestamp.
+        phases (dict): Phase names to the number of seconds they took,
+            in the order they ran.
+
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.phases = {}
+        self._started = self._last_lap = time.perf_counter()
+
+    def lap(self, phase):
+        """Record that `phase` ended now, having begun at the last lap."""
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last_lap
+        self._last_lap = now
+
+    @property
+    def total(self):
+        """Return the number of seconds from the start to the last lap."""
+        return self._last_lap - self._started
 
 
 def generate_container_name():
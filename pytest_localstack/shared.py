@@ -0,0 +1,165 @@
+"""Share one Localstack container between pytest-xdist workers.
+
+The first worker to ask for a session starts a :class:`.LocalstackSession`
+and records how to reach it in a state file. Other workers read that file
+and attach with a :class:`.RunningSession`. The last worker to leave stops
+the container.
+"""
+import contextlib
+import fcntl
+import json
+import logging
+import os
+
+import docker
+
+from pytest_localstack import constants, session
+
+
+logger = logging.getLogger(__name__)
+
+# LocalstackSession arguments that don't make sense for a RunningSession.
+CONTAINER_ONLY_KWARGS = (
+    "kinesis_error_probability",
+    "dynamodb_error_probability",
+    "container_log_level",
+    "auto_remove",
+    "pull_image",
+    "pull_cache",
+    "container_name",
+    "hostname",
+    "reuse_container",
+)
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on `path` across processes."""
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class SharedSessionCoordinator:
+    """Coordinate a single Localstack container between pytest-xdist workers.
+
+    Args:
+        directory (str): A directory all workers can see, like the parent
+            of the xdist worker's basetemp.
+        worker_id (str): The xdist worker id, i.e. ``gw0``.
+
+    """
+
+    def __init__(self, directory, worker_id):
+        self.directory = str(directory)
+        self.worker_id = worker_id
+
+    def _paths(self, config_hash):
+        prefix = os.path.join(self.directory, "localstack-" + config_hash[:16])
+        return prefix + ".lock", prefix + ".json"
+
+    @staticmethod
+    def _read_state(state_path):
+        try:
+            with open(state_path) as state_file:
+                return json.load(state_file)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_state(state_path, state):
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, state_path)
+
+    @contextlib.contextmanager
+    def session(
+        self,
+        docker_client,
+        start_timeout=constants.DEFAULT_CONTAINER_START_TIMEOUT,
+        stop_timeout=constants.DEFAULT_CONTAINER_STOP_TIMEOUT,
+        **kwargs,
+    ):
+        """Context manager that yields a session attached to the shared container.
+
+        Keyword arguments are the same as :class:`.LocalstackSession`.
+        The yielded session has a ``resource_prefix`` based on the worker id
+        that tests should use to keep their AWS resource names apart.
+        """
+        kwargs.setdefault("resource_prefix", self.worker_id + "-")
+        # Only containers of --localstack-reuse-containers are labeled for
+        # other runs to find, and outlive the last worker.
+        keep_container = kwargs.get("reuse_container", False)
+        owner_session = session.LocalstackSession(docker_client, **kwargs)
+        lock_path, state_path = self._paths(owner_session.config_hash)
+
+        with file_lock(lock_path):
+            state = self._read_state(state_path)
+            if state is None:
+                logger.debug("%s starting shared %r", self.worker_id, owner_session)
+                owner_session.start(timeout=start_timeout)
+                # Other workers may still use the container when the owner
+                # finishes, the last worker out stops it below.
+                owner_session._keep_container_running = True
+                _session = owner_session
+                state = {
+                    "container_id": owner_session._container.id,
+                    "hostname": owner_session.hostname,
+                    "services": {
+                        service_name: owner_session.map_port(port)
+                        for service_name, port in owner_session.services.items()
+                    },
+                    "region_name": owner_session.region_name,
+                    "use_ssl": owner_session.use_ssl,
+                    "localstack_version": owner_session.localstack_version,
+                    "workers": [],
+                }
+            else:
+                logger.debug(
+                    "%s attaching to shared container %s",
+                    self.worker_id,
+                    state["container_id"],
+                )
+                running_kwargs = {
+                    key: value
+                    for key, value in kwargs.items()
+                    if key not in CONTAINER_ONLY_KWARGS
+                }
+                running_kwargs.update(
+                    services=state["services"],
+                    region_name=state["region_name"],
+                    use_ssl=state["use_ssl"],
+                    localstack_version=state["localstack_version"],
+                )
+                _session = session.RunningSession(state["hostname"], **running_kwargs)
+                _session.start(timeout=start_timeout)
+            state["workers"].append(self.worker_id)
+            self._write_state(state_path, state)
+
+        try:
+            yield _session
+        finally:
+            _session.stop(timeout=stop_timeout)
+            with file_lock(lock_path):
+                state = self._read_state(state_path)
+                state["workers"].remove(self.worker_id)
+                if state["workers"]:
+                    self._write_state(state_path, state)
+                else:
+                    os.remove(state_path)
+                    if not keep_container:
+                        self._stop_container(
+                            docker_client, state["container_id"], stop_timeout
+                        )
+
+    def _stop_container(self, docker_client, container_id, timeout):
+        logger.debug("%s stopping shared container %s", self.worker_id, container_id)
+        try:
+            container = docker_client.containers.get(container_id)
+            container.stop(timeout=timeout)
+        except docker.errors.NotFound:
+            pass
@@ -0,0 +1,316 @@
+"""Manage the state of AWS resources inside Localstack.
+
+Newer Localstack versions can reset their services through internal
+``/_localstack/state`` endpoints. For older versions, the functions in
+:data:`SERVICE_RESETS` delete resources with botocore instead.
+Each reset function takes a :class:`.LocalstackSession`.
+
+Snapshots of a session's state are exported with Localstack's
+``/_localstack/pods/state`` endpoint and kept in a :class:`SnapshotStore`.
+"""
+import hashlib
+import inspect
+import logging
+import os
+import re
+import ssl
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from pytest_localstack import constants, exceptions, resources
+
+
+logger = logging.getLogger(__name__)
+
+STATE_EXPORT_PATH = "/_localstack/pods/state"
+
+
+def internal_request(localstack_session, method, path, data=None, timeout=10):
+    """Send a request to one of Localstack's internal ``/_localstack`` endpoints.
+
+    Returns:
+        bytes: The response body.
+
+    Raises:
+        urllib.error.URLError: If the request fails.
+
+    """
+    service_name = next(iter(localstack_session.services))
+    url = urllib.parse.urljoin(localstack_session.endpoint_url(service_name), path)
+    request = urllib.request.Request(url, data=data, method=method)
+    context = None
+    if localstack_session.use_ssl:
+        # Localstack uses a self-signed certificate.
+        context = ssl._create_unverified_context()  # nosec
+    with urllib.request.urlopen(request, timeout=timeout, context=context) as response:
+        return response.read()
+
+
+def reset_services(localstack_session, service_names, skip_unresettable=False):
+    """Reset Localstack services to an empty state.
+
+    Tries Localstack's internal state endpoints first and falls back
+    to deleting resources through botocore.
+
+    Args:
+        localstack_session (:class:`.LocalstackSession`): The session to reset.
+        service_names (list): Names of the services to reset.
+        skip_unresettable (bool, optional): In the botocore fallback, skip
+            services without a reset function, with a logged warning,
+            instead of raising. Nothing is skipped if none can be reset.
+
+    Raises:
+        pytest_localstack.exceptions.ServiceError: If a service can't be
+            reset by either method.
+
+    """
+    service_names = list(service_names)
+    if localstack_session.service_ports is not constants.LEGACY_SERVICE_PORTS:
+        try:
+            if set(service_names) == set(localstack_session.services):
+                internal_request(localstack_session, "POST", "/_localstack/state/reset")
+            else:
+                for service_name in service_names:
+                    internal_request(
+                        localstack_session,
+                        "POST",
+                        "/_localstack/state/%s/reset" % service_name,
+                    )
+            return
+        except urllib.error.URLError:
+            logger.debug(
+                "Localstack state endpoint unavailable, deleting resources instead",
+                exc_info=True,
+            )
+
+    unresettable = [name for name in service_names if name not in SERVICE_RESETS]
+    if unresettable:
+        if not skip_unresettable or len(unresettable) == len(service_names):
+            raise exceptions.ServiceError(
+                "can't reset service " + ", ".join(unresettable)
+            )
+        logger.warning(
+            "Localstack state endpoint unavailable, not resetting %s",
+            ", ".join(unresettable),
+        )
+    for service_name in service_names:
+        if service_name in SERVICE_RESETS:
+            SERVICE_RESETS[service_name](localstack_session)
+
+
+def export_state(localstack_session):
+    """Export the state of all Localstack services.
+
+    Returns:
+        bytes: An archive that :func:`import_state` can load.
+
+    Raises:
+        urllib.error.URLError: If Localstack can't export its state.
+
+    """
+    return internal_request(localstack_session, "GET", STATE_EXPORT_PATH, timeout=60)
+
+
+def import_state(localstack_session, data):
+    """Load state exported by :func:`export_state` into Localstack.
+
+    Raises:
+        urllib.error.URLError: If Localstack can't import the state.
+
+    """
+    internal_request(localstack_session, "POST", STATE_EXPORT_PATH, data, timeout=60)
+
+
+def seed_key(seed, localstack_session):
+    """Return a snapshot name for the state `seed` creates in a session.
+
+    The name changes whenever the source code of `seed` or the session's
+    Localstack version, region or services change, so stale snapshots
+    are never restored.
+    """
+    try:
+        source = inspect.getsource(seed)
+    except (OSError, TypeError):
+        source = repr(getattr(seed, "__code__", seed))
+    key = "\n".join(
+        [
+            getattr(seed, "__module__", "") or "",
+            getattr(seed, "__qualname__", repr(seed)),
+            source,
+            localstack_session.localstack_version,
+            localstack_session.region_name or "",
+            ",".join(sorted(localstack_session.services)),
+        ]
+    )
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    name = getattr(seed, "__name__", "seed")
+    return "%s-%s" % (re.sub(r"[^A-Za-z0-9_.-]", "_", name), digest)
+
+
+class SnapshotStore:
+    """Keep named snapshots of Localstack state.
+
+    Each snapshot has a kind, ``"state"`` for exported state archives
+    or ``"image"`` for the id of a committed container image.
+
+    Args:
+        directory (str, optional): Save snapshots as files in this
+            directory so later test runs can use them.
+            Defaults to keeping them in memory.
+
+    """
+
+    KINDS = ("state", "image")
+
+    def __init__(self, directory=None):
+        self.directory = None if directory is None else os.fspath(directory)
+        self._snapshots = {}
+
+    def _path(self, name, kind):
+        return os.path.join(self.directory, "%s.%s" % (name, kind))
+
+    def save(self, name, kind, data):
+        """Save a snapshot, replacing any other snapshot with the same name."""
+        if kind not in self.KINDS:
+            raise ValueError("unknown snapshot kind %r" % (kind,))
+        self._snapshots[name] = (kind, data)
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for other_kind in self.KINDS:
+            if other_kind != kind and os.path.exists(self._path(name, other_kind)):
+                os.remove(self._path(name, other_kind))
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        tmp_path = "%s.%i.tmp" % (self._path(name, kind), os.getpid())
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(name, kind))
+
+    def load(self, name):
+        """Return a ``(kind, data)`` tuple, or :obj:`None` if there's no snapshot."""
+        if name in self._snapshots:
+            return self._snapshots[name]
+        if self.directory is None:
+            return None
+        for kind in self.KINDS:
+            try:
+                with open(self._path(name, kind), "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            if kind == "image":
+                data = data.decode("utf-8")
+            self._snapshots[name] = (kind, data)
+            return kind, data
+        return None
+
+    def __contains__(self, name):
+        return self.load(name) is not None
+
+
+def restore_or_seed(localstack_session, seed):
+    """Restore the snapshot of `seed`'s state, or run `seed` and snapshot it.
+
+    Args:
+        localstack_session (:class:`.LocalstackSession`): The session to seed.
+        seed (callable): Takes the session and creates AWS resources in it.
+
+    """
+    snapshot_name = seed_key(seed, localstack_session)
+    if snapshot_name in localstack_session.snapshots:
+        try:
+            localstack_session.restore(snapshot_name)
+            return
+        except exceptions.SnapshotError:
+            logger.debug("Could not restore snapshot %r", snapshot_name, exc_info=True)
+    localstack_session.reset()
+    seed(localstack_session)
+    try:
+        localstack_session.snapshot(snapshot_name)
+    except exceptions.SnapshotError:
+        logger.debug("Could not snapshot %r", snapshot_name, exc_info=True)
+
+
+def _paginate(client, operation_name, result_key, **kwargs):
+    for page in client.get_paginator(operation_name).paginate(**kwargs):
+        yield from page.get(result_key, [])
+
+
+def reset_s3(localstack_session):
+    """Delete all S3 buckets and their objects."""
+    client = localstack_session.botocore.client("s3")
+    for bucket in client.list_buckets()["Buckets"]:
+        resources.delete_bucket(client, bucket["Name"])
+
+
+def reset_sqs(localstack_session):
+    """Delete all SQS queues."""
+    client = localstack_session.botocore.client("sqs")
+    for queue_url in client.list_queues().get("QueueUrls", []):
+        client.delete_queue(QueueUrl=queue_url)
+
+
+def reset_sns(localstack_session):
+    """Delete all SNS topics."""
+    client = localstack_session.botocore.client("sns")
+    for topic in _paginate(client, "list_topics", "Topics"):
+        client.delete_topic(TopicArn=topic["TopicArn"])
+
+
+def reset_dynamodb(localstack_session):
+    """Delete all DynamoDB tables."""
+    client = localstack_session.botocore.client("dynamodb")
+    for table_name in _paginate(client, "list_tables", "TableNames"):
+        client.delete_table(TableName=table_name)
+
+
+def reset_kinesis(localstack_session):
+    """Delete all Kinesis streams."""
+    client = localstack_session.botocore.client("kinesis")
+    for stream_name in _paginate(client, "list_streams", "StreamNames"):
+        client.delete_stream(StreamName=stream_name)
+
+
+def reset_secretsmanager(localstack_session):
+    """Delete all Secrets Manager secrets."""
+    client = localstack_session.botocore.client("secretsmanager")
+    for secret in _paginate(client, "list_secrets", "SecretList"):
+        client.delete_secret(SecretId=secret["ARN"], ForceDeleteWithoutRecovery=True)
+
+
+def reset_ssm(localstack_session):
+    """Delete all SSM parameters."""
+    client = localstack_session.botocore.client("ssm")
+    names = [p["Name"] for p in _paginate(client, "describe_parameters", "Parameters")]
+    for start in range(0, len(names), 10):  # delete_parameters takes 10 at most
+        end = start + 10
+        client.delete_parameters(Names=names[start:end])
+
+
+def reset_logs(localstack_session):
+    """Delete all CloudWatch Logs log groups."""
+    client = localstack_session.botocore.client("logs")
+    for log_group in _paginate(client, "describe_log_groups", "logGroups"):
+        client.delete_log_group(logGroupName=log_group["logGroupName"])
+
+
+def reset_lambda(localstack_session):
+    """Delete all Lambda functions."""
+    client = localstack_session.botocore.client("lambda")
+    for function in _paginate(client, "list_functions", "Functions"):
+        client.delete_function(FunctionName=function["FunctionName"])
+
+
+SERVICE_RESETS = {
+    "dynamodb": reset_dynamodb,
+    "kinesis": reset_kinesis,
+    "lambda": reset_lambda,
+    "logs": reset_logs,
+    "s3": reset_s3,
+    "secretsmanager": reset_secretsmanager,
+    "sns": reset_sns,
+    "sqs": reset_sqs,
+    "ssm": reset_ssm,
+}
@@ -1,6 +1,8 @@
 """Misc utilities."""
+import collections
 import contextlib
 import os
+import threading
 import types
 import urllib.request
 
@@ -77,3 +79,58 @@ def get_version_tuple(version):
         version = version[1:]
     parts = version.split(".")
     return tuple(int(p) for p in parts)
+
+
+CacheInfo = collections.namedtuple("CacheInfo", "hits misses maxsize currsize")
+
+
+class LRUCache:
+    """A thread-safe, bounded least-recently-used cache.
+
+    Args:
+        maxsize (int): The most values to keep. 0 disables caching.
+
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = max(int(maxsize or 0), 0)
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_create(self, key, create):
+        """Return the value for `key`, calling `create()` to make it if needed.
+
+        `create` isn't called with the lock held, so two threads asking
+        for a missing key at once may both call it; the first value
+        stored wins.
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._data.move_to_end(key)
+                return value
+        value = create()
+        if not self.maxsize:
+            return value
+        with self._lock:
+            value = self._data.setdefault(key, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def cache_info(self):
+        """Return hit and miss statistics, like :func:`functools.lru_cache`."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._data))
+
+    def clear(self):
+        """Remove all values. The statistics are kept."""
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,85 @@
+"""Measure what patch_botocore() adds to botocore client attribute access.
+
+Run with ``python -m tests.benchmarks.bench_client_getattribute``.
+
+Nothing here talks to Localstack. The existing client is created before
+patching, the native one while patched, and the Localstack proxy of the
+existing client is set up front, so only attribute lookups are timed.
+"""
+import argparse
+import timeit
+
+import botocore.client
+import botocore.session
+
+from pytest_localstack.contrib import botocore as localstack_botocore
+from pytest_localstack.session import RunningSession
+
+
+# (label, attribute) pairs: an API method, which is never proxied, and
+# two attributes that botocore reads on every API call.
+ATTRIBUTES = [
+    ("method", "list_buckets"),
+    ("proxied", "meta"),
+    ("proxied", "_endpoint"),
+]
+
+
+def make_client():
+    """Make a botocore S3 client with dummy credentials."""
+    return botocore.session.Session().create_client(
+        "s3",
+        region_name="us-east-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+
+
+def time_access(client, attribute, number):
+    """Return the mean time in nanoseconds to read `attribute` from `client`."""
+    timer = timeit.Timer("client.%s" % attribute, globals={"client": client})
+    best = min(timer.repeat(repeat=5, number=number))
+    return best / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    existing_client = make_client()
+    proxy_client = make_client()
+    proxy_client._is_pytest_localstack = True
+
+    results = {}
+    for label, attribute in ATTRIBUTES:
+        results[("unpatched", attribute)] = time_access(
+            existing_client, attribute, args.number
+        )
+
+    localstack_session = RunningSession("127.0.0.1", services=["s3"])
+    with localstack_session.botocore.patch_botocore():
+        localstack_botocore._get_binding().proxy_clients[existing_client] = proxy_client
+        # Created while patched, so a Localstack client.
+        native_client = make_client()
+        for label, attribute in ATTRIBUTES:
+            results[("native", attribute)] = time_access(
+                native_client, attribute, args.number
+            )
+            results[("existing", attribute)] = time_access(
+                existing_client, attribute, args.number
+            )
+
+    print("%-12s %-10s %10s %10s" % ("attribute", "client", "ns/access", "overhead"))
+    for label, attribute in ATTRIBUTES:
+        baseline = results[("unpatched", attribute)]
+        for client_kind in ("unpatched", "native", "existing"):
+            elapsed = results[(client_kind, attribute)]
+            print(
+                "%-12s %-10s %10.1f %+10.1f"
+                % (attribute, client_kind, elapsed, elapsed - baseline)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Measure LocalstackEndpointResolver endpoint lookups.
+
+Run with ``python -m tests.benchmarks.bench_endpoint_resolver``.
+
+Compares the indexed resolver with a copy of the previous resolver, which
+scanned the ``endpoints.json`` partitions on every call. Nothing here
+talks to Localstack.
+"""
+import argparse
+import timeit
+
+from pytest_localstack.contrib import botocore as localstack_botocore
+from pytest_localstack.session import RunningSession
+
+
+SERVICES = ["s3", "sqs", "dynamodb", "sns", "kinesis"]
+
+
+class ScanningEndpointResolver(localstack_botocore.LocalstackEndpointResolver):
+    """The resolver before endpoints were indexed."""
+
+    def get_available_endpoints(
+        self, service_name, partition_name="aws", allow_non_regional=False
+    ):
+        result = []
+        for partition in self._endpoint_data["partitions"]:
+            if partition["partition"] != "aws":
+                continue
+            services = partition["services"]
+            if service_name not in services:
+                continue
+            for endpoint_name in services[service_name]["endpoints"]:
+                if allow_non_regional or endpoint_name in self.valid_regions:
+                    result.append(endpoint_name)
+        return result
+
+    def construct_endpoint(self, service_name, region_name=None, *args, **kwargs):
+        if region_name is None:
+            region_name = self.localstack_session.region_name
+        for partition in self._endpoint_data["partitions"]:
+            if partition["partition"] != "aws":
+                continue
+            result = self._endpoint_for_partition(
+                partition, service_name, region_name, False, False
+            )
+            if result:
+                result["hostname"] = self.localstack_session.service_hostname(
+                    service_name
+                )
+                result["protocols"] = ["http"]
+                result.pop("sslCommonName", None)
+                result["dnsSuffix"] = self.localstack_session.hostname
+                return result
+
+
+def time_call(func, number):
+    """Return the mean time in microseconds of calling `func`."""
+    best = min(timeit.repeat(func, repeat=5, number=number))
+    return best / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    localstack_session = RunningSession(
+        "127.0.0.1", services=SERVICES, region_name="us-east-1"
+    )
+    loader = localstack_session.botocore.session().get_component("data_loader")
+    endpoints = loader.load_data("endpoints")
+
+    construct_time = time_call(
+        lambda: localstack_botocore.LocalstackEndpointResolver(
+            localstack_session, endpoints
+        ),
+        max(args.number // 100, 1),
+    )
+    print("building the index: %.1f us per resolver" % construct_time)
+
+    resolvers = [
+        ("scanning", ScanningEndpointResolver(localstack_session, endpoints)),
+        (
+            "indexed",
+            localstack_botocore.LocalstackEndpointResolver(
+                localstack_session, endpoints
+            ),
+        ),
+    ]
+    print("%-10s %-10s %14s %14s" % ("resolver", "service", "construct us", "list us"))
+    for label, resolver in resolvers:
+        for service_name in SERVICES:
+            construct = time_call(
+                lambda: resolver.construct_endpoint(service_name), args.number
+            )
+            available = time_call(
+                lambda: resolver.get_available_endpoints(service_name), args.number
+            )
+            print(
+                "%-10s %-10s %14.2f %14.2f"
+                % (label, service_name, construct, available)
+            )
+
+
+if __name__ == "__main__":
+    main()
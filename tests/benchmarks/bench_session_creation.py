@@ -0,0 +1,75 @@
+"""Measure creating many Localstack botocore sessions and clients.
+
+Run with ``python -m tests.benchmarks.bench_session_creation``.
+
+Compares a loader per Session (plain botocore behavior) with the shared
+process-wide loader, counting the JSON files read from disk.
+Nothing here talks to Localstack.
+"""
+import argparse
+import contextlib
+import time
+from unittest import mock
+
+import botocore.loaders
+import botocore.session
+
+from pytest_localstack.contrib import botocore as localstack_botocore
+from pytest_localstack.session import RunningSession
+
+
+SERVICES = ["s3", "sqs", "dynamodb", "sns", "kinesis"]
+
+
+def run(sessions, shared):
+    """Create `sessions` sessions with a client per service.
+
+    Returns:
+        tuple: Seconds taken and the number of JSON files loaded.
+
+    """
+    localstack_botocore._shared_loaders.clear()
+    localstack_session = RunningSession("127.0.0.1", services=SERVICES)
+    load_file = botocore.loaders.JSONFileLoader.load_file
+    with contextlib.ExitStack() as stack:
+        counted_load_file = stack.enter_context(
+            mock.patch.object(
+                botocore.loaders.JSONFileLoader,
+                "load_file",
+                autospec=True,
+                side_effect=load_file,
+            )
+        )
+        if not shared:
+            stack.enter_context(
+                mock.patch.object(
+                    localstack_botocore.Session,
+                    "_register_data_loader",
+                    botocore.session.Session._register_data_loader,
+                )
+            )
+        start = time.perf_counter()
+        for _ in range(sessions):
+            session = localstack_session.botocore.session()
+            for service_name in SERVICES:
+                session.create_client(service_name)
+        elapsed = time.perf_counter() - start
+    return elapsed, counted_load_file.call_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    args = parser.parse_args()
+
+    print("%-10s %10s %12s %12s" % ("loader", "seconds", "ms/session", "file loads"))
+    for label, shared in (("per-session", False), ("shared", True)):
+        elapsed, loads = run(args.sessions, shared)
+        print(
+            "%-10s %10.2f %12.1f %12i"
+            % (label, elapsed, elapsed / args.sessions * 1000, loads)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+from tests import utils as test_utils
+
+from pytest_localstack import plugin
+
+
+aioboto3 = pytest.importorskip("aioboto3")
+
+from pytest_localstack.contrib import aioboto3 as ptls_aioboto3  # noqa: E402
+
+
+def test_session_contribution():
+    dummy_session = type("DummySession", (object,), {})()
+    plugin.manager.hook.contribute_to_session(session=dummy_session)
+    assert isinstance(dummy_session.aioboto3, ptls_aioboto3.Aioboto3TestResourceFactory)
+
+
+def test_default_session():
+    localstack = test_utils.make_test_RunningSession()
+    assert localstack.aioboto3.default_session is localstack.aioboto3.default_session
+
+
+def test_client_and_resource():
+    """aioboto3 clients and resources point to Localstack."""
+    localstack = test_utils.make_test_RunningSession(region_name="us-east-1")
+
+    async def check():
+        async with localstack.aioboto3.client("sqs") as client:
+            assert "127.0.0.1" in client._endpoint.host
+        async with localstack.aioboto3.resource("s3") as resource:
+            assert "127.0.0.1" in resource.meta.client._endpoint.host
+
+    asyncio.run(check())
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from tests import utils as test_utils
+
+from pytest_localstack import constants, exceptions, plugin
+
+
+aiobotocore = pytest.importorskip("aiobotocore")
+import aiobotocore.session  # noqa: E402
+
+from pytest_localstack.contrib import aiobotocore as localstack_aiobotocore  # noqa
+
+
+def test_session_contribution():
+    dummy_session = type("DummySession", (object,), {})()
+    plugin.manager.hook.contribute_to_session(session=dummy_session)
+    assert isinstance(
+        dummy_session.aiobotocore,
+        localstack_aiobotocore.AiobotocoreTestResourceFactory,
+    )
+
+
+@pytest.mark.parametrize("service_name", ["s3", "sqs", "dynamodb", "sts"])
+def test_client(service_name):
+    """Clients point to Localstack and use Localstack credentials."""
+    localstack = test_utils.make_test_RunningSession(region_name="us-east-1")
+
+    async def check():
+        async with localstack.aiobotocore.client(service_name) as client:
+            assert client._is_pytest_localstack
+            assert "127.0.0.1" in client._endpoint.host
+            assert client.meta.config.s3["addressing_style"] == "path"
+            session = localstack.aiobotocore.default_session
+            credentials = await session.get_credentials()
+            assert credentials.method == "localstack-default"
+
+    asyncio.run(check())
+
+
+def test_patch_aiobotocore_per_task():
+    """Concurrent tasks bound to different sessions reach their own Localstack."""
+    sessions = [
+        test_utils.make_test_RunningSession(services={"s3": port})
+        for port in (4566, 4567)
+    ]
+
+    async def worker(localstack):
+        with localstack.aiobotocore.patch_aiobotocore():
+            # Let the other task enter its patch too.
+            await asyncio.sleep(0)
+            session = aiobotocore.session.get_session()
+            async with session.create_client("s3") as client:
+                return client._endpoint.host
+
+    async def run():
+        return await asyncio.gather(*(worker(localstack) for localstack in sessions))
+
+    hosts = asyncio.run(run())
+    for localstack, host in zip(sessions, hosts):
+        assert host.endswith(":%i" % localstack.services["s3"])
+
+
+def test_patch_aiobotocore_blocks_requests_to_aws():
+    """Requests that would leave Localstack are blocked and counted."""
+    localstack = test_utils.make_test_RunningSession(region_name="us-east-1")
+
+    async def run():
+        session = aiobotocore.session.get_session()
+        async with session.create_client(
+            "s3", endpoint_url="https://s3.amazonaws.com"
+        ) as client:
+            with pytest.raises(exceptions.UnpatchedRequestError):
+                await client.list_buckets()
+
+    with localstack.aiobotocore.patch_aiobotocore():
+        asyncio.run(run())
+    assert localstack.botocore.blocked_requests == {"s3.amazonaws.com": 1}
+    assert (
+        vars(aiobotocore.session.AioSession)["_create_client"]
+        is localstack_aiobotocore._original_create_client
+    )
+
+
+def test_patch_aiobotocore_unknown_host_check():
+    localstack = test_utils.make_test_RunningSession()
+    with pytest.raises(ValueError):
+        with localstack.aiobotocore.patch_aiobotocore(host_check="nope"):
+            pass
+
+
+def test_default_credentials():
+    credentials = asyncio.run(
+        localstack_aiobotocore.DefaultCredentialProvider().load()
+    )
+    assert credentials.access_key == constants.DEFAULT_AWS_ACCESS_KEY_ID
@@ -1,4 +1,5 @@
 import os
+import threading
 from unittest import mock
 
 import boto3
@@ -160,3 +161,22 @@ def test_patch_botocore_credentials(make_test_session):
         assert (credentials.secret_key if credentials else None) == initial_secret_key
         assert (credentials.token if credentials else None) == initial_token
         assert (credentials.method if credentials else None) == initial_method
+
+
+def test_client_cache():
+    """boto3 clients and per-thread resources are reused with a client cache."""
+    localstack = test_utils.make_test_RunningSession(client_cache_size=4)
+    factory = localstack.boto3
+    client = factory.client("s3")
+    resource = factory.resource("s3")
+    assert factory.client("s3") is client
+    assert factory.resource("s3") is resource
+
+    other_thread_resources = []
+    thread = threading.Thread(
+        target=lambda: other_thread_resources.append(factory.resource("s3"))
+    )
+    thread.start()
+    thread.join()
+    assert other_thread_resources[0] is not resource
+    assert factory.client_cache.cache_info().hits == 2
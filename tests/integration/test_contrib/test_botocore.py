@@ -1,11 +1,18 @@
+import concurrent.futures
+import threading
+from unittest import mock
+
 import botocore
+import botocore.awsrequest
+import botocore.client
+import botocore.config
 import botocore.session
 
 import pytest
 from tests import utils as test_utils
 
 import pytest_localstack
-from pytest_localstack import constants, exceptions, plugin
+from pytest_localstack import constants, exceptions, plugin, profiling
 from pytest_localstack.contrib import botocore as localstack_botocore
 
 
@@ -93,6 +100,29 @@ def test_LocalstackEndpointResolver(
         assert result["protocols"] == ["http"]
 
 
+def test_LocalstackEndpointResolver_is_indexed(monkeypatch):
+    """Endpoints for the session's services are resolved without a scan."""
+    localstack = test_utils.make_test_RunningSession(
+        region_name="us-east-1", services=["s3", "sqs"]
+    )
+    loader = localstack.botocore.session().get_component("data_loader")
+    resolver = localstack_botocore.LocalstackEndpointResolver(
+        localstack, loader.load_data("endpoints")
+    )
+    assert ("s3", "us-east-1", False, False) in resolver._endpoints
+    assert ("sqs", "aws-global", False, False) in resolver._endpoints
+
+    def fail(*args, **kwargs):
+        raise AssertionError("endpoints.json was scanned")
+
+    monkeypatch.setattr(resolver, "_endpoint_for_partition", fail)
+    result = resolver.construct_endpoint("s3")
+    assert result["hostname"] == "127.0.0.1:%i" % constants.SERVICE_PORTS["s3"]
+    # Results are copies, the index isn't changed by callers.
+    result["hostname"] = "example.com"
+    assert resolver.construct_endpoint("s3")["hostname"] != "example.com"
+
+
 @pytest.mark.parametrize(
     "make_test_session",
     [test_utils.make_test_LocalstackSession, test_utils.make_test_RunningSession],
@@ -213,3 +243,326 @@ def test_exceptions_populated(make_test_session):
         assert botocore_client._exceptions is not None
 
     assert botocore_client._exceptions is None
+
+
+def test_patch_only_replaces_proxied_attributes():
+    """Patching doesn't slow down lookups of other client attributes."""
+    localstack = test_utils.make_test_RunningSession()
+    original_exceptions = vars(botocore.client.BaseClient)["exceptions"]
+    existing_client = botocore.session.get_session().create_client(
+        "s3", localstack.region_name
+    )
+    existing_class = type(existing_client)
+
+    with localstack.botocore.patch_botocore():
+        assert vars(botocore.client.BaseClient)["exceptions"] is original_exceptions
+        client_attrs = vars(existing_class)
+        assert "__getattribute__" not in client_attrs
+        for name in localstack_botocore._PROXIED_CLIENT_ATTRS:
+            assert isinstance(
+                client_attrs[name], localstack_botocore._ProxiedClientAttribute
+            )
+            assert client_attrs[name].original is (
+                original_exceptions if name == "exceptions" else None
+            )
+
+        # Clients created while patched read their own attributes.
+        native_client = botocore.session.get_session().create_client(
+            "s3", localstack.region_name
+        )
+        native_attrs = vars(type(native_client))
+        assert not any(
+            name in native_attrs for name in localstack_botocore._PROXIED_CLIENT_ATTRS
+        )
+        assert "127.0.0.1" in native_client._endpoint.host
+
+    client_attrs = vars(existing_class)
+    assert "meta" not in client_attrs
+    assert "exceptions" not in client_attrs
+    assert vars(botocore.client.BaseClient)["exceptions"] is original_exceptions
+
+
+@pytest.mark.parametrize("service_name", ["s3", "sqs", "dynamodb"])
+def test_patch_retarget(service_name):
+    """Existing clients are pointed at Localstack in place, and back."""
+    localstack = test_utils.make_test_RunningSession()
+    original_bc_client = botocore.session.get_session().create_client(
+        service_name, localstack.region_name
+    )
+    original_endpoint = original_bc_client._endpoint
+
+    with localstack.botocore.patch_botocore(strategy="retarget"):
+        assert "127.0.0.1" in original_bc_client._endpoint.host
+        assert "_endpoint" in vars(original_bc_client)
+        assert "_endpoint" not in vars(botocore.client.BaseClient)
+
+    assert original_bc_client._endpoint is original_endpoint
+
+
+def test_patch_unknown_strategy():
+    """Unknown patch strategies are rejected."""
+    localstack = test_utils.make_test_RunningSession()
+    with pytest.raises(ValueError):
+        with localstack.botocore.patch_botocore(strategy="nope"):
+            pass
+    with pytest.raises(ValueError):
+        localstack_botocore.patch_fixture(patch_strategy="nope")
+
+
+@pytest.mark.parametrize(
+    "host,strict,lenient",
+    [
+        ("127.0.0.1", True, True),
+        ("localhost", True, True),
+        ("::1", True, True),
+        ("127.0.0.2", False, True),
+        ("bucket.localhost", False, True),
+        ("s3.amazonaws.com", False, False),
+        ("localhost.amazonaws.com", False, False),
+        (None, False, False),
+    ],
+)
+def test_host_check(host, strict, lenient):
+    """Only Localstack hosts pass the request safety check."""
+    localstack = test_utils.make_test_RunningSession()
+    hosts = localstack_botocore._localstack_hosts(localstack)
+    assert localstack_botocore._make_host_check(hosts, "strict")(host) is strict
+    assert localstack_botocore._make_host_check(hosts, "lenient")(host) is lenient
+
+
+def test_patch_blocks_requests_to_aws():
+    """Requests that would leave Localstack are blocked and counted."""
+    localstack = test_utils.make_test_RunningSession(region_name="us-east-1")
+    with localstack.botocore.patch_botocore():
+        client = botocore.session.get_session().create_client(
+            "s3", endpoint_url="https://s3.amazonaws.com"
+        )
+        with pytest.raises(exceptions.UnpatchedRequestError):
+            client.list_buckets()
+    assert localstack.botocore.blocked_requests == {"s3.amazonaws.com": 1}
+
+    with pytest.raises(ValueError):
+        with localstack.botocore.patch_botocore(host_check="nope"):
+            pass
+
+
+def test_patch_routes_per_context():
+    """Threads bound to different sessions reach their own Localstack."""
+    sessions = [
+        test_utils.make_test_RunningSession(services={"s3": port})
+        for port in (4566, 4567)
+    ]
+    both_patched = threading.Barrier(len(sessions))
+    hosts = {}
+
+    def worker(localstack):
+        with localstack.botocore.patch_botocore():
+            both_patched.wait(timeout=10)
+            client = botocore.session.get_session().create_client("s3")
+            hosts[localstack] = client._endpoint.host
+            both_patched.wait(timeout=10)
+
+    with concurrent.futures.ThreadPoolExecutor(len(sessions)) as executor:
+        list(executor.map(worker, sessions))
+
+    for localstack in sessions:
+        assert hosts[localstack].endswith(":%i" % localstack.services["s3"])
+    assert not localstack_botocore._active_bindings
+    assert "meta" not in vars(botocore.client.BaseClient)
+
+
+def test_patch_unbound_context_uses_latest_binding():
+    """Threads that aren't bound use the most recently entered session."""
+    outer = test_utils.make_test_RunningSession(services={"s3": 4566})
+    inner = test_utils.make_test_RunningSession(services={"s3": 4567})
+
+    def create_client():
+        return botocore.session.get_session().create_client("s3")
+
+    with outer.botocore.patch_botocore():
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            client = executor.submit(create_client).result()
+            assert client._endpoint.host.endswith(":4566")
+            with inner.botocore.patch_botocore():
+                client = executor.submit(create_client).result()
+                assert client._endpoint.host.endswith(":4567")
+            client = executor.submit(create_client).result()
+            assert client._endpoint.host.endswith(":4566")
+
+
+def test_patch_exit_in_other_thread():
+    """A patch can be exited in another thread than it was entered in."""
+    localstack = test_utils.make_test_RunningSession()
+    patch = localstack.botocore.patch_botocore()
+    patch.__enter__()
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        executor.submit(patch.__exit__, None, None, None).result()
+    assert not localstack_botocore._active_bindings
+    assert localstack_botocore._get_binding() is None
+    assert "localstack_session" not in vars(botocore.session.Session)
+
+
+def test_client_cache():
+    """Clients are reused when the session has a client cache."""
+    localstack = test_utils.make_test_RunningSession(
+        region_name="us-east-1", client_cache_size=2
+    )
+    factory = localstack.botocore
+    client = factory.client("s3")
+    assert factory.client("s3", region_name="us-east-1") is client
+    assert factory.client("s3", "us-east-1") is client
+    assert factory.client("sqs") is not client
+    assert factory.client_cache.cache_info().hits == 2
+    assert factory.client_cache.cache_info().misses == 2
+
+    localstack.stop()
+    assert factory.client("s3") is not client
+
+
+def test_client_cache_disabled():
+    """Clients aren't cached by default."""
+    localstack = test_utils.make_test_RunningSession()
+    assert localstack.botocore.client("s3") is not localstack.botocore.client("s3")
+
+
+def test_create_client_concurrently():
+    """Many threads can create Localstack clients at the same time."""
+    localstack = test_utils.make_test_RunningSession(region_name="us-east-1")
+    services = ["s3", "sqs", "sts", "dynamodb"]
+    barrier = threading.Barrier(32)
+
+    def _create_client(i):
+        barrier.wait()
+        # Pass config positionally sometimes to cover both code paths.
+        if i % 2:
+            return localstack.botocore.client(services[i % len(services)])
+        return localstack.botocore.default_session.create_client(
+            services[i % len(services)],
+            "us-east-1",
+            None,
+            True,
+            None,
+            None,
+            None,
+            None,
+            None,
+            botocore.config.Config(connect_timeout=7),
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
+        clients = list(executor.map(_create_client, range(32)))
+
+    for i, client in enumerate(clients):
+        assert client._is_pytest_localstack
+        assert "127.0.0.1" in client._endpoint.host
+        assert client.meta.config.s3["addressing_style"] == "path"
+        if not i % 2:
+            assert client.meta.config.connect_timeout == 7
+
+
+def test_create_client_sts_is_regional(monkeypatch):
+    """STS clients don't use the global AWS endpoint."""
+    monkeypatch.setenv("AWS_STS_REGIONAL_ENDPOINTS", "legacy")
+    localstack = test_utils.make_test_RunningSession(region_name="us-east-1")
+    session = localstack.botocore.session()
+    assert session.get_config_variable("sts_regional_endpoints") == "regional"
+    client = session.create_client("sts")
+    assert "127.0.0.1" in client._endpoint.host
+
+
+def test_sessions_share_data_loader(monkeypatch, tmp_path):
+    """Localstack sessions share one botocore loader per data path."""
+    localstack = test_utils.make_test_RunningSession()
+    loader = localstack.botocore.session().get_component("data_loader")
+    assert localstack.botocore.session().get_component("data_loader") is loader
+    other_localstack = test_utils.make_test_RunningSession()
+    assert other_localstack.botocore.session().get_component("data_loader") is loader
+
+    monkeypatch.setenv("AWS_DATA_PATH", str(tmp_path))
+    other_loader = localstack.botocore.session().get_component("data_loader")
+    assert other_loader is not loader
+    assert str(tmp_path) in other_loader.search_paths
+
+
+def test_connection_settings():
+    """Session connection settings are merged into every client config."""
+    localstack = test_utils.make_test_RunningSession(
+        max_pool_connections=50, tcp_keepalive=True
+    )
+    client = localstack.botocore.client("s3")
+    assert client.meta.config.max_pool_connections == 50
+    assert client.meta.config.tcp_keepalive
+    assert client.meta.config.s3["addressing_style"] == "path"
+
+    # The client's own config wins.
+    client = localstack.botocore.client(
+        "s3", config=botocore.config.Config(max_pool_connections=5)
+    )
+    assert client.meta.config.max_pool_connections == 5
+    assert client.meta.config.tcp_keepalive
+
+
+def test_share_connection_pool():
+    """Clients reaching the same Localstack port share one connection pool."""
+    localstack = test_utils.make_test_RunningSession(
+        services={"s3": 4566, "sqs": 4566, "sns": 4575},
+        share_connection_pool=True,
+    )
+    factory = localstack.botocore
+    s3 = factory.client("s3")
+    sqs = factory.client("sqs")
+    sns = factory.client("sns")
+    slow_s3 = factory.client("s3", config=botocore.config.Config(read_timeout=300))
+    assert isinstance(s3._endpoint.http_session, localstack_botocore._SharedHTTPSession)
+    assert sqs._endpoint.http_session is s3._endpoint.http_session
+    assert sns._endpoint.http_session is not s3._endpoint.http_session
+    assert slow_s3._endpoint.http_session is not s3._endpoint.http_session
+
+    # Closing one client keeps the pool open for the others.
+    shared = s3._endpoint.http_session
+    with mock.patch.object(shared._http_session, "close") as close:
+        s3.close()
+        assert not close.called
+        localstack_botocore.session_stopped(localstack)
+        assert close.called
+    assert not factory._http_sessions
+
+
+def test_no_shared_connection_pool_by_default():
+    localstack = test_utils.make_test_RunningSession()
+    s3 = localstack.botocore.client("s3")
+    sqs = localstack.botocore.client("sqs")
+    assert s3._endpoint.http_session is not sqs._endpoint.http_session
+
+
+def test_profile_client_calls(monkeypatch):
+    """Clients from Localstack sessions report calls to the profiler."""
+    # Leave the profiler of this test run, if any, alone.
+    monkeypatch.setattr(profiling, "_profiler", None)
+    localstack = test_utils.make_test_RunningSession(region_name="us-east-1")
+    body = b"<ListAllMyBucketsResult><Buckets/></ListAllMyBucketsResult>"
+
+    def send(request, **kwargs):
+        raw = mock.Mock()
+        raw.stream.return_value = iter([body])
+        return botocore.awsrequest.AWSResponse(request.url, 200, {}, raw)
+
+    profiler = profiling.start()
+    detector = profiling.SlowCallDetector(0)
+    profiler.listeners.append(detector.observe_call)
+    try:
+        profiler.current_test = "test_something"
+        client = localstack.botocore.client("s3")
+        client.meta.events.register("before-send", send)
+        client.list_buckets()
+        client.list_buckets()
+    finally:
+        profiling.stop()
+
+    stats = profiler.stats[("test_something", "s3", "ListBuckets")]
+    assert stats.calls == 2
+    slow_calls = detector.pop("test_something")
+    assert len(slow_calls) == 2
+    assert slow_calls[0].startswith("slow AWS call s3.ListBuckets took ")
+    assert stats.seconds > 0
+    assert stats.response_bytes == 2 * len(body)
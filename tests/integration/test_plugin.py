@@ -1,7 +1,15 @@
+import os
+from unittest import mock
+
+import pytest
+
 import pytest_localstack
 from pytest_localstack import hookspecs, plugin
 
 
+pytest_plugins = ["pytester"]
+
+
 @hookspecs.pytest_localstack_hookimpl
 def contribute_to_module(pytest_localstack):
     pytest_localstack._foo = "bar"
@@ -12,3 +20,110 @@ def test_register_plugin_module():
     plugin.register_plugin_module("tests.integration.test_plugin")
     assert pytest_localstack._foo == "bar"
     del pytest_localstack._foo
+
+
+SLOW_CALL_TEST = """
+import botocore.awsrequest
+import botocore.session
+
+from pytest_localstack import profiling
+
+
+class RawResponse:
+    def stream(self):
+        yield b"<ListAllMyBucketsResult><Buckets/></ListAllMyBucketsResult>"
+
+
+def test_slow_call():
+    client = botocore.session.Session().create_client(
+        "s3",
+        region_name="us-east-1",
+        aws_access_key_id="key",
+        aws_secret_access_key="secret",
+    )
+    profiling.instrument(client)
+    # Answer without sending the request anywhere.
+    client.meta.events.register(
+        "before-send",
+        lambda request, **kwargs: botocore.awsrequest.AWSResponse(
+            request.url, 200, {}, RawResponse()
+        ),
+    )
+    client.list_buckets()
+"""
+
+
+@pytest.fixture
+def plugin_pytester(pytester, monkeypatch):
+    """A pytester whose subprocesses can import pytest_localstack."""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    monkeypatch.setenv(
+        "PYTHONPATH", os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))
+    )
+    pytester.makepyfile(SLOW_CALL_TEST)
+    return pytester
+
+
+def test_slow_call_warning(plugin_pytester):
+    """Slow calls are reported in the warnings summary."""
+    result = plugin_pytester.runpytest_subprocess(
+        "-p", "pytest_localstack", "--localstack-slow-call=0"
+    )
+    result.assert_outcomes(passed=1, warnings=1)
+    result.stdout.fnmatch_lines(
+        ["*SlowCallWarning: slow AWS call s3.ListBuckets took * in *test_slow_call*"]
+    )
+
+
+def test_slow_call_warning_as_error(plugin_pytester):
+    """With -W error, slow calls fail the test's teardown."""
+    result = plugin_pytester.runpytest_subprocess(
+        "-p",
+        "pytest_localstack",
+        "--localstack-slow-call=0",
+        "-W",
+        "error::pytest_localstack.exceptions.SlowCallWarning",
+    )
+    result.assert_outcomes(passed=1, errors=1)
+    result.stdout.no_fnmatch_line("*INTERNALERROR*")
+    result.stdout.fnmatch_lines(["*ERROR at teardown of test_slow_call*"])
+
+
+def test_unconfigure_clears_session_kwargs(tmp_path):
+    """Options from the command line don't outlive their pytest run."""
+    if pytest_localstack._pytest_config is not None:
+        pytest.skip("the plugin is configured for this test run")
+    options = {
+        "--localstack-reuse-containers": True,
+        "--localstack-sample-stats": True,
+        "--localstack-timings-file": str(tmp_path / "timings.jsonl"),
+        "--localstack-slow-call": None,
+        "--localstack-metrics-file": None,
+    }
+    config = mock.Mock(cache=None)
+    config.getoption.side_effect = lambda name: options.get(name)
+    pytest_localstack.pytest_configure(config)
+    try:
+        assert pytest_localstack._session_kwargs == {
+            "reuse_container": True,
+            "sample_stats": True,
+            "timings_file": str(tmp_path / "timings.jsonl"),
+        }
+    finally:
+        pytest_localstack.pytest_unconfigure(config)
+    assert pytest_localstack._session_kwargs == {}
+
+
+def test_unconfigure_clears_background_starters(monkeypatch):
+    """Background sessions aren't started again by a later pytest run."""
+    starter = mock.Mock()
+    monkeypatch.setattr(pytest_localstack, "_background_starters", [starter])
+    # Put back what unconfiguring changes, in case the plugin is in use.
+    for name in ["_pytest_config", "_slow_call_detector"]:
+        monkeypatch.setattr(pytest_localstack, name, getattr(pytest_localstack, name))
+    monkeypatch.setattr(pytest_localstack, "_metrics_collector", None)
+    monkeypatch.setattr(pytest_localstack, "_session_kwargs", {})
+    monkeypatch.setattr(pytest_localstack.profiling, "stop", mock.Mock())
+    pytest_localstack.pytest_unconfigure(mock.Mock())
+    starter.stop.assert_called_once_with()
+    assert pytest_localstack._background_starters == []
@@ -0,0 +1,85 @@
+"""Unit tests for pytest_localstack.background."""
+import contextlib
+import os
+import tempfile
+import threading
+from unittest import mock
+
+import pytest
+
+import pytest_localstack
+from pytest_localstack import background
+
+
+def test_BackgroundSessionStarter():
+    """Test the session is started once in the background and stopped."""
+    events = []
+    release = threading.Event()
+
+    @contextlib.contextmanager
+    def make_session():
+        release.wait(5)
+        events.append(("start", threading.current_thread().name))
+        yield mock.sentinel.session
+        events.append(("stop", threading.current_thread().name))
+
+    starter = background.BackgroundSessionStarter(make_session)
+    starter.start()
+    starter.start()
+    release.set()
+    assert starter.result(timeout=5) is mock.sentinel.session
+    assert events == [("start", "pytest-localstack-start")]
+
+    starter.stop()
+    starter.stop()
+    assert events[1:] == [("stop", threading.current_thread().name)]
+
+
+def test_BackgroundSessionStarter_error():
+    """Test that start errors are raised to whoever waits for the session."""
+
+    @contextlib.contextmanager
+    def make_session():
+        raise RuntimeError("no docker")
+        yield
+
+    starter = background.BackgroundSessionStarter(make_session)
+    with pytest.raises(RuntimeError):
+        starter.result(timeout=5)
+    starter.stop()
+
+
+def test_background_start_requires_session_scope():
+    with pytest.raises(ValueError):
+        pytest_localstack.session_fixture(scope="module", background_start=True)
+
+
+def test_background_start_shares_xdist_container(monkeypatch, tmp_path):
+    """Test that background sessions use the xdist container coordinator."""
+    config = mock.Mock(workerinput={"workerid": "gw1", "testrunuid": "abc"})
+    config.getoption.return_value = str(tmp_path / "popen-gw1")
+    monkeypatch.setattr(pytest_localstack, "_pytest_config", config)
+    monkeypatch.setattr(pytest_localstack, "_share_xdist_container", True)
+    make_session = mock.Mock()
+    monkeypatch.setattr(pytest_localstack, "_make_session", make_session)
+
+    pytest_localstack._make_background_session({"docker_client": None})
+    coordinator = make_session.call_args.kwargs["coordinator"]
+    assert coordinator.directory == str(tmp_path)
+    assert coordinator.worker_id == "gw1"
+
+
+def test_xdist_container_without_basetemp(monkeypatch, tmp_path):
+    """Test that workers without a basetemp share a directory per test run."""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(pytest_localstack, "_share_xdist_container", True)
+    coordinators = []
+    for worker_id in ["gw0", "gw1"]:
+        config = mock.Mock(workerinput={"workerid": worker_id, "testrunuid": "abc"})
+        config.getoption.return_value = None
+        coordinators.append(
+            pytest_localstack._shared_session_coordinator(config, "session")
+        )
+    assert coordinators[0].directory == str(tmp_path / "pytest-localstack-abc")
+    assert coordinators[1].directory == coordinators[0].directory
+    assert os.path.isdir(coordinators[0].directory)
@@ -31,3 +31,112 @@ def test_DockerLogTailer(caplog):
         for log_line in test_utils.generate_fake_logs():
             log_line = log_line.decode("utf-8").rstrip()
             assert (logger_name, log_level, log_line) in caplog.record_tuples
+
+
+def test_DockerLogTailer_subscribe():
+    """Test pytest_localstack.container.DockerLogTailer.subscribe."""
+    container = test_utils.make_mock_container(session.LocalstackSession.image_name)
+    tailer = ptls_container.DockerLogTailer(
+        container, logging.getLogger("test_logger"), logging.DEBUG
+    )
+    matches = []
+    matched = tailer.subscribe(r"^foobar [35]$", matches.append)
+    not_matched = tailer.subscribe(r"^Ready\.$")
+    tailer.start()
+    tailer.join(1)
+    assert matched.is_set()
+    assert not not_matched.is_set()
+    assert [match.group(0) for match in matches] == ["foobar 3", "foobar 5"]
+
+
+def test_DockerLogTailer_subscribe_multiline_chunk():
+    """Patterns are matched against each line of a multi-line chunk."""
+    container = test_utils.make_mock_container(session.LocalstackSession.image_name)
+    container.logs.side_effect = lambda **kwargs: iter([b"Starting\nReady.\nfoo\n"])
+    tailer = ptls_container.DockerLogTailer(
+        container, logging.getLogger("test_logger"), logging.DEBUG
+    )
+    ready = tailer.subscribe(r"^Ready\.$")
+    tailer.start()
+    tailer.join(1)
+    assert ready.is_set()
+
+
+def make_stats(cpu, system, memory_rss, rx, tx, read, write):
+    """Make a decoded Docker stats reading."""
+    return {
+        "cpu_stats": {
+            "cpu_usage": {"total_usage": cpu},
+            "system_cpu_usage": system,
+            "online_cpus": 2,
+        },
+        "precpu_stats": {"cpu_usage": {"total_usage": 0}, "system_cpu_usage": 0},
+        "memory_stats": {"usage": 2 * memory_rss, "stats": {"rss": memory_rss}},
+        "networks": {
+            "eth0": {"rx_bytes": rx, "tx_bytes": tx},
+            "eth1": {"rx_bytes": 1, "tx_bytes": 1},
+        },
+        "blkio_stats": {
+            "io_service_bytes_recursive": [
+                {"major": 8, "minor": 0, "op": "Read", "value": read},
+                {"major": 8, "minor": 0, "op": "Write", "value": write},
+                {"major": 8, "minor": 0, "op": "Total", "value": read + write},
+            ]
+        },
+    }
+
+
+def test_parse_stats():
+    """Test pytest_localstack.container.parse_stats."""
+    sample = ptls_container.parse_stats(
+        make_stats(25, 100, 1024, 10, 20, 30, 40), now=5.0
+    )
+    assert sample == ptls_container.StatsSample(
+        time=5.0,
+        cpu_percent=50.0,
+        memory_bytes=1024,
+        network_rx_bytes=11,
+        network_tx_bytes=21,
+        block_read_bytes=30,
+        block_write_bytes=40,
+    )
+
+    # cgroup v2 reports "anon" instead of "rss".
+    stats = make_stats(0, 0, 0, 0, 0, 0, 0)
+    stats["memory_stats"]["stats"] = {"anon": 2048}
+    assert ptls_container.parse_stats(stats).memory_bytes == 2048
+    # The first reading has no previous CPU usage to compare to.
+    assert ptls_container.parse_stats({}).cpu_percent == 0.0
+
+
+def test_DockerStatsSampler():
+    """Test pytest_localstack.container.DockerStatsSampler."""
+    container = test_utils.make_mock_container(session.LocalstackSession.image_name)
+    container.stats.return_value = iter(
+        [
+            make_stats(10, 100, 100, 0, 0, 0, 0),
+            make_stats(90, 100, 300, 50, 60, 70, 80),
+            make_stats(50, 100, 200, 100, 120, 140, 160),
+        ]
+    )
+    sampler = ptls_container.DockerStatsSampler(container, max_samples=2)
+    sampler.start()
+    sampler.join(1)
+    if sampler.is_alive():
+        raise Exception("DockerStatsSampler never stopped!")
+    container.stats.assert_called_once_with(stream=True, decode=True)
+
+    assert [sample.memory_bytes for sample in sampler.samples] == [300, 200]
+    summary = sampler.summary()
+    assert summary["samples"] == 3
+    assert summary["cpu_percent_peak"] == 180.0
+    assert summary["cpu_percent_average"] == 100.0
+    assert summary["memory_bytes_peak"] == 300
+    assert summary["memory_bytes_average"] == 200
+    assert summary["network_rx_bytes"] == 100
+    assert summary["block_write_bytes"] == 160
+
+
+def test_DockerStatsSampler_empty_summary():
+    container = test_utils.make_mock_container(session.LocalstackSession.image_name)
+    assert ptls_container.DockerStatsSampler(container).summary() == {}
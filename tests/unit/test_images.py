@@ -0,0 +1,98 @@
+"""Unit tests for pytest_localstack.images."""
+from unittest import mock
+
+import docker
+
+import pytest
+
+from pytest_localstack import images
+
+
+IMAGE_NAME = "localstack/localstack:latest"
+
+
+def make_fake_docker_client(local_image_id=None):
+    """Make a fake docker-py Client that knows about one local image."""
+    docker_client = mock.Mock(spec=docker.client.DockerClient)
+    state = {"image_id": local_image_id, "pulls": 0}
+
+    def _get(name):
+        if state["image_id"] is None:
+            raise docker.errors.ImageNotFound(name)
+        return mock.Mock(id=state["image_id"])
+
+    def _pull(name):
+        state["pulls"] += 1
+        state["image_id"] = "sha256:%i" % state["pulls"]
+        return mock.Mock(id=state["image_id"])
+
+    docker_client.images.get.side_effect = _get
+    docker_client.images.pull.side_effect = _pull
+    return docker_client, state
+
+
+@pytest.mark.parametrize(
+    "value,mode,ttl",
+    [
+        (True, "always", None),
+        (False, "never", None),
+        ("always", "always", None),
+        ("if-missing", "if-missing", None),
+        ("ttl=30", "ttl", 30.0),
+    ],
+)
+def test_PullPolicy_parse(value, mode, ttl):
+    policy = images.PullPolicy.parse(value)
+    assert policy.mode == mode
+    assert policy.ttl == ttl
+
+
+@pytest.mark.parametrize("value", ["sometimes", "ttl", "ttl=soon", "ttl=-1"])
+def test_PullPolicy_parse_invalid(value):
+    with pytest.raises(ValueError):
+        images.PullPolicy.parse(value)
+
+
+def test_ImagePuller_always():
+    docker_client, state = make_fake_docker_client("sha256:0")
+    puller = images.ImagePuller(docker_client, "always")
+    assert puller.ensure_image(IMAGE_NAME)
+    assert puller.ensure_image(IMAGE_NAME)
+    assert state["pulls"] == 2
+
+
+def test_ImagePuller_never():
+    docker_client, state = make_fake_docker_client()
+    puller = images.ImagePuller(docker_client, False)
+    assert not puller.ensure_image(IMAGE_NAME)
+    assert state["pulls"] == 0
+
+
+def test_ImagePuller_if_missing():
+    docker_client, state = make_fake_docker_client()
+    puller = images.ImagePuller(docker_client, "if-missing")
+    assert puller.ensure_image(IMAGE_NAME)
+    assert not puller.ensure_image(IMAGE_NAME)
+    assert state["pulls"] == 1
+
+
+def test_ImagePuller_ttl():
+    docker_client, state = make_fake_docker_client("sha256:local")
+    cache = images.MemoryCache()
+    now = [1000.0]
+
+    def make_puller():
+        return images.ImagePuller(docker_client, "ttl=60", cache, lambda: now[0])
+
+    # Never pulled through the cache before.
+    assert make_puller().ensure_image(IMAGE_NAME)
+    # Fresh, even for a new puller sharing the cache.
+    now[0] += 30
+    assert not make_puller().ensure_image(IMAGE_NAME)
+    # Stale once the ttl passes.
+    now[0] += 31
+    assert make_puller().ensure_image(IMAGE_NAME)
+    # The local image changed since the last pull.
+    state["image_id"] = "sha256:retagged"
+    assert make_puller().ensure_image(IMAGE_NAME)
+    assert state["pulls"] == 3
@@ -0,0 +1,104 @@
+"""Unit tests for pytest_localstack.metrics."""
+import pytest
+from tests import utils as test_utils
+
+from pytest_localstack import exceptions, metrics, plugin
+
+
+@pytest.fixture
+def collector():
+    collector = metrics.MetricsCollector()
+    plugin.manager.register(collector)
+    yield collector
+    plugin.manager.unregister(collector)
+
+
+def test_Histogram():
+    histogram = metrics.Histogram((1.0, 2.0))
+    for value in (0.5, 1.0, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.sum == 6.0
+    assert list(histogram.samples("x", {"a": "b"})) == [
+        'x_bucket{a="b",le="1.0"} 2',
+        'x_bucket{a="b",le="2.0"} 3',
+        'x_bucket{a="b",le="+Inf"} 4',
+        'x_sum{a="b"} 6.0',
+        'x_count{a="b"} 4',
+    ]
+
+    other = metrics.Histogram((1.0, 2.0))
+    other.merge(histogram.to_dict())
+    assert other.counts == histogram.counts
+    with pytest.raises(ValueError):
+        metrics.Histogram((1.0,)).merge(histogram.to_dict())
+
+
+def test_MetricsCollector_sessions(collector):
+    """Test that session hooks are counted."""
+    test_session = test_utils.make_test_LocalstackSession()
+
+    def check_services(timeout):
+        test_session.service_ready_times = {"s3": 0.3}
+
+    test_session._check_services.side_effect = check_services
+    with test_session:
+        pass
+    assert collector.starts == 1
+    assert collector.container_start.counts[-1] == 0
+    assert sum(collector.container_start.counts) == 1
+    assert sum(collector.service_ready["s3"].counts) == 1
+
+    reused = test_utils.make_test_LocalstackSession(reuse_container=True)
+    with reused:
+        pass
+    with reused:
+        assert reused.reused_container
+    assert collector.starts == 2
+    assert collector.reuses == 1
+
+    attached = test_utils.make_test_RunningSession()
+    attached.start()
+    assert collector.starts == 2
+    assert collector.reuses == 2
+    assert sum(collector.container_start.counts) == 2
+
+    failing = test_utils.make_test_LocalstackSession()
+    failing._check_services.side_effect = exceptions.TimeoutError("slow")
+    with pytest.raises(exceptions.TimeoutError):
+        failing.start(timeout=1)
+    assert collector.failures == 1
+    assert collector.starts == 2
+
+
+def test_MetricsCollector_render(collector, tmp_path):
+    collector.observe_call("test_a", "s3", "ListBuckets", 0.02, {})
+    collector.observe_call("test_a", "s3", "ListBuckets", 0.2, {})
+    collector.observe_call("test_b", "sqs", 'Send"Message', 20.0, {})
+    collector.session_starting(session=object())
+
+    other = metrics.MetricsCollector()
+    other.merge(collector.to_dict())
+    assert other.failures == 1
+
+    text = other.render()
+    lines = text.splitlines()
+    assert lines[-1] == "# EOF"
+    assert "# TYPE pytest_localstack_api_call_seconds histogram" in lines
+    assert "# UNIT pytest_localstack_api_call_seconds seconds" in lines
+    assert (
+        'pytest_localstack_api_call_seconds_count{service="s3",'
+        'operation="ListBuckets"} 2' in lines
+    )
+    assert (
+        'pytest_localstack_api_call_seconds_bucket{service="sqs",'
+        'operation="Send\\"Message",le="10.0"} 0' in lines
+    )
+    assert "# TYPE pytest_localstack_container_starts counter" in lines
+    assert "pytest_localstack_container_starts_total 0" in lines
+    assert "pytest_localstack_container_start_failures_total 1" in lines
+
+    path = tmp_path / "localstack.prom"
+    other.write(str(path))
+    assert path.read_text() == text
+    assert [p.name for p in tmp_path.iterdir()] == ["localstack.prom"]
@@ -0,0 +1,145 @@
+"""Unit tests for pytest_localstack.profiling."""
+import json
+from unittest import mock
+
+from pytest_localstack import profiling
+
+
+def test_record_and_merge():
+    """Calls are aggregated per test, service and operation."""
+    profiler = profiling.CallProfiler()
+    profiler.record("test_a", "s3", "ListBuckets", 0.5, 10, 100)
+    profiler.record("test_a", "s3", "ListBuckets", 0.25, 10, 100)
+    profiler.record("test_b", "sqs", "SendMessage", 1.0, 500, 20)
+    stats = profiler.stats[("test_a", "s3", "ListBuckets")]
+    assert stats.calls == 2
+    assert stats.seconds == 0.75
+    assert stats.max_seconds == 0.5
+    assert stats.request_bytes == 20
+    assert stats.response_bytes == 200
+
+    other = profiling.CallProfiler()
+    other.merge(profiler.records())
+    other.merge(profiler.records())
+    stats = other.stats[("test_a", "s3", "ListBuckets")]
+    assert stats.calls == 4
+    assert stats.seconds == 1.5
+    assert stats.max_seconds == 0.5
+
+
+def test_summary_lines():
+    """The summary lists the slowest tests and operations first."""
+    profiler = profiling.CallProfiler()
+    profiler.record("test_a", "s3", "ListBuckets", 0.5, 0, 0)
+    profiler.record("test_b", "sqs", "SendMessage", 1.0, 0, 0)
+    profiler.record(None, "sqs", "CreateQueue", 0.1, 0, 0)
+    lines = profiler.summary_lines(top=2)
+    tests = lines[2:4]
+    assert tests[0].endswith("test_b")
+    assert tests[1].endswith("test_a")
+    assert not any("(outside tests)" in line for line in tests)
+    assert lines[-2].endswith("sqs.SendMessage")
+    assert lines[-1].endswith("s3.ListBuckets")
+
+
+def test_write_json(tmp_path):
+    profiler = profiling.CallProfiler()
+    profiler.record("test_a", "s3", "ListBuckets", 0.5, 1, 2)
+    path = tmp_path / "profile.json"
+    profiler.write_json(str(path))
+    [record] = json.loads(path.read_text())
+    assert record["test"] == "test_a"
+    assert record["operation"] == "ListBuckets"
+    assert record["calls"] == 1
+
+
+def test_request_and_response_size():
+    assert profiling._request_size({"body": b"abc"}) == 3
+    assert profiling._request_size({"body": "é"}) == 2
+    assert profiling._request_size({"body": None, "headers": {}}) == 0
+    assert (
+        profiling._request_size({"body": object(), "headers": {"Content-Length": "7"}})
+        == 7
+    )
+    response = mock.Mock(headers={"Content-Length": "12"})
+    assert profiling._response_size(response) == 12
+    response = mock.Mock(headers={}, _content=b"abcd")
+    assert profiling._response_size(response) == 4
+    # Unread streaming bodies are left alone.
+    response = mock.Mock(headers={}, _content=None)
+    assert profiling._response_size(response) == 0
+
+
+def test_instrument_only_when_started(monkeypatch):
+    # Leave the profiler of this test run, if any, alone.
+    monkeypatch.setattr(profiling, "_profiler", None)
+    client = mock.Mock()
+    profiling.instrument(client)
+    assert not client.meta.events.register.called
+    profiler = profiling.start()
+    try:
+        assert profiling.get_profiler() is profiler
+        profiling.instrument(client)
+        assert client.meta.events.register.call_count == 3
+    finally:
+        profiling.stop()
+    assert profiling.get_profiler() is None
+
+
+def test_listeners():
+    """Listeners are called for every profiled call."""
+    profiler = profiling.CallProfiler()
+    calls = []
+    profiler.listeners.append(lambda *args: calls.append(args))
+    profiler.current_test = "test_a"
+    context = {}
+    profiler._before_parameter_build(params={"Bucket": "b"}, context=context)
+    profiler._before_call(params={"body": b""}, context=context)
+    model = mock.Mock()
+    model.name = "ListBuckets"
+    model.service_model.service_name = "s3"
+    profiler._after_call(
+        http_response=mock.Mock(headers={}), model=model, context=context
+    )
+    [(test, service_name, operation_name, seconds, params)] = calls
+    assert (test, service_name, operation_name) == ("test_a", "s3", "ListBuckets")
+    assert seconds >= 0
+    assert params == {"Bucket": "b"}
+    assert not context
+
+
+def test_SlowCallDetector():
+    detector = profiling.SlowCallDetector(0.5)
+    detector.observe_call("test_a", "s3", "ListBuckets", 0.1, {})
+    detector.observe_call("test_a", "dynamodb", "Scan", 1.5, {"TableName": "t"})
+    detector.observe_call(None, "sqs", "ReceiveMessage", 0.5, None)
+    assert detector.pop("test_a") == [
+        "slow AWS call dynamodb.Scan took 1500 ms (threshold 500 ms) with "
+        "{'TableName': 't'} in test_a"
+    ]
+    assert detector.pop("test_a") == []
+    assert detector.pop(None) == [
+        "slow AWS call sqs.ReceiveMessage took 500 ms (threshold 500 ms) with {}"
+    ]
+
+
+def test_summarize_params():
+    params = {
+        "Bucket": "bucket",
+        "Key": "k" * 100,
+        "Body": b"x" * 1024,
+        "Stream": mock.Mock(spec=["read"]),
+        "Items": list(range(10)),
+    }
+    assert profiling.summarize_params(params) == repr(
+        {
+            "Bucket": "bucket",
+            "Key": "k" * 37 + "...",
+            "Body": "<1024 bytes>",
+            "Stream": "<stream>",
+            "Items": [0, 1, 2, "... 10 items"],
+        }
+    )
+    summary = profiling.summarize_params({"Keys": ["k" * 30] * 3}, max_length=50)
+    assert len(summary) == 50
+    assert summary.endswith("...")
@@ -0,0 +1,229 @@
+"""Unit tests for pytest_localstack.resources."""
+import threading
+from unittest import mock
+
+import botocore.exceptions
+
+import pytest
+from tests import utils as test_utils
+
+from pytest_localstack import exceptions, resources
+
+
+SPEC = {
+    "s3": {"bucket": {"objects": {"a.txt": b"a", "b.txt": b"b"}}},
+    "dynamodb": {
+        "table": {
+            "KeySchema": [{"AttributeName": "id", "KeyType": "HASH"}],
+            "AttributeDefinitions": [{"AttributeName": "id", "AttributeType": "S"}],
+            "items": [{"id": {"S": str(i)}} for i in range(30)],
+        }
+    },
+    "sqs": ["queue1", "queue2"],
+    "sns": ["topic"],
+    "kinesis": {"stream": {}},
+}
+
+
+def make_clients():
+    """Make mock botocore clients that record the threads calling them."""
+    threads = set()
+
+    def _record(response):
+        def _call(*args, **kwargs):
+            threads.add(threading.current_thread().name)
+            return response
+
+        return _call
+
+    clients = {}
+    for service_name in SPEC:
+        clients[service_name] = mock.Mock()
+    clients["sqs"].create_queue.side_effect = lambda QueueName: {
+        "QueueUrl": "http://localhost/queue/" + QueueName
+    }
+    clients["sns"].create_topic.side_effect = lambda Name: {
+        "TopicArn": "arn:aws:sns:us-east-1:000000000000:" + Name
+    }
+    clients["dynamodb"].batch_write_item.side_effect = _record({})
+    clients["s3"].create_bucket.side_effect = _record({})
+    return clients, threads
+
+
+@pytest.mark.parametrize("region_name", ["us-east-1", "eu-west-1"])
+def test_provision(region_name):
+    """All resources in a spec are created and populated in worker threads."""
+    test_session = test_utils.make_test_RunningSession(
+        services=list(SPEC), region_name=region_name, resource_prefix="gw0-"
+    )
+    clients, threads = make_clients()
+    with mock.patch.object(test_session, "botocore") as botocore_factory:
+        botocore_factory.client.side_effect = clients.__getitem__
+        result = resources.provision(test_session, SPEC)
+
+    assert result == {
+        "s3": {"bucket": "gw0-bucket"},
+        "dynamodb": {"table": "gw0-table"},
+        "sqs": {
+            "queue1": "http://localhost/queue/gw0-queue1",
+            "queue2": "http://localhost/queue/gw0-queue2",
+        },
+        "sns": {"topic": "arn:aws:sns:us-east-1:000000000000:gw0-topic"},
+        "kinesis": {"stream": "gw0-stream"},
+    }
+    assert threads and all(
+        name.startswith("pytest-localstack-provision") for name in threads
+    )
+
+    s3 = clients["s3"]
+    if region_name == "us-east-1":
+        s3.create_bucket.assert_called_once_with(Bucket="gw0-bucket")
+    else:
+        s3.create_bucket.assert_called_once_with(
+            Bucket="gw0-bucket",
+            CreateBucketConfiguration={"LocationConstraint": region_name},
+        )
+    s3.get_waiter.assert_called_once_with("bucket_exists")
+    assert s3.put_object.call_count == 2
+
+    dynamodb = clients["dynamodb"]
+    create_kwargs = dynamodb.create_table.call_args[1]
+    assert create_kwargs["BillingMode"] == "PAY_PER_REQUEST"
+    assert "items" not in create_kwargs
+    dynamodb.get_waiter.assert_called_once_with("table_exists")
+    batches = [
+        c[1]["RequestItems"]["gw0-table"]
+        for c in dynamodb.batch_write_item.call_args_list
+    ]
+    assert [len(batch) for batch in batches] == [25, 5]
+
+    clients["kinesis"].create_stream.assert_called_once_with(
+        StreamName="gw0-stream", ShardCount=1
+    )
+    clients["kinesis"].get_waiter.assert_called_once_with("stream_exists")
+
+    # The spec isn't modified.
+    assert "objects" in SPEC["s3"]["bucket"]
+
+
+def test_provision_retries_unprocessed_items():
+    """DynamoDB items that weren't written are written again, with backoff."""
+    test_session = test_utils.make_test_RunningSession(services=["dynamodb"])
+    client = mock.Mock()
+    unprocessed = {"table": [{"PutRequest": {"Item": {"id": {"S": "1"}}}}]}
+    client.batch_write_item.side_effect = [
+        {"UnprocessedItems": unprocessed},
+        {"UnprocessedItems": unprocessed},
+        {},
+    ]
+    spec = {"dynamodb": {"table": {"items": [{"id": {"S": "1"}}]}}}
+    with mock.patch.object(test_session, "botocore") as botocore_factory:
+        botocore_factory.client.return_value = client
+        with mock.patch.object(resources.time, "sleep") as sleep:
+            resources.provision(test_session, spec)
+    assert client.batch_write_item.call_count == 3
+    client.batch_write_item.assert_called_with(RequestItems=unprocessed)
+    delays = [c[0][0] for c in sleep.call_args_list]
+    assert len(delays) == 2 and 0 < delays[0] < delays[1]
+
+
+def test_provision_gives_up_on_unprocessed_items():
+    """DynamoDB items that are never written are an error."""
+    test_session = test_utils.make_test_RunningSession(services=["dynamodb"])
+    client = mock.Mock()
+    unprocessed = {"table": [{"PutRequest": {"Item": {"id": {"S": "1"}}}}]}
+    client.batch_write_item.return_value = {"UnprocessedItems": unprocessed}
+    spec = {"dynamodb": {"table": {"items": [{"id": {"S": "1"}}]}}}
+    with mock.patch.object(test_session, "botocore") as botocore_factory:
+        botocore_factory.client.return_value = client
+        with mock.patch.object(resources.time, "sleep") as sleep:
+            with pytest.raises(exceptions.ServiceError):
+                resources.provision(test_session, spec)
+    assert client.batch_write_item.call_count == resources.DYNAMODB_BATCH_MAX_ATTEMPTS
+    assert max(c[0][0] for c in sleep.call_args_list) == (
+        resources.DYNAMODB_BATCH_MAX_DELAY
+    )
+    # The table that couldn't be filled is deleted again.
+    client.delete_table.assert_called_once_with(TableName="table")
+
+
+def test_provision_unknown_service():
+    """Services without a provisioner are rejected."""
+    test_session = test_utils.make_test_RunningSession(services=["ec2"])
+    with pytest.raises(ValueError):
+        resources.provision(test_session, {"ec2": ["instance"]})
+
+
+def test_provision_error():
+    """Errors creating resources are raised."""
+    test_session = test_utils.make_test_RunningSession(services=["sqs"])
+    client = mock.Mock()
+    client.create_queue.side_effect = RuntimeError("boom")
+    with mock.patch.object(test_session, "botocore") as botocore_factory:
+        botocore_factory.client.return_value = client
+        with pytest.raises(RuntimeError):
+            resources.provision(test_session, {"sqs": ["queue"]})
+
+
+def test_provision_error_deletes_created_resources():
+    """Resources created before an error are deleted again."""
+    test_session = test_utils.make_test_RunningSession(services=["sqs"])
+    client = mock.Mock()
+    client.create_queue.side_effect = [
+        {"QueueUrl": "http://localhost/queue/ok"},
+        RuntimeError("boom"),
+    ]
+    with mock.patch.object(test_session, "botocore") as botocore_factory:
+        botocore_factory.client.return_value = client
+        with pytest.raises(RuntimeError):
+            resources.provision(test_session, {"sqs": ["ok", "bad"]}, max_workers=1)
+    client.delete_queue.assert_called_once_with(QueueUrl="http://localhost/queue/ok")
+
+
+def test_deprovision():
+    """Everything provision() created is deleted, missing resources are skipped."""
+    test_session = test_utils.make_test_RunningSession(services=list(SPEC))
+    clients, _ = make_clients()
+    clients["s3"].get_paginator.return_value.paginate.return_value = [
+        {"Versions": [{"Key": "a.txt", "VersionId": "null"}]}
+    ]
+    clients["sns"].delete_topic.side_effect = botocore.exceptions.ClientError(
+        {"Error": {"Code": "NotFound"}}, "DeleteTopic"
+    )
+    provisioned = {
+        "s3": {"bucket": "bucket"},
+        "dynamodb": {"table": "table"},
+        "sqs": {"queue": "http://localhost/queue/queue"},
+        "sns": {"topic": "arn:aws:sns:us-east-1:000000000000:topic"},
+        "kinesis": {"stream": "stream"},
+    }
+    with mock.patch.object(test_session, "botocore") as botocore_factory:
+        botocore_factory.client.side_effect = clients.__getitem__
+        resources.deprovision(test_session, provisioned)
+
+    clients["s3"].delete_objects.assert_called_once_with(
+        Bucket="bucket",
+        Delete={"Objects": [{"Key": "a.txt", "VersionId": "null"}], "Quiet": True},
+    )
+    clients["s3"].delete_bucket.assert_called_once_with(Bucket="bucket")
+    clients["dynamodb"].delete_table.assert_called_once_with(TableName="table")
+    clients["dynamodb"].get_waiter.assert_called_once_with("table_not_exists")
+    clients["sqs"].delete_queue.assert_called_once_with(
+        QueueUrl="http://localhost/queue/queue"
+    )
+    clients["kinesis"].delete_stream.assert_called_once_with(
+        StreamName="stream", EnforceConsumerDeletion=True
+    )
+
+
+def test_deprovision_error():
+    """Errors other than missing resources are raised."""
+    test_session = test_utils.make_test_RunningSession(services=["sqs"])
+    client = mock.Mock()
+    client.delete_queue.side_effect = botocore.exceptions.ClientError(
+        {"Error": {"Code": "AccessDenied"}}, "DeleteQueue"
+    )
+    with mock.patch.object(test_session, "botocore") as botocore_factory:
+        botocore_factory.client.return_value = client
+        with pytest.raises(botocore.exceptions.ClientError):
+            resources.deprovision(test_session, {"sqs": {"queue": "url"}})
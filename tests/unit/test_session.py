@@ -1,12 +1,16 @@
+import functools
+import json
 import re
+import threading
 import time
+from unittest import mock
 
 import pytest
 from hypothesis import given
 from hypothesis import strategies as st
 from tests import utils as test_utils
 
-from pytest_localstack import constants, exceptions, session
+from pytest_localstack import constants, exceptions, service_checks, session
 
 
 @given(random=st.random_module())
@@ -150,3 +154,219 @@ def test_LocalstackSession_start_timeout():
 
     with pytest.raises(exceptions.ContainerNotStartedError):
         test_session.start(timeout=1)
+
+
+def test_LocalstackSession_reuse_container():
+    """Test that reusable containers outlive their session and get reused."""
+    test_session = test_utils.make_test_LocalstackSession(reuse_container=True)
+    docker_client = test_session.docker_client
+
+    with test_session:
+        assert not test_session.reused_container
+        first_container = test_session._container
+    assert first_container.status == "running"
+    first_container.stop.assert_not_called()
+
+    # Same configuration, so the first container gets reused.
+    second_session = session.LocalstackSession(docker_client, reuse_container=True)
+    second_session._check_services = test_session._check_services
+    with second_session:
+        assert second_session.reused_container
+        assert second_session._container is first_container
+    assert docker_client.containers.run.call_count == 1
+
+    # Different configuration, so a new container is started.
+    third_session = session.LocalstackSession(
+        docker_client, services=["s3"], reuse_container=True
+    )
+    third_session._check_services = test_session._check_services
+    assert third_session.config_hash != test_session.config_hash
+    with third_session:
+        assert not third_session.reused_container
+    assert docker_client.containers.run.call_count == 2
+
+
+def test_LocalstackSession_reuse_container_removes_stale():
+    """Test that stopped containers with a matching config are removed."""
+    test_session = test_utils.make_test_LocalstackSession(reuse_container=True)
+    with test_session:
+        stale_container = test_session._container
+    stale_container.stop()
+
+    with test_session:
+        assert not test_session.reused_container
+        assert test_session._container is not stale_container
+    stale_container.remove.assert_called_once_with(force=True)
+
+
+def test_RunningSession_check_services_concurrently():
+    """Test that services are checked at the same time, with per-service deadlines."""
+    test_session = session.RunningSession("127.0.0.1", services=["s3", "sqs", "sns"])
+    barrier = threading.Barrier(3, timeout=5)
+    sqs_attempts = []
+
+    def _check_s3(localstack_session):
+        barrier.wait()
+
+    def _check_sns(localstack_session):
+        barrier.wait()
+
+    def _check_sqs(localstack_session):
+        if not sqs_attempts:
+            barrier.wait()
+        sqs_attempts.append(time.time())
+        if len(sqs_attempts) < 3:
+            raise exceptions.ServiceError(service_name="sqs")
+
+    checks = {"s3": _check_s3, "sns": _check_sns, "sqs": _check_sqs}
+    with mock.patch.dict(service_checks.SERVICE_CHECKS, checks):
+        result = test_session._check_services(timeout=5)
+
+        assert set(result) == {"s3", "sqs", "sns"}
+        assert result is test_session.service_ready_times
+        assert result["sqs"] >= result["s3"]
+        assert len(sqs_attempts) == 3
+
+        del sqs_attempts[:]
+        barrier.reset()
+        with pytest.raises(exceptions.TimeoutError):
+            test_session._check_services(
+                timeout=5, initial_retry_delay=0.1, service_timeouts={"sqs": 0.01}
+            )
+
+
+@pytest.mark.parametrize(
+    "logs",
+    [[b"Starting\n", b"Ready.\n"], [b"Starting\nReady.\nsomething else\n"]],
+    ids=["lines", "chunk"],
+)
+def test_LocalstackSession_waits_for_ready_log(logs):
+    """Test that start() waits for the ready log line before checking services."""
+    test_session = test_utils.make_test_LocalstackSession()
+    run = test_session.docker_client.containers.run.side_effect
+
+    def _run(*args, **kwargs):
+        container = run(*args, **kwargs)
+        container.logs.side_effect = lambda **kwargs: iter(logs)
+        return container
+
+    test_session.docker_client.containers.run.side_effect = _run
+    wait_for_ready_log = functools.partial(
+        session.LocalstackSession._wait_for_ready_log, test_session
+    )
+    results = []
+    test_session._wait_for_ready_log = lambda *args: results.append(
+        wait_for_ready_log(*args)
+    )
+    with test_session:
+        assert results == [True]
+    test_session._check_services.assert_called_once()
+
+
+def test_LocalstackSession_polls_without_ready_log():
+    """Test that start() still polls services if the ready line never comes."""
+    test_session = test_utils.make_test_LocalstackSession()
+    run = test_session.docker_client.containers.run.side_effect
+
+    def _run(*args, **kwargs):
+        container = run(*args, **kwargs)
+        container.logs.side_effect = lambda **kwargs: iter([b"Ready for work\n"])
+        return container
+
+    test_session.docker_client.containers.run.side_effect = _run
+    test_session._wait_for_ready_log = mock.Mock(return_value=False)
+    test_session.start(timeout=4)
+    try:
+        (ready, ready_timeout), _ = test_session._wait_for_ready_log.call_args
+        assert not ready.is_set()
+        assert 0 < ready_timeout <= 2
+        (check_timeout,), _ = test_session._check_services.call_args
+        assert check_timeout > 3
+    finally:
+        test_session.stop()
+
+
+def test_LocalstackSession_map_port_cached():
+    """Test that port mappings are read from Docker once per container start."""
+    test_session = test_utils.make_test_LocalstackSession()
+    with test_session:
+        for _ in range(10):
+            for service_name in test_session.services:
+                test_session.endpoint_url(service_name)
+        assert test_session.docker_api_calls["container.reload"] == 1
+        test_session.docker_client.api.port.assert_not_called()
+    assert test_session.docker_api_calls["containers.run"] == 1
+    assert test_session.docker_api_calls["container.stop"] == 1
+
+
+def test_LocalstackSession_startup_timings(tmp_path):
+    """Test that start() records, and saves, how long each phase took."""
+    timings_file = tmp_path / "timings.jsonl"
+    test_session = test_utils.make_test_LocalstackSession(
+        timings_file=str(timings_file)
+    )
+
+    def check_services(timeout):
+        test_session.service_ready_times = {"s3": 0.5, "sqs": 1.5}
+
+    test_session._check_services.side_effect = check_services
+    with test_session:
+        timings = test_session.startup_timings
+    assert list(timings["phases"]) == [
+        "starting_hooks",
+        "pull_image",
+        "run_container",
+        "log_tailers",
+        "ready_log",
+        "check_services",
+        "started_hooks",
+    ]
+    assert timings["services"] == {"s3": 0.5, "sqs": 1.5}
+    assert timings["total"] == pytest.approx(sum(timings["phases"].values()))
+    assert timings["container_name"] == test_session.container_name
+    assert not timings["failed"]
+
+    with test_session:
+        pass
+    lines = timings_file.read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0]) == timings
+
+
+def test_LocalstackSession_startup_timings_on_timeout():
+    """Test that starts that time out still record their timings."""
+    test_session = test_utils.make_test_LocalstackSession()
+    test_session._check_services.side_effect = exceptions.TimeoutError("slow")
+
+    with pytest.raises(exceptions.TimeoutError):
+        test_session.start(timeout=1)
+    assert test_session.startup_timings["failed"]
+    assert "check_services" not in test_session.startup_timings["phases"]
+
+
+def test_LocalstackSession_sample_stats():
+    """Test that sample_stats=True samples container usage until stop()."""
+    test_session = test_utils.make_test_LocalstackSession(sample_stats=True)
+    run = test_session.docker_client.containers.run.side_effect
+    stats = {"memory_stats": {"usage": 1024}}
+
+    def _run(*args, **kwargs):
+        container = run(*args, **kwargs)
+        container.stats.side_effect = lambda **kwargs: iter([stats, stats])
+        return container
+
+    test_session.docker_client.containers.run.side_effect = _run
+    with test_session:
+        sampler = test_session.stats_sampler
+        sampler.join(1)
+    assert test_session.stats_sampler is None
+    assert test_session.stats_summary["samples"] == 2
+    assert test_session.stats_summary["memory_bytes_peak"] == 1024
+    assert test_session.docker_api_calls["container.stats"] == 1
+
+
+def test_LocalstackSession_no_stats_by_default():
+    test_session = test_utils.make_test_LocalstackSession()
+    with test_session:
+        assert test_session.stats_sampler is None
+    assert test_session.stats_summary == {}
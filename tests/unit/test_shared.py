@@ -0,0 +1,55 @@
+"""Unit tests for pytest_localstack.shared."""
+from unittest import mock
+
+from tests import utils as test_utils
+
+from pytest_localstack import session, shared
+
+
+def test_SharedSessionCoordinator(tmp_path):
+    """Test that xdist workers share a single Localstack container."""
+    docker_client = test_utils.make_mock_docker_client()
+    gw0 = shared.SharedSessionCoordinator(tmp_path, "gw0")
+    gw1 = shared.SharedSessionCoordinator(tmp_path, "gw1")
+
+    with mock.patch.object(session.RunningSession, "_check_services"):
+        with gw0.session(docker_client, services=["s3"]) as session_0:
+            assert isinstance(session_0, session.LocalstackSession)
+            assert session_0.resource_prefix == "gw0-"
+            container = session_0._container
+
+            with gw1.session(docker_client, services=["s3"]) as session_1:
+                assert not isinstance(session_1, session.LocalstackSession)
+                assert session_1.resource_prefix == "gw1-"
+                assert session_1.endpoint_url("s3") == session_0.endpoint_url("s3")
+
+        # The last worker out stops the container through the Docker API.
+        container.stop.assert_not_called()
+        docker_client.containers.get.assert_called_once_with(container.id)
+        docker_client.containers.get.return_value.stop.assert_called_once()
+
+    assert docker_client.containers.run.call_count == 1
+    assert not list(tmp_path.glob("*.json"))
+
+
+def test_SharedSessionCoordinator_separate_runs(tmp_path):
+    """Test that pytest runs with different directories don't share containers."""
+    docker_client = test_utils.make_mock_docker_client()
+    run_a = shared.SharedSessionCoordinator(tmp_path / "a", "gw0")
+    run_b = shared.SharedSessionCoordinator(tmp_path / "b", "gw0")
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+
+    with mock.patch.object(session.RunningSession, "_check_services"):
+        with run_a.session(docker_client, services=["s3"]) as session_a:
+            with run_b.session(docker_client, services=["s3"]) as session_b:
+                assert isinstance(session_b, session.LocalstackSession)
+                assert not session_b.reused_container
+                assert session_b._container is not session_a._container
+                container_b = session_b._container
+            # Run b stopped its own container only.
+            docker_client.containers.get.assert_called_once_with(container_b.id)
+            assert not session_a._container.labels
+
+    assert docker_client.containers.run.call_count == 2
+    docker_client.containers.list.assert_not_called()
@@ -0,0 +1,245 @@
+"""Unit tests for pytest_localstack.state."""
+import urllib.error
+from unittest import mock
+
+import pytest
+from tests import utils as test_utils
+
+from pytest_localstack import constants, exceptions, state
+
+
+def test_reset_all_services_uses_state_endpoint():
+    """Resetting every service is a single request to Localstack."""
+    test_session = test_utils.make_test_RunningSession(services=["s3", "sqs"])
+    with mock.patch.object(state, "internal_request") as internal_request:
+        test_session.reset()
+    internal_request.assert_called_once_with(
+        test_session, "POST", "/_localstack/state/reset"
+    )
+
+
+def test_reset_some_services_uses_service_endpoints():
+    """Resetting a subset of services resets each one."""
+    test_session = test_utils.make_test_RunningSession(services=["s3", "sqs"])
+    with mock.patch.object(state, "internal_request") as internal_request:
+        test_session.reset(services=["sqs"])
+    internal_request.assert_called_once_with(
+        test_session, "POST", "/_localstack/state/sqs/reset"
+    )
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        urllib.error.HTTPError("url", 404, "Not Found", {}, None),
+        urllib.error.URLError("connection refused"),
+    ],
+)
+def test_reset_falls_back_to_botocore(error):
+    """Without the state endpoints, resources are deleted with botocore."""
+    test_session = test_utils.make_test_RunningSession(services=["s3", "sqs"])
+    reset_s3 = mock.Mock()
+    with mock.patch.object(state, "internal_request", side_effect=error):
+        with mock.patch.dict(state.SERVICE_RESETS, {"s3": reset_s3}):
+            test_session.reset(services=["s3"])
+    reset_s3.assert_called_once_with(test_session)
+
+
+def test_reset_legacy_ports_skips_state_endpoint():
+    """Old Localstack versions go straight to the botocore fallback."""
+    test_session = test_utils.make_test_RunningSession(
+        services=["s3"], localstack_version="0.10.0"
+    )
+    assert test_session.service_ports is constants.LEGACY_SERVICE_PORTS
+    reset_s3 = mock.Mock()
+    with mock.patch.object(state, "internal_request") as internal_request:
+        with mock.patch.dict(state.SERVICE_RESETS, {"s3": reset_s3}):
+            test_session.reset()
+    internal_request.assert_not_called()
+    reset_s3.assert_called_once_with(test_session)
+
+
+def test_reset_unknown_service():
+    """Resetting a service the session doesn't run is an error."""
+    test_session = test_utils.make_test_RunningSession(services=["s3"])
+    with pytest.raises(exceptions.ServiceError):
+        test_session.reset(services=["sqs"])
+
+
+def test_reset_service_without_fallback():
+    """Services with no state endpoint or reset function can't be reset."""
+    test_session = test_utils.make_test_RunningSession(services=["ec2"])
+    with mock.patch.object(
+        state, "internal_request", side_effect=urllib.error.URLError("nope")
+    ):
+        with pytest.raises(exceptions.ServiceError):
+            test_session.reset()
+
+
+def test_reset_default_skips_services_without_fallback(caplog):
+    """By default, services that can't be reset with botocore are skipped."""
+    test_session = test_utils.make_test_RunningSession(services=["s3", "ec2"])
+    reset_s3 = mock.Mock()
+    with mock.patch.object(
+        state, "internal_request", side_effect=urllib.error.URLError("nope")
+    ):
+        with mock.patch.dict(state.SERVICE_RESETS, {"s3": reset_s3}):
+            test_session.reset()
+            reset_s3.assert_called_once_with(test_session)
+            assert "not resetting ec2" in caplog.text
+
+            # Asking for them explicitly is still an error.
+            with pytest.raises(exceptions.ServiceError):
+                test_session.reset(services=["s3", "ec2"])
+
+
+def test_reset_shared_session():
+    """Sessions sharing Localstack with others can't wipe its state."""
+    test_session = test_utils.make_test_RunningSession(
+        services=["s3"], resource_prefix="gw0-"
+    )
+    with mock.patch.object(state, "internal_request") as internal_request:
+        with pytest.raises(exceptions.ResetError):
+            test_session.reset()
+    internal_request.assert_not_called()
+
+
+def seed_buckets(localstack_session):
+    """Seed function for the snapshot tests."""
+    localstack_session.botocore.client("s3").create_bucket(Bucket="foo")
+
+
+def test_snapshot_store_on_disk(tmp_path):
+    """Snapshots saved to a directory can be loaded by another store."""
+    store = state.SnapshotStore(tmp_path)
+    store.save("foo", "state", b"state data")
+    store.save("bar", "image", "sha256:abc")
+    other_store = state.SnapshotStore(tmp_path)
+    assert other_store.load("foo") == ("state", b"state data")
+    assert other_store.load("bar") == ("image", "sha256:abc")
+    assert "baz" not in other_store
+
+    # Saving a snapshot of another kind replaces the old one.
+    store.save("foo", "image", "sha256:def")
+    assert state.SnapshotStore(tmp_path).load("foo") == ("image", "sha256:def")
+
+
+def test_seed_key():
+    """Snapshot names depend on the seed function and session config."""
+    s3_session = test_utils.make_test_RunningSession(services=["s3"])
+    sqs_session = test_utils.make_test_RunningSession(services=["sqs"])
+    key = state.seed_key(seed_buckets, s3_session)
+    assert key.startswith("seed_buckets-")
+    assert key == state.seed_key(seed_buckets, s3_session)
+    assert key != state.seed_key(seed_buckets, sqs_session)
+    assert key != state.seed_key(lambda s: None, s3_session)
+
+
+def test_snapshot_and_restore():
+    """Snapshots are exported state, restored after a reset."""
+    test_session = test_utils.make_test_RunningSession(services=["s3"])
+    with mock.patch.object(state, "internal_request") as internal_request:
+        internal_request.return_value = b"state data"
+        test_session.snapshot("foo")
+        internal_request.assert_called_once_with(
+            test_session, "GET", state.STATE_EXPORT_PATH, timeout=60
+        )
+        internal_request.reset_mock()
+
+        test_session.restore("foo")
+    assert internal_request.call_args_list == [
+        mock.call(test_session, "POST", "/_localstack/state/reset"),
+        mock.call(
+            test_session, "POST", state.STATE_EXPORT_PATH, b"state data", timeout=60
+        ),
+    ]
+
+
+def test_restore_missing_snapshot():
+    """Restoring an unknown snapshot is an error."""
+    test_session = test_utils.make_test_RunningSession(services=["s3"])
+    with pytest.raises(exceptions.SnapshotError):
+        test_session.restore("foo")
+
+
+def test_snapshot_commit_fallback():
+    """Without state export, LocalstackSession commits the container."""
+    test_session = test_utils.make_test_LocalstackSession(services=["s3"])
+    error = urllib.error.URLError("nope")
+    with test_session:
+        original_container = test_session._container
+        original_container.attrs["Config"] = {"Env": ["PERSISTENCE=1"]}
+        original_container.commit.return_value = mock.Mock(id="sha256:snap")
+        with mock.patch.object(state, "internal_request", side_effect=error):
+            test_session.snapshot("foo")
+            original_container.commit.assert_called_once_with(
+                repository=constants.SNAPSHOT_IMAGE_REPOSITORY, tag="foo"
+            )
+
+            test_session.restore("foo")
+        assert test_session._container is not original_container
+        original_container.stop.assert_called_once()
+        assert test_session.docker_client.containers.run.call_args[0] == (
+            "sha256:snap",
+        )
+
+
+@pytest.mark.parametrize("shared_by", ["owner", "resource_prefix"])
+def test_restore_image_into_shared_container(shared_by):
+    """Containers shared with other sessions can't be replaced by a restore."""
+    kwargs = {"resource_prefix": "gw0-"} if shared_by == "resource_prefix" else {}
+    test_session = test_utils.make_test_LocalstackSession(services=["s3"], **kwargs)
+    test_session.snapshots.save("foo", "image", "sha256:snap")
+    with test_session:
+        if shared_by == "owner":
+            test_session._keep_container_running = True
+        original_container = test_session._container
+        with pytest.raises(exceptions.SnapshotError):
+            test_session.restore("foo")
+        assert test_session._container is original_container
+        original_container.stop.assert_not_called()
+        test_session._keep_container_running = False
+
+
+def test_snapshot_commit_fallback_requires_persistence():
+    """Committed containers without persistence would restore empty."""
+    test_session = test_utils.make_test_LocalstackSession(services=["s3"])
+    error = urllib.error.URLError("nope")
+    with test_session:
+        with mock.patch.object(state, "internal_request", side_effect=error):
+            with pytest.raises(exceptions.SnapshotError):
+                test_session.snapshot("foo")
+        test_session._container.commit.assert_not_called()
+    assert "foo" not in test_session.snapshots
+
+
+def test_restore_or_seed_without_state_endpoints():
+    """Seeding resets what it can and runs the seed function every time."""
+    test_session = test_utils.make_test_LocalstackSession(services=["s3", "ec2"])
+    seed = mock.Mock(__name__="seed", __qualname__="seed", __module__=__name__)
+    reset_s3 = mock.Mock()
+    error = urllib.error.URLError("nope")
+    with test_session:
+        with mock.patch.object(state, "internal_request", side_effect=error):
+            with mock.patch.dict(state.SERVICE_RESETS, {"s3": reset_s3}):
+                state.restore_or_seed(test_session, seed)
+                state.restore_or_seed(test_session, seed)
+        test_session._container.commit.assert_not_called()
+    assert seed.call_count == 2
+    assert reset_s3.call_count >= 2
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_restore_or_seed(cached):
+    """Seed functions only run when there's no snapshot of their state."""
+    test_session = test_utils.make_test_RunningSession(services=["s3"])
+    seed = mock.Mock(__name__="seed", __qualname__="seed", __module__=__name__)
+    if cached:
+        test_session.snapshots.save(
+            state.seed_key(seed, test_session), "state", b"state data"
+        )
+    with mock.patch.object(state, "internal_request") as internal_request:
+        internal_request.return_value = b"state data"
+        state.restore_or_seed(test_session, seed)
+    assert seed.called is not cached
+    assert state.seed_key(seed, test_session) in test_session.snapshots
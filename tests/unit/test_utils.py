@@ -78,3 +78,35 @@ def test_get_version_tuple():
     assert utils.get_version_tuple("1.2.3") == (1, 2, 3)
     with pytest.raises(ValueError):
         utils.get_version_tuple("latest")
+
+
+def test_lru_cache():
+    """LRUCache keeps the most recently used values and counts lookups."""
+    cache = utils.LRUCache(2)
+    create = mock.Mock(side_effect=lambda: object())
+
+    a = cache.get_or_create("a", create)
+    b = cache.get_or_create("b", create)
+    assert cache.get_or_create("a", create) is a
+    cache.get_or_create("c", create)  # evicts "b"
+    assert cache.get_or_create("a", create) is a
+    assert cache.get_or_create("b", create) is not b
+
+    assert create.call_count == 4
+    assert cache.cache_info() == utils.CacheInfo(
+        hits=2, misses=4, maxsize=2, currsize=2
+    )
+
+    cache.clear()
+    assert cache.cache_info() == utils.CacheInfo(
+        hits=2, misses=4, maxsize=2, currsize=0
+    )
+
+
+def test_lru_cache_disabled():
+    """A cache with no size never keeps anything."""
+    cache = utils.LRUCache(0)
+    assert cache.get_or_create("a", object) is not cache.get_or_create("a", object)
+    assert cache.cache_info() == utils.CacheInfo(
+        hits=0, misses=2, maxsize=0, currsize=0
+    )
@@ -37,13 +37,23 @@ def make_mock_container(
 ):
     """Make a mock docker-py Container object."""
     container = mock.Mock(spec=docker.models.containers.Container)
-    container.labels = []
+    container.labels = kwargs.get("labels") or {}
     container.status = "running"
     container.name = kwargs.get("name") or session.generate_container_name()
     container.id = (
         "sha256:" + hashlib.sha256(container.name.encode("utf-8")).hexdigest()
     )
     container.short_id = container.id.split(":")[1][:6]
+    # Map container ports to the same host ports, like the docker_client.api.port
+    # mock in make_mock_docker_client().
+    container.attrs = {
+        "NetworkSettings": {
+            "Ports": {
+                "%s/tcp" % port: [{"HostIp": "0.0.0.0", "HostPort": str(port)}]
+                for port in kwargs.get("ports") or {}
+            }
+        }
+    }
 
     def _stop(timeout=10):
         container.status = "exited"
@@ -73,7 +83,30 @@ def make_mock_docker_client():
     """Make a mock docker-py Client object."""
     docker_client = mock.Mock(spec=docker.client.DockerClient)
     containers = docker_client.containers
-    containers.run.side_effect = make_mock_container
+    run_containers = []
+
+    def _run(*args, **kwargs):
+        container = make_mock_container(*args, **kwargs)
+        run_containers.append(container)
+        return container
+
+    containers.run.side_effect = _run
+
+    def _list(all=False, filters=None, **kwargs):
+        result = []
+        for container in run_containers:
+            if not all and container.status != "running":
+                continue
+            label_filters = (filters or {}).get("label", [])
+            if isinstance(label_filters, str):
+                label_filters = [label_filters]
+            labels = dict(label.split("=", 1) for label in label_filters)
+            if any(container.labels.get(k) != v for k, v in labels.items()):
+                continue
+            result.append(container)
+        return result
+
+    containers.list.side_effect = _list
     docker_client.api = mock.Mock(spec=docker.api.APIClient)
     docker_client.api.port.side_effect = lambda cid, port: [{"HostPort": port}]
     return docker_client
@@ -89,6 +122,7 @@ def make_test_LocalstackSession(*args, **kwargs):
         __name__=test_session._check_services.__name__,
         __code__=test_session._check_services.__code__,
     )
+    test_session._wait_for_ready_log = mock.Mock(return_value=False)
 
     return test_session
 